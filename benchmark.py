@@ -1,56 +1,76 @@
-
+import argparse
 import cv2
 import time
+import tracemalloc
 import numpy as np
 import os
-from src.model_loader import ModelManager
+import shutil
+import tempfile
+from src.model_loader import ModelManager, MODEL_FILES, model_paths, parse_model_precisions
 from src.pipeline import GazePipeline
+from src.async_pipeline import PipelinedGazeEngine
+from src.multi_stream import MultiStreamRunner, StreamSource
+from src.multiprocess import MultiProcessPipeline
+from src.model_fusion import FUSED_MODELS
 
-def benchmark_device(device_name, num_frames=100):
-    print(f"\n--- Benchmarking {device_name} ---")
-    
+def load_models(device_name, precision="FP16", dynamic_batch=False, cache_dir=None, parallel=True,
+                performance_hint=None, precisions=None):
     BASE_MODEL_DIR = os.path.join(os.getcwd(), "models", "intel")
-    PRECISION = "FP16" # FP16 is optimal for GPU/NPU, usually fine for CPU too
+    PRECISION = precision # FP16 is optimal for GPU/NPU, usually fine for CPU too
     
     # Paths
-    FACE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"face-detection-adas-0001/{PRECISION}/face-detection-adas-0001.xml")
-    LANDMARK_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"facial-landmarks-35-adas-0002/{PRECISION}/facial-landmarks-35-adas-0002.xml")
-    HEAD_POSE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"head-pose-estimation-adas-0001/{PRECISION}/head-pose-estimation-adas-0001.xml")
-    GAZE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"gaze-estimation-adas-0002/{PRECISION}/gaze-estimation-adas-0002.xml")
-    AGE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"age-gender-recognition-retail-0013/{PRECISION}/age-gender-recognition-retail-0013.xml")
-    EMOTION_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"emotions-recognition-retail-0003/{PRECISION}/emotions-recognition-retail-0003.xml")
+    paths = model_paths(BASE_MODEL_DIR, PRECISION, precisions)
+
+    # Face detection always runs once per frame, only the per-face models need a batch axis
+    options = {name: {"dynamic_batch": dynamic_batch} for name in MODEL_FILES if name != "face_detection"}
+    model_mgr = ModelManager(device=device_name, cache_dir=cache_dir, performance_hint=performance_hint)
+    model_mgr.load_models(paths, options=options, parallel=parallel)
+    return model_mgr
+
+def get_benchmark_frame():
+    dummy_frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    # Draw a fake face so pipeline runs all models (otherwise it skips if no face)
+    # Actually pipeline skips if no face detected.
+    # We need a real image or mock detection.
+    # Let's mock detect_faces in pipeline or use an image with a face?
+    # Using a black image will result in 0 faces -> FPS will be just Face Detection speed.
+    # To test FULL pipeline, we need a face.
+    
+    # Solution: Capture one frame from webcam
+    cap = cv2.VideoCapture(0)
+    ret, frame = cap.read()
+    cap.release()
+    
+    if not ret:
+        print("Cannot get webcam frame for benchmark. Using blank image (might skip downstream models).")
+        frame = dummy_frame
+    return frame
+
+def make_face_boxes(frame, num_faces):
+    """Lays out num_faces equally sized face boxes on a grid over the frame."""
+    h, w = frame.shape[:2]
+    cols = int(np.ceil(np.sqrt(num_faces)))
+    rows = int(np.ceil(num_faces / cols)) if num_faces else 0
+    cell_w, cell_h = w // max(cols, 1), h // max(rows, 1)
+    
+    boxes = []
+    for i in range(num_faces):
+        x_min = (i % cols) * cell_w
+        y_min = (i // cols) * cell_h
+        boxes.append([x_min, y_min, x_min + cell_w, y_min + cell_h])
+    return boxes
+
+def benchmark_device(device_name, num_frames=100, precision="FP16", precisions=None):
+    print(f"\n--- Benchmarking {device_name} ---")
 
     try:
         # Load Models
         start_load = time.time()
-        model_mgr = ModelManager(device=device_name)
-        model_mgr.load_model("face_detection", FACE_MODEL_PATH)
-        model_mgr.load_model("landmarks", LANDMARK_MODEL_PATH)
-        model_mgr.load_model("head_pose", HEAD_POSE_MODEL_PATH)
-        model_mgr.load_model("gaze", GAZE_MODEL_PATH)
-        model_mgr.load_model("age_gender", AGE_MODEL_PATH)
-        model_mgr.load_model("emotion", EMOTION_MODEL_PATH)
+        model_mgr = load_models(device_name, precision, precisions=precisions)
         print(f"Model Loading Time: {time.time() - start_load:.2f}s")
         
         pipeline = GazePipeline(model_mgr)
-        
-        # Warmup
-        dummy_frame = np.zeros((720, 1280, 3), dtype=np.uint8)
-        # Draw a fake face so pipeline runs all models (otherwise it skips if no face)
-        # Actually pipeline skips if no face detected.
-        # We need a real image or mock detection.
-        # Let's mock detect_faces in pipeline or use an image with a face?
-        # Using a black image will result in 0 faces -> FPS will be just Face Detection speed.
-        # To test FULL pipeline, we need a face.
-        
-        # Solution: Capture one frame from webcam
-        cap = cv2.VideoCapture(0)
-        ret, frame = cap.read()
-        cap.release()
-        
-        if not ret:
-            print("Cannot get webcam frame for benchmark. Using blank image (might skip downstream models).")
-            frame = dummy_frame
+        frame = get_benchmark_frame()
 
         print("Warming up...")
         for _ in range(10):
@@ -70,7 +90,369 @@ def benchmark_device(device_name, num_frames=100):
         print(f"Benchmark Failed: {e}")
         return 0
 
+def benchmark_batching(device_name, face_counts=(1, 2, 4, 6, 8, 10), num_frames=50, precision="FP16",
+                       precisions=None):
+    """
+    Compares per-face and batched inference as the number of faces grows.
+    Face detection runs on the frame as usual, the per-face models get a
+    fixed grid of face boxes so the face count does not depend on the image.
+    """
+    print(f"\n--- Batching Benchmark on {device_name} ---")
+    
+    model_mgr = load_models(device_name, precision, dynamic_batch=True, precisions=precisions)
+    pipelines = {
+        "per-face": GazePipeline(model_mgr),
+        "batched": GazePipeline(model_mgr, batched=True),
+    }
+    frame = get_benchmark_frame()
+    
+    results = {}
+    for num_faces in face_counts:
+        boxes = make_face_boxes(frame, num_faces)
+        for mode, pipeline in pipelines.items():
+            for _ in range(5):
+                pipeline.process_faces(frame, boxes)
+            
+            start_time = time.time()
+            for _ in range(num_frames):
+                pipeline.detect_faces(frame)
+                pipeline.process_faces(frame, boxes)
+            results[(mode, num_faces)] = num_frames / (time.time() - start_time)
+    
+    print("\n=== FPS vs Face Count ===")
+    print(f"{'Faces':>5} | {'per-face':>10} | {'batched':>10} | {'speedup':>7}")
+    for num_faces in face_counts:
+        per_face = results[("per-face", num_faces)]
+        batched = results[("batched", num_faces)]
+        print(f"{num_faces:>5} | {per_face:>10.2f} | {batched:>10.2f} | {batched / per_face:>6.2f}x")
+    return results
+
+def benchmark_concurrent(device_name, num_faces=4, num_frames=50, precision="FP16", precisions=None):
+    """
+    Compares sequential and concurrent dispatch of the per-face models.
+    Prints the average time per frame for every stage; "per_face" is the
+    wall time of all per-face inference, i.e. the critical path after detection.
+    """
+    print(f"\n--- Concurrent Dispatch Benchmark on {device_name} ({num_faces} faces) ---")
+    
+    model_mgr = load_models(device_name, precision, precisions=precisions)
+    pipelines = {
+        "sequential": GazePipeline(model_mgr),
+        "concurrent": GazePipeline(model_mgr, concurrent=True),
+    }
+    frame = get_benchmark_frame()
+    boxes = make_face_boxes(frame, num_faces)
+    
+    for pipeline in pipelines.values():
+        for _ in range(5):
+            pipeline.process_faces(frame, boxes)
+        pipeline.reset_stage_times()
+        for _ in range(num_frames):
+            pipeline.process_faces(frame, boxes)
+    
+    stages = ["landmarks", "head_pose", "age_gender", "emotion", "gaze", "per_face"]
+    print("\n=== Average ms per Frame ===")
+    print(f"{'Stage':>10} | " + " | ".join(f"{mode:>10}" for mode in pipelines))
+    for stage in stages:
+        times = [pipeline.stage_times[stage] / num_frames * 1000 for pipeline in pipelines.values()]
+        print(f"{stage:>10} | " + " | ".join(f"{t:>10.2f}" for t in times))
+    return {mode: dict(pipeline.stage_times) for mode, pipeline in pipelines.items()}
+
+def benchmark_request_pool(device_name, num_calls=500, precision="FP16", precisions=None):
+    """
+    Compares a new infer request per call (infer_new_request) with the
+    ModelManager request pool for every model. Reports latency per call and
+    the peak Python-side memory allocated while the calls run.
+    """
+    print(f"\n--- Request Pool Benchmark on {device_name} ---")
+    
+    model_mgr = load_models(device_name, precision, precisions=precisions)
+    pipeline = GazePipeline(model_mgr)
+    frame = get_benchmark_frame()
+    face_img = frame[:frame.shape[0] // 2, :frame.shape[1] // 4]
+    
+    face_input = lambda h, w: {0: pipeline.preprocess(face_img, h, w)}
+    eye_img = face_img[:face_img.shape[0] // 3, :face_img.shape[1] // 3]
+    model_inputs = {
+        "face_detection": {0: pipeline.preprocess(frame, pipeline.h_fd, pipeline.w_fd)},
+        "landmarks": face_input(pipeline.h_lm, pipeline.w_lm),
+        "head_pose": face_input(pipeline.h_hp, pipeline.w_hp),
+        "age_gender": face_input(pipeline.h_ag, pipeline.w_ag),
+        "emotion": face_input(pipeline.h_em, pipeline.w_em),
+        "gaze": pipeline.gaze_inputs(eye_img, eye_img, (0.0, 0.0, 0.0)),
+    }
+    
+    def measure(call, inputs):
+        for _ in range(10):
+            call(inputs)
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        for _ in range(num_calls):
+            call(inputs)
+        latency = (time.perf_counter() - start_time) / num_calls
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return latency, peak
+    
+    results = {}
+    print(f"\n{'Model':>14} | {'new request':>20} | {'pooled':>20}")
+    for name, inputs in model_inputs.items():
+        new_latency, new_peak = measure(model_mgr.get_model(name).infer_new_request, inputs)
+        pool_latency, pool_peak = measure(model_mgr.get_pool(name).infer, inputs)
+        results[name] = {"new": (new_latency, new_peak), "pooled": (pool_latency, pool_peak)}
+        print(f"{name:>14} | {new_latency * 1000:>7.3f}ms {new_peak / 1024:>8.1f}KiB"
+              f" | {pool_latency * 1000:>7.3f}ms {pool_peak / 1024:>8.1f}KiB")
+    return results
+
+def benchmark_pipelined(device_name, depths=(1, 2, 4, 8), num_frames=100, precision="FP16", precisions=None):
+    """
+    Compares the synchronous pipeline with PipelinedGazeEngine at several
+    in-flight depths. Reports sustained FPS and per-frame latency.
+    """
+    print(f"\n--- Pipelined Benchmark on {device_name} ---")
+    
+    model_mgr = load_models(device_name, precision, precisions=precisions)
+    pipeline = GazePipeline(model_mgr)
+    frame = get_benchmark_frame()
+    
+    for _ in range(10):
+        pipeline.run(frame)
+    start_time = time.time()
+    for _ in range(num_frames):
+        pipeline.run(frame)
+    sync_time = time.time() - start_time
+    results = {"sync": (num_frames / sync_time, sync_time / num_frames)}
+    
+    for depth in depths:
+        engine = PipelinedGazeEngine(pipeline, depth=depth)
+        list(engine.process([frame] * 10))
+        
+        submitted = {}
+        latencies = []
+        start_time = time.time()
+        for i in range(num_frames):
+            submitted[i] = time.time()
+            for done, _ in engine.submit(frame, i):
+                latencies.append(time.time() - submitted[done])
+        for done, _ in engine.flush():
+            latencies.append(time.time() - submitted[done])
+        total_time = time.time() - start_time
+        results[f"depth {depth}"] = (num_frames / total_time, np.mean(latencies))
+    
+    print("\n=== Sustained FPS vs In-flight Depth ===")
+    print(f"{'Mode':>8} | {'FPS':>8} | {'Latency':>10}")
+    for mode, (fps, latency) in results.items():
+        print(f"{mode:>8} | {fps:>8.2f} | {latency * 1000:>8.1f}ms")
+    return results
+
+def benchmark_startup(device_name, precision="FP16", precisions=None):
+    """
+    Compares model load time: sequential vs parallel compilation, each
+    with a cold (empty) and a warm compiled-model cache.
+    """
+    print(f"\n--- Startup Benchmark on {device_name} ---")
+    
+    results = {}
+    for parallel in (False, True):
+        cache_dir = tempfile.mkdtemp(prefix="gaze_model_cache_")
+        try:
+            for state in ("cold", "warm"):
+                start_time = time.time()
+                model_mgr = load_models(device_name, precision, cache_dir=cache_dir, parallel=parallel,
+                                        precisions=precisions)
+                mode = f"{'parallel' if parallel else 'sequential'}, {state}"
+                results[mode] = time.time() - start_time
+                model_mgr.report_load_times()
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    
+    print("\n=== Model Load Time ===")
+    print(f"{'Mode':>18} | {'Time':>10}")
+    for mode, load_time in results.items():
+        print(f"{mode:>18} | {load_time * 1000:>8.1f}ms")
+    return results
+
+def benchmark_multi_stream(device_name, sources, stream_counts=(1, 2, 4, 8), num_frames=100, precision="FP16",
+                           precisions=None):
+    """
+    Runs N video sources at once through one shared pipeline compiled with
+    the THROUGHPUT hint, for growing N. Sources are reused round-robin when
+    N exceeds the number given, so a single video file can stand in for
+    several cameras. Reports aggregate and per-stream FPS.
+    """
+    print(f"\n--- Multi-stream Benchmark on {device_name} ---")
+    
+    model_mgr = load_models(device_name, precision, performance_hint="THROUGHPUT", precisions=precisions)
+    pipeline = GazePipeline(model_mgr)
+    print(f"Optimal infer requests: {model_mgr.optimal_requests('face_detection')}")
+    
+    results = {}
+    for count in stream_counts:
+        streams = [StreamSource(sources[i % len(sources)], name=f"stream {i}", max_frames=num_frames)
+                   for i in range(count)]
+        stats = MultiStreamRunner(pipeline, streams).run()
+        per_stream = [source["fps"] for source in stats["sources"].values()]
+        results[count] = (stats["fps"], min(per_stream), max(per_stream))
+    
+    print("\n=== Aggregate FPS vs Stream Count ===")
+    print(f"{'Streams':>7} | {'Total FPS':>9} | {'Per-stream FPS (min-max)':>24}")
+    for count, (fps, low, high) in results.items():
+        print(f"{count:>7} | {fps:>9.2f} | {low:>11.2f} - {high:<10.2f}")
+    return results
+
+def rss_mb():
+    """Resident memory of this process in MB (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+def _load_footprint(device_name, fused, output, precision="FP16", precisions=None):
+    """Loads the face-crop models in a fresh process and reports (load seconds, MB)."""
+    paths = model_paths(os.path.join(os.getcwd(), "models", "intel"), precision, precisions)
+    model_mgr = ModelManager(device=device_name)
+    before = rss_mb()
+    start_time = time.perf_counter()
+    if fused:
+        model_mgr.load_fused_model({name: paths[name] for name in FUSED_MODELS})
+    else:
+        model_mgr.load_models({name: paths[name] for name in FUSED_MODELS})
+    output.put((time.perf_counter() - start_time, rss_mb() - before))
+
+def benchmark_fused(device_name, face_counts=(1, 4, 8), num_frames=50, precision="FP16", precisions=None):
+    """
+    Compares the four separate face-crop models (landmarks, head pose,
+    age/gender, emotion) with the fused face model, per face and batched.
+    Reports per-frame latency of the per-face models and the load time and
+    memory footprint of each variant, each loaded in a fresh process.
+    """
+    import multiprocessing as mp
+    print(f"\n--- Fused Model Benchmark on {device_name} ---")
+    
+    context = mp.get_context("spawn")
+    footprint = {}
+    for fused in (False, True):
+        output = context.Queue()
+        process = context.Process(target=_load_footprint, args=(device_name, fused, output, precision, precisions))
+        process.start()
+        footprint["fused" if fused else "separate"] = output.get()
+        process.join()
+    
+    model_mgr = load_models(device_name, precision, dynamic_batch=True, precisions=precisions)
+    paths = model_paths(os.path.join(os.getcwd(), "models", "intel"), precision, precisions)
+    model_mgr.load_fused_model({name: paths[name] for name in FUSED_MODELS}, dynamic_batch=True)
+    pipelines = {
+        "separate": GazePipeline(model_mgr),
+        "fused": GazePipeline(model_mgr, fused=True),
+        "separate batched": GazePipeline(model_mgr, batched=True),
+        "fused batched": GazePipeline(model_mgr, batched=True, fused=True),
+    }
+    frame = get_benchmark_frame()
+    
+    results = {}
+    for num_faces in face_counts:
+        boxes = make_face_boxes(frame, num_faces)
+        for mode, pipeline in pipelines.items():
+            for _ in range(5):
+                pipeline.process_faces(frame, boxes)
+            
+            start_time = time.perf_counter()
+            for _ in range(num_frames):
+                pipeline.process_faces(frame, boxes)
+            results[(mode, num_faces)] = (time.perf_counter() - start_time) / num_frames
+    
+    print("\n=== Load Time and Memory ===")
+    for mode, (load_time, memory) in footprint.items():
+        print(f"{mode:>8}: {load_time:.2f}s, {memory:.0f} MB")
+    
+    print("\n=== Per-face Models Latency per Frame ===")
+    print(f"{'Faces':>5} | " + " | ".join(f"{mode:>16}" for mode in pipelines))
+    for num_faces in face_counts:
+        print(f"{num_faces:>5} | " + " | ".join(f"{results[(mode, num_faces)] * 1000:>14.2f}ms" for mode in pipelines))
+    return results, footprint
+
+def benchmark_multiprocess(device_name, worker_counts=(1, 2, 4, 8), num_faces=4, num_frames=200, precision="FP16",
+                           precisions=None):
+    """
+    Scaling of MultiProcessPipeline from 1 to N worker processes, each pinned
+    to its share of the cores. Frames go through the shared memory ring with
+    num_faces fixed boxes, so every per-face model runs. Reports FPS and the
+    speedup over one worker.
+    """
+    print(f"\n--- Multi-process Benchmark on {device_name} ---")
+    print(f"Cores available: {len(os.sched_getaffinity(0))}")
+    
+    base_dir = os.path.join(os.getcwd(), "models", "intel")
+    frame = get_benchmark_frame()
+    boxes = make_face_boxes(frame, num_faces)
+    
+    results = {}
+    for count in worker_counts:
+        with MultiProcessPipeline(base_dir, device=device_name, precision=precision, precisions=precisions,
+                                  num_workers=count, pin_cores=True, max_frame_shape=frame.shape) as pipeline:
+            for i in range(2 * count):
+                pipeline.submit(frame, i, boxes=boxes)
+            pipeline.flush()
+            
+            start_time = time.time()
+            for i in range(num_frames):
+                pipeline.submit(frame, i, boxes=boxes)
+            pipeline.flush()
+            results[count] = num_frames / (time.time() - start_time)
+    
+    print(f"\n=== FPS vs Worker Processes ({num_faces} faces) ===")
+    print(f"{'Workers':>7} | {'FPS':>8} | {'Speedup':>7} | {'Efficiency':>10}")
+    base_fps = results[worker_counts[0]] / worker_counts[0]
+    for count, fps in results.items():
+        speedup = fps / base_fps
+        print(f"{count:>7} | {fps:>8.2f} | {speedup:>6.2f}x | {speedup / count * 100:>9.0f}%")
+    return results
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenVINO gaze pipeline benchmark")
+    parser.add_argument("--batching", action="store_true", help="Compare per-face and batched inference against face count")
+    parser.add_argument("--pipelined", action="store_true", help="Compare synchronous and pipelined async execution")
+    parser.add_argument("--concurrent", action="store_true", help="Compare sequential and concurrent per-face dispatch")
+    parser.add_argument("--request-pool", action="store_true", help="Compare new infer requests per call with pooled requests")
+    parser.add_argument("--startup", action="store_true", help="Compare sequential/parallel model loading with a cold and warm model cache")
+    parser.add_argument("--multi-stream", action="store_true", help="Aggregate FPS of several video sources sharing one pipeline")
+    parser.add_argument("--sources", nargs="+", default=["0"], help="Video files or camera indices for --multi-stream (default: webcam 0)")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8], help="Stream counts for --multi-stream")
+    parser.add_argument("--fused", action="store_true", help="Compare the four face-crop models with the fused face model")
+    parser.add_argument("--multiprocess", action="store_true", help="FPS scaling over worker processes with a shared memory frame ring")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker process counts for --multiprocess")
+    parser.add_argument("--device", default="CPU", help="Device for the comparison modes (default: CPU)")
+    parser.add_argument("--precision", default="FP16", help="Model precision (default: FP16)")
+    parser.add_argument("--model-precision", action="append", metavar="MODEL=PRECISION",
+                        help="Per-model precision override, e.g. face_detection=FP16-INT8 (repeatable)")
+    args = parser.parse_args()
+    # Model precisions for every mode
+    precision_args = {"precision": args.precision, "precisions": parse_model_precisions(args.model_precision)}
+    
+    if args.batching:
+        benchmark_batching(args.device, **precision_args)
+        raise SystemExit
+    if args.pipelined:
+        benchmark_pipelined(args.device, **precision_args)
+        raise SystemExit
+    if args.concurrent:
+        benchmark_concurrent(args.device, **precision_args)
+        raise SystemExit
+    if args.request_pool:
+        benchmark_request_pool(args.device, **precision_args)
+        raise SystemExit
+    if args.startup:
+        benchmark_startup(args.device, **precision_args)
+        raise SystemExit
+    if args.multi_stream:
+        sources = [int(source) if source.isdigit() else source for source in args.sources]
+        benchmark_multi_stream(args.device, sources, stream_counts=args.streams, **precision_args)
+        raise SystemExit
+    if args.fused:
+        benchmark_fused(args.device, **precision_args)
+        raise SystemExit
+    if args.multiprocess:
+        benchmark_multiprocess(args.device, worker_counts=args.workers, **precision_args)
+        raise SystemExit
+    
     devices = ["CPU", "GPU"]
     # Check NPU if available (NPU compiling might take longer)
     try:
@@ -82,7 +464,7 @@ if __name__ == "__main__":
 
     results = {}
     for device in devices:
-        fps = benchmark_device(device)
+        fps = benchmark_device(device, **precision_args)
         results[device] = fps
         
     print("\n=== Final Benchmark Results ===")
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+from openvino.runtime import get_version
+from src.model_loader import ModelManager, model_paths, parse_model_precisions
+from src.pipeline import GazePipeline
+
+STAGES = ("detect", "landmarks", "head_pose", "age_gender", "emotion", "gaze")
+PERCENTILES = (50, 95, 99)
+
+def make_face_fixture(width, height, num_faces, seed=0):
+    """
+    Synthetic test frame: a smooth random background with num_faces drawn
+    faces (skin ellipse, eyes with pupils, nose, mouth) on a grid. Returns
+    (frame, boxes). The same arguments always give the same image, so runs
+    on different machines measure the same work.
+    """
+    rng = np.random.RandomState(seed)
+    coarse = rng.randint(0, 256, (9, 16, 3), dtype=np.uint8)
+    frame = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+
+    cols = int(np.ceil(np.sqrt(num_faces)))
+    rows = int(np.ceil(num_faces / cols)) if num_faces else 0
+    cell_w, cell_h = width // max(cols, 1), height // max(rows, 1)
+
+    boxes = []
+    for i in range(num_faces):
+        x_min = (i % cols) * cell_w
+        y_min = (i // cols) * cell_h
+        # Face boxes are a bit taller than wide, like the detector's
+        w = int(min(cell_w, cell_h * 0.8) * 0.8)
+        h = int(w * 1.25)
+        x_min += (cell_w - w) // 2
+        y_min += (cell_h - h) // 2
+        boxes.append([x_min, y_min, x_min + w, y_min + h])
+
+        cx, cy = x_min + w // 2, y_min + h // 2
+        skin = tuple(int(c) for c in rng.randint([80, 120, 170], [130, 170, 230]))
+        cv2.ellipse(frame, (cx, cy), (w // 2, h // 2), 0, 0, 360, skin, -1)
+        for side in (-1, 1):
+            eye = (cx + side * w // 5, cy - h // 8)
+            cv2.ellipse(frame, eye, (max(w // 10, 1), max(w // 20, 1)), 0, 0, 360, (255, 255, 255), -1)
+            cv2.circle(frame, eye, max(w // 28, 1), (40, 30, 30), -1)
+        cv2.line(frame, (cx, cy - h // 16), (cx, cy + h // 10), (60, 80, 120), max(w // 60, 1))
+        cv2.ellipse(frame, (cx, cy + h // 4), (w // 6, max(h // 24, 1)), 0, 0, 360, (60, 50, 160), -1)
+    return frame, boxes
+
+def load_models(device_name, precision, precisions=None):
+    BASE_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "intel")
+    model_mgr = ModelManager(device=device_name)
+    model_mgr.load_models(model_paths(BASE_MODEL_DIR, precision, precisions))
+    return model_mgr
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    summary = {f"p{p}": float(np.percentile(samples, p)) for p in PERCENTILES}
+    summary["mean"] = float(samples.mean())
+    return summary
+
+def run_scenario(pipeline, frame, boxes, num_frames=100, warmup=10):
+    """
+    Times num_frames frames: face detection on the whole frame, then the
+    per-face models on the fixture's known face boxes, so the face count
+    does not depend on what the detector makes of synthetic faces.
+    Returns per-stage and end-to-end latency percentiles in ms and FPS.
+    """
+    def run_frame():
+        with pipeline.timer("detect"):
+            pipeline.detect_faces(frame)
+        pipeline.process_faces(frame, boxes)
+
+    for _ in range(warmup):
+        run_frame()
+
+    samples = {stage: [] for stage in STAGES}
+    samples["total"] = []
+    start_time = time.perf_counter()
+    for _ in range(num_frames):
+        pipeline.reset_stage_times()
+        frame_start = time.perf_counter()
+        run_frame()
+        samples["total"].append(time.perf_counter() - frame_start)
+        for stage in STAGES:
+            samples[stage].append(pipeline.stage_times.get(stage, 0.0))
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "fps": num_frames / elapsed,
+        "stages": {stage: percentiles(values) for stage, values in samples.items()},
+    }
+
+def run_suite(device_name="CPU", precision="FP16", resolutions=((640, 480), (1280, 720), (1920, 1080)),
+              face_counts=(0, 1, 4, 8), num_frames=100, seed=0, precisions=None):
+    model_mgr = load_models(device_name, precision, precisions)
+    pipeline = GazePipeline(model_mgr)
+
+    report = {
+        "meta": {
+            "device": device_name,
+            "precision": precision,
+            "model_precisions": precisions or {},
+            "frames": num_frames,
+            "seed": seed,
+            "openvino": get_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    for width, height in resolutions:
+        for num_faces in face_counts:
+            name = f"{width}x{height}_{num_faces}faces"
+            frame, boxes = make_face_fixture(width, height, num_faces, seed)
+            result = run_scenario(pipeline, frame, boxes, num_frames)
+            report["scenarios"][name] = result
+            total = result["stages"]["total"]
+            print(f"{name:>20} | {result['fps']:>8.2f} FPS | p50 {total['p50']:>7.2f}ms"
+                  f" | p95 {total['p95']:>7.2f}ms | p99 {total['p99']:>7.2f}ms")
+    return report
+
+def compare(report, baseline, threshold=0.1, min_ms=0.05):
+    """
+    Lists regressions of report against baseline: a stage whose p50 or p95
+    latency grew by more than `threshold` (relative), or a scenario whose
+    FPS dropped by more than that. Latencies under min_ms are ignored as
+    noise. Returns a list of messages, empty if nothing regressed.
+    """
+    regressions = []
+    for name, result in report["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if result["fps"] < base["fps"] * (1 - threshold):
+            regressions.append(f"{name}: FPS {base['fps']:.2f} -> {result['fps']:.2f}")
+        for stage, stats in result["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if base_stats is None:
+                continue
+            for key in ("p50", "p95"):
+                if stats[key] < min_ms:
+                    continue
+                if stats[key] > base_stats[key] * (1 + threshold):
+                    regressions.append(f"{name}: {stage} {key} {base_stats[key]:.2f}ms -> {stats[key]:.2f}ms")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproducible gaze pipeline benchmark on synthetic face fixtures")
+    parser.add_argument("--device", default="CPU", help="Inference device (default: CPU)")
+    parser.add_argument("--precision", default="FP16", help="Model precision (default: FP16)")
+    parser.add_argument("--model-precision", action="append", metavar="MODEL=PRECISION",
+                        help="Per-model precision override, e.g. face_detection=FP16-INT8 (repeatable)")
+    parser.add_argument("--resolutions", nargs="+", default=["640x480", "1280x720", "1920x1080"], help="Frame sizes as WxH")
+    parser.add_argument("--faces", type=int, nargs="+", default=[0, 1, 4, 8], help="Face counts per frame")
+    parser.add_argument("--frames", type=int, default=100, help="Measured frames per scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Fixture random seed")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON report path")
+    parser.add_argument("--compare", metavar="BASELINE", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown that counts as a regression (default: 0.1)")
+    args = parser.parse_args()
+
+    resolutions = [tuple(int(v) for v in res.lower().split("x")) for res in args.resolutions]
+    report = run_suite(args.device, args.precision, resolutions, args.faces, args.frames, args.seed,
+                       parse_model_precisions(args.model_precision))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+import numpy as np
+import cv2
+from src.model_loader import ModelManager, MODEL_FILES, model_path
+from src.pipeline import GazePipeline
+
+# Max allowed difference between Python-side and embedded preprocessing
+TOLERANCES = {
+    "landmarks": 0.01,    # normalized coordinates
+    "head_pose": 1.0,     # degrees
+    "age_gender": 0.05,   # age / 100 and gender probability
+    "emotion": 0.05,      # class probability
+    "gaze": 0.02,         # gaze vector components
+}
+
+def load_models(precision="FP16", embed_preprocess=False):
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+    BASE_MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "intel")
+    model_mgr = ModelManager(device="CPU", embed_preprocess=embed_preprocess)
+    # f32 inference so the comparison only measures the preprocessing
+    model_mgr.core.set_property("CPU", {"INFERENCE_PRECISION_HINT": "f32"})
+    for name in MODEL_FILES:
+        model_mgr.load_model(name, model_path(BASE_MODEL_DIR, name, precision))
+    return model_mgr
+
+def make_test_images(seed=0):
+    """Smooth random images of several sizes, standing in for face and eye crops."""
+    rng = np.random.RandomState(seed)
+    images = []
+    for h, w in [(40, 32), (60, 60), (97, 81), (180, 140), (320, 256)]:
+        coarse = rng.randint(0, 256, (8, 8, 3), dtype=np.uint8)
+        images.append(cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC))
+    return images
+
+def check_preprocessing(face_images=()):
+    """
+    Runs every model once with GazePipeline.preprocess in Python and once
+    with the preprocessing embedded by ModelManager(embed_preprocess=True),
+    and compares the raw outputs. Returns True if all are within TOLERANCES.
+    Face detection is compared on face_images (paths of photos with real
+    faces); the check fails if the reference finds no face in them, since
+    equal empty results would prove nothing.
+    """
+    reference = load_models()
+    embedded = load_models(embed_preprocess=True)
+    pipelines = {False: GazePipeline(reference), True: GazePipeline(embedded)}
+    images = make_test_images()
+
+    passed = True
+    for name, (_, (h, w), _) in pipelines[False].attribute_models.items():
+        max_diff = 0.0
+        for image in images:
+            outputs = {}
+            for embed, pipeline in pipelines.items():
+                results = pipeline.mm.infer(name, {0: pipeline.preprocess(image, h, w)})
+                outputs[embed] = [np.asarray(res, dtype=np.float32) for res in results.values()]
+            for ref, emb in zip(outputs[False], outputs[True]):
+                max_diff = max(max_diff, float(np.abs(ref - emb).max()))
+        ok = max_diff <= TOLERANCES[name]
+        passed &= ok
+        print(f"{name:>10}: max diff {max_diff:.5f} (tolerance {TOLERANCES[name]}) {'OK' if ok else 'FAIL'}")
+
+    max_diff = 0.0
+    for left_eye, right_eye in zip(images, images[1:]):
+        gaze = [pipeline.get_gaze(left_eye, right_eye, (10.0, -5.0, 2.0)) for pipeline in pipelines.values()]
+        max_diff = max(max_diff, float(np.abs(gaze[0] - gaze[1]).max()))
+    ok = max_diff <= TOLERANCES["gaze"]
+    passed &= ok
+    print(f"{'gaze':>10}: max diff {max_diff:.5f} (tolerance {TOLERANCES['gaze']}) {'OK' if ok else 'FAIL'}")
+
+    # Face detection: the same boxes, give or take a pixel of resize rounding
+    counts = [0, 0]
+    ok = True
+    for path in face_images:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Error: cannot read {path}")
+            ok = False
+            continue
+        boxes = [pipeline.detect_faces(frame) for pipeline in pipelines.values()]
+        counts = [counts[0] + len(boxes[0]), counts[1] + len(boxes[1])]
+        ok &= len(boxes[0]) == len(boxes[1]) and all(
+            np.abs(np.array(a) - np.array(b)).max() <= 2 for a, b in zip(*boxes))
+    if counts[0] == 0:
+        ok = False
+        print("Face detection needs images with real faces (--image), none were detected")
+    passed &= ok
+    print(f"{'detection':>10}: {counts[0]} vs {counts[1]} boxes {'OK' if ok else 'FAIL'}")
+
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Python-side and embedded preprocessing outputs")
+    parser.add_argument("--image", action="append", default=[], metavar="PATH",
+                        help="Photo with at least one real face for the detection check (repeatable)")
+    args = parser.parse_args()
+    sys.exit(0 if check_preprocessing(args.image) else 1)
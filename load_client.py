@@ -0,0 +1,58 @@
+import argparse
+import threading
+import time
+import numpy as np
+from benchmark_suite import make_face_fixture
+from src.server import GazeClient
+
+def run_load(address, concurrency, num_requests, frame, boxes):
+    """
+    `concurrency` client threads, each with its own connection, send
+    num_requests requests back to back. Returns (requests/s, latencies).
+    """
+    latencies = [[] for _ in range(concurrency)]
+    errors = []
+
+    def client_loop(out):
+        try:
+            with GazeClient(address) as client:
+                for _ in range(num_requests):
+                    start = time.perf_counter()
+                    client.infer(frame, boxes)
+                    out.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client_loop, args=(out,)) for out in latencies]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    if errors:
+        raise errors[0]
+
+    latencies = np.concatenate(latencies)
+    return len(latencies) / elapsed, latencies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for serve.py: throughput and tail latency against concurrency")
+    parser.add_argument("--socket", default="/tmp/gaze.sock", help="Unix domain socket path (default: /tmp/gaze.sock)")
+    parser.add_argument("--port", type=int, help="Connect to 127.0.0.1:PORT over TCP instead of the Unix socket")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrent clients to test")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--faces", type=int, default=1, help="Faces in the test frame")
+    parser.add_argument("--mode", choices=["frame", "faces"], default="faces",
+                        help="Send whole frames (detected on the server) or frames with face boxes")
+    args = parser.parse_args()
+
+    address = ("127.0.0.1", args.port) if args.port else args.socket
+    frame, boxes = make_face_fixture(1280, 720, args.faces)
+    boxes = boxes if args.mode == "faces" else None
+
+    print(f"{'clients':>8} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for concurrency in args.concurrency:
+        throughput, latencies = run_load(address, concurrency, args.requests, frame, boxes)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        print(f"{concurrency:>8} | {throughput:>8.1f} | {p50:>8.1f} | {p95:>8.1f} | {p99:>8.1f}")
@@ -1,84 +1,193 @@
 import cv2
 import sys
 import os
-from src.model_loader import ModelManager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.model_loader import ModelManager, model_paths
+from src.model_fusion import FUSED_MODELS
 from src.pipeline import GazePipeline
-from src.utils import draw_results
+from src.tracker import FaceTracker
+from src.attribute_cache import AttributeCache
+from src.load_shedder import LoadShedder
+from src.motion_gate import MotionGate
+from src.adaptive_detection import AdaptiveDetector, load_detector_variants
+from src.metrics import create_registry
+from src.renderer import Renderer
+from src.capture import ThreadedCapture
 
 def main():
     # Configuration
     # Use FP16 for GPU/NPU, FP32 for CPU usually, but modern CPUs handle FP16 well via conversion or AVX512_BF16
     # We downloaded everything.
     PRECISION = "FP16" 
+    MODEL_PRECISIONS = {} # Per-model overrides, e.g. {"face_detection": "FP16-INT8"} (see precision_report.py)
     DEVICE = "GPU" # Optimized based on benchmark results (Avg ~140 FPS)
+    PIPELINE_DEPTH = 0 # Frames in flight for the pipelined async engine (0 = synchronous)
+    DETECT_INTERVAL = 1 # Full face detection every N frames, faces are tracked in between (1 = every frame)
+    CACHE_ATTRIBUTES = False # Reuse smoothed age/gender/emotion per tracked face, refreshed periodically
+    MOTION_GATING = False # Reuse the previous results on static frames and for faces that did not move (kiosks, static scenes)
+    LATENCY_BUDGET_MS = 0 # Per-frame budget: skip emotion, then age/gender, then detect less often while over it (0 = off)
+    ADAPTIVE_DETECTION = False # Smaller detector sizes for close-up faces, detect near known faces with periodic full sweeps
+    FUSED_FACE_MODEL = False # Landmarks, head pose, age/gender and emotion as one model, one request per face
+    EMBED_PREPROCESS = False # Resize/layout/precision conversion inside the compiled models (see check_preprocessing.py)
+    THREAD_PLAN = None # Per-model CPU threads/streams/pinning from plan_threads.py, e.g. "thread_plan.json" (CPU only)
+    HEADLESS = False # No drawing and no window, only FPS printouts (e.g. on a server)
+    VIDEO_SOURCE = 0 # Webcam index, or a video file path (played back at its own frame rate like a camera)
+    CAPTURE_POLICY = "latest" # "latest" = always process the newest frame, skip stale ones (low latency), "all" = every frame
+    METRICS_PORT = 0 # Serve metrics on http://localhost:<port>/metrics and /metrics.json (0 = off, GAZE_METRICS=0 disables them)
     
     # Use paths relative to this script file, not the current working directory
     SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
     BASE_MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "intel")
     
+    MODEL_CACHE_DIR = os.path.join(SCRIPT_DIR, "model_cache") # Compiled models, makes restarts fast
+    
     # Paths to models
-    FACE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"face-detection-adas-0001/{PRECISION}/face-detection-adas-0001.xml")
-    LANDMARK_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"facial-landmarks-35-adas-0002/{PRECISION}/facial-landmarks-35-adas-0002.xml")
-    HEAD_POSE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"head-pose-estimation-adas-0001/{PRECISION}/head-pose-estimation-adas-0001.xml")
-    GAZE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"gaze-estimation-adas-0002/{PRECISION}/gaze-estimation-adas-0002.xml")
-    AGE_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"age-gender-recognition-retail-0013/{PRECISION}/age-gender-recognition-retail-0013.xml")
-    EMOTION_MODEL_PATH = os.path.join(BASE_MODEL_DIR, f"emotions-recognition-retail-0003/{PRECISION}/emotions-recognition-retail-0003.xml")
+    paths = model_paths(BASE_MODEL_DIR, PRECISION, MODEL_PRECISIONS)
     
-    # Initialize
-    try:
-        print(f"Initializing OpenVINO on {DEVICE}...")
-        model_mgr = ModelManager(device=DEVICE)
-        
-        # Load Models
-        model_mgr.load_model("face_detection", FACE_MODEL_PATH)
-        model_mgr.load_model("landmarks", LANDMARK_MODEL_PATH)
-        model_mgr.load_model("head_pose", HEAD_POSE_MODEL_PATH)
-        model_mgr.load_model("gaze", GAZE_MODEL_PATH)
-        model_mgr.load_model("age_gender", AGE_MODEL_PATH)
-        model_mgr.load_model("emotion", EMOTION_MODEL_PATH)
+    # Metrics registry, None if switched off
+    metrics = create_registry()
+    if metrics is not None and METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+        print(f"Metrics on http://localhost:{METRICS_PORT}/metrics")
+    
+    # The webcam opens while the models compile
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        cap_future = executor.submit(ThreadedCapture, VIDEO_SOURCE, policy=CAPTURE_POLICY, buffer_size=2,
+                                     realtime=not isinstance(VIDEO_SOURCE, int))
         
-    except Exception as e:
-        print(f"Initialization Error: {e}")
-        return
+        # Initialize
+        try:
+            print(f"Initializing OpenVINO on {DEVICE}...")
+            model_mgr = ModelManager(device=DEVICE, embed_preprocess=EMBED_PREPROCESS, cache_dir=MODEL_CACHE_DIR,
+                                     metrics=metrics, thread_plan=THREAD_PLAN)
+            
+            # Load Models (compiled concurrently)
+            if FUSED_FACE_MODEL:
+                model_mgr.load_fused_model({name: paths.pop(name) for name in FUSED_MODELS})
+            load_time = model_mgr.load_models(paths)
+            if ADAPTIVE_DETECTION:
+                load_time += load_detector_variants(model_mgr, paths["face_detection"])
+            print(f"Models loaded in {load_time:.2f}s")
+            model_mgr.report_load_times()
+            
+        except Exception as e:
+            print(f"Initialization Error: {e}")
+            return
 
-    # Webcam
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+        # Webcam
+        cap = cap_future.result()
+    if not cap.is_opened():
         print("Error: Could not open webcam.")
         return
 
     # Initialize Pipeline
-    pipeline = GazePipeline(model_mgr)
+    tracker = FaceTracker(detect_interval=DETECT_INTERVAL) if DETECT_INTERVAL > 1 else None
+    attribute_cache = AttributeCache() if CACHE_ATTRIBUTES else None
+    load_shedder = LoadShedder(budget_ms=LATENCY_BUDGET_MS, metrics=metrics) if LATENCY_BUDGET_MS > 0 else None
+    motion_gate = MotionGate() if MOTION_GATING else None
+    adaptive_detector = AdaptiveDetector() if ADAPTIVE_DETECTION else None
+    pipeline = GazePipeline(model_mgr, tracker=tracker, attribute_cache=attribute_cache, metrics=metrics,
+                            load_shedder=load_shedder, motion_gate=motion_gate, fused=FUSED_FACE_MODEL,
+                            adaptive_detector=adaptive_detector)
+    engine = None
+    if PIPELINE_DEPTH > 0:
+        from src.async_pipeline import PipelinedGazeEngine
+        engine = PipelinedGazeEngine(pipeline, depth=PIPELINE_DEPTH)
+        # The engine runs detection and every face model on each frame itself
+        ignored = [name for name, part in (("tracking", tracker), ("attribute cache", attribute_cache),
+                                           ("motion gating", motion_gate), ("adaptive detection", adaptive_detector))
+                   if part is not None]
+        if ignored:
+            print(f"Warning: {', '.join(ignored)} not supported with PIPELINE_DEPTH > 0, ignoring")
+            tracker = attribute_cache = motion_gate = adaptive_detector = None
+    
+    # Drawing and display run on their own thread, showing the latest result
+    renderer = None if HEADLESS else Renderer(metrics=metrics)
     
     # FPS Calculation
     import time
     prev_time = 0
+    frame_count = 0
+    latencies = deque(maxlen=1000) # Capture to result, last 1000 frames
     
-    print("Starting Loop. Press ESC to exit.")
-    while True:
-        curr_time = time.time()
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Frames are read on a background thread from here on
+    cap.start()
+    
+    def show(completed, fps):
+        nonlocal frame_count
+        for (frame, capture_time), results in completed:
+            latency = time.perf_counter() - capture_time
+            latencies.append(latency)
+            if metrics is not None:
+                metrics.histogram("capture_to_result_seconds", "Time from frame capture to its results").observe(latency)
+            frame_count += 1
 
-        # Inference
-        results = pipeline.run(frame)
+            # Visualization (skipped entirely when headless)
+            if renderer:
+                text = f"FPS: {fps:.1f} ({DEVICE})"
+                if results.degradation:
+                    text += f" [{LoadShedder.LEVELS[results.degradation]}]"
+                renderer.submit(frame, results, text)
+            elif frame_count % 100 == 0:
+                print(f"FPS: {fps:.1f} ({DEVICE}), {len(results)} faces, level {results.degradation}")
+    
+    print("Starting Loop. Press Ctrl+C to exit." if HEADLESS else "Starting Loop. Press ESC to exit.")
+    fps = 0
+    try:
+        while not (renderer and renderer.closed.is_set()):
+            item = cap.read()
+            if item is None:
+                break
+            frame, capture_time, _ = item
+            curr_time = time.time()
 
-        # Visualization
-        draw_results(frame, results)
-        
-        # Calculate and Draw FPS
-        fps = 1 / (curr_time - prev_time) if prev_time > 0 else 0
-        prev_time = curr_time
-        cv2.putText(frame, f"FPS: {fps:.1f} ({DEVICE})", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            # Calculate FPS, once per loop (the pipelined engine can finish several frames at once)
+            if curr_time > prev_time:
+                fps = 1 / (curr_time - prev_time) if prev_time > 0 else 0
+                prev_time = curr_time
 
-        cv2.imshow('Gaze Estimation Project', frame)
+            # Inference
+            # The pipelined engine hands back frames a few iterations later, in order
+            if engine:
+                show(engine.submit(frame, (frame, capture_time)), fps)
+            else:
+                show([((frame, capture_time), pipeline.run(frame))], fps)
 
-        if cv2.waitKey(1) == 27: # ESC
-            break
+        # Frames still in flight in the pipelined engine
+        if engine:
+            show(engine.flush(), fps)
+    except KeyboardInterrupt:
+        pass
 
     cap.release()
-    cv2.destroyAllWindows()
+    if latencies:
+        ordered = sorted(latencies)
+        print(f"Capture to result latency: avg {sum(ordered) / len(ordered) * 1000:.1f} ms, "
+              f"p95 {ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000:.1f} ms; "
+              f"{cap.dropped} stale frames skipped")
+    if renderer:
+        renderer.stop()
+        print(f"Rendered {renderer.rendered} frames, skipped {renderer.dropped} stale ones")
+
+    if tracker:
+        stats = tracker.stats()
+        print(f"Tracking: {stats['detections']}/{stats['frames']} frames ran face detection, "
+              f"~{stats['saved_ms']:.0f} ms of detection time saved")
+    if attribute_cache:
+        stats = attribute_cache.stats()
+        print(f"Attribute cache: {stats['hit_rate'] * 100:.0f}% of age/gender and emotion inferences skipped")
+    if motion_gate:
+        stats = motion_gate.stats()
+        print(f"Motion gating: {stats['skip_rate'] * 100:.0f}% of frames and "
+              f"{stats['face_reuse_rate'] * 100:.0f}% of the other faces reused previous results")
+    if adaptive_detector:
+        stats = adaptive_detector.stats()
+        print(f"Adaptive detection: {stats['roi_detections']}/{stats['detections']} detections in a face region, "
+              f"{stats['sweeps']} full sweeps, sizes {stats['sizes']}")
+    if load_shedder:
+        stats = load_shedder.stats()
+        print(f"Load shedding: {stats['degraded'] * 100:.0f}% of frames degraded, {stats['changes']} level changes")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import time
+from src.model_loader import ModelManager, MODEL_FILES, model_paths, parse_model_precisions
+from src.pipeline import GazePipeline
+from src.thread_plan import MODES, plan_threads, print_plan, save_plan
+from benchmark_suite import make_face_fixture
+
+def measure_fps(paths, mode, num_faces, thread_plan=None, num_frames=50):
+    """End-to-end FPS of GazePipeline on a synthetic frame, with or without a plan."""
+    options = {name: {"dynamic_batch": mode == "batched"} for name in MODEL_FILES if name != "face_detection"}
+    model_mgr = ModelManager(device="CPU", thread_plan=thread_plan)
+    model_mgr.load_models(paths, options=options)
+    pipeline = GazePipeline(model_mgr, batched=mode == "batched", concurrent=mode == "concurrent")
+    frame, boxes = make_face_fixture(1280, 720, num_faces)
+
+    for _ in range(5):
+        pipeline.process_faces(frame, boxes)
+    start = time.perf_counter()
+    for _ in range(num_frames):
+        pipeline.detect_faces(frame)
+        pipeline.process_faces(frame, boxes)
+    return num_frames / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan CPU threads, streams and pinning per model for the gaze pipeline")
+    parser.add_argument("--precision", default="FP16", help="Model precision (default: FP16)")
+    parser.add_argument("--model-precision", action="append", metavar="MODEL=PRECISION",
+                        help="Per-model precision override, e.g. face_detection=FP16-INT8 (repeatable)")
+    parser.add_argument("--mode", choices=MODES, default="sequential", help="How the pipeline runs the per-face models")
+    parser.add_argument("--faces", type=int, default=1, help="Typical number of faces per frame")
+    parser.add_argument("--in-flight", type=int, default=1, help="Frames in flight (PipelinedGazeEngine depth, 1 = synchronous)")
+    parser.add_argument("--cores", type=int, help="Cores to plan for (default: all available)")
+    parser.add_argument("--runs", type=int, default=20, help="Timed inferences per profiled config")
+    parser.add_argument("--verify", action="store_true", help="Compare end-to-end FPS with and without the plan")
+    parser.add_argument("-o", "--output", default="thread_plan.json", help="Plan file (default: thread_plan.json)")
+    args = parser.parse_args()
+
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+    BASE_MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "intel")
+    paths = model_paths(BASE_MODEL_DIR, args.precision, parse_model_precisions(args.model_precision))
+
+    plan = plan_threads(paths, mode=args.mode, num_faces=args.faces, in_flight=args.in_flight,
+                        cores=args.cores, runs=args.runs)
+    print_plan(plan)
+    save_plan(plan, args.output)
+    print(f"Plan written to {args.output}, set THREAD_PLAN in main.py to use it")
+
+    if args.verify:
+        default_fps = measure_fps(paths, args.mode, args.faces)
+        planned_fps = measure_fps(paths, args.mode, args.faces, thread_plan=plan)
+        print(f"End-to-end: default {default_fps:.1f} FPS, planned {planned_fps:.1f} FPS "
+              f"({(planned_fps / default_fps - 1) * 100:+.1f}%)")
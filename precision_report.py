@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from src.model_loader import ModelManager, MODEL_FILES, model_paths
+from src.pipeline import GazePipeline
+from src.tracker import box_iou
+from benchmark_suite import make_face_fixture
+
+PRECISIONS = ("FP32", "FP16", "FP16-INT8")
+
+# name -> (precision, per-model overrides)
+DEFAULT_MIXES = {
+    "FP16": ("FP16", {}),
+    "FP16-INT8": ("FP16-INT8", {}),
+    "INT8 detect+landmarks": ("FP16", {"face_detection": "FP16-INT8", "landmarks": "FP16-INT8"}),
+}
+
+# Output drift allowed against the FP32 reference
+DEFAULT_BUDGET = {
+    "box_iou": 0.8,           # min mean IoU of the detected boxes
+    "landmark_error": 0.02,   # max mean point distance, normalized face coordinates
+    "head_pose_error": 3.0,   # max mean absolute angle error, degrees
+    "gaze_error": 5.0,        # max mean gaze angle error, degrees
+}
+
+def parse_mix(text):
+    """'name:FP16,face_detection=FP16-INT8' -> (name, (precision, overrides))"""
+    name, _, spec = text.partition(":")
+    precision, overrides = "FP16", {}
+    for item in spec.split(","):
+        key, sep, value = item.partition("=")
+        if not sep:
+            precision = key
+        elif key in MODEL_FILES:
+            overrides[key] = value
+        else:
+            raise ValueError(f"Unknown model {key!r} in mix {text!r}")
+    return name, (precision, overrides)
+
+def sweep_mixes():
+    """Every model on its own at each lower precision, the rest at FP32."""
+    return {f"{name} {precision}": ("FP32", {name: precision})
+            for name in MODEL_FILES for precision in PRECISIONS[1:]}
+
+def load_fixtures(image_paths=None, count=6, seed=0):
+    """
+    [(frame, boxes)]: the given images (boxes come from the reference
+    detector, see evaluate) or synthetic faces from benchmark_suite.
+    """
+    if image_paths:
+        return [(cv2.imread(path), None) for path in image_paths]
+    layouts = [(1280, 720, 1), (1280, 720, 2), (1920, 1080, 4), (640, 480, 1)]
+    return [make_face_fixture(*layouts[i % len(layouts)], seed=seed + i) for i in range(count)]
+
+def load_mix(base_dir, device, precision, overrides, reference=False):
+    model_mgr = ModelManager(device=device)
+    if reference and device == "CPU":
+        # The reference runs at full f32, not the CPU's default bf16/f16 hint
+        model_mgr.config["INFERENCE_PRECISION_HINT"] = "f32"
+    model_mgr.load_models(model_paths(base_dir, precision, overrides))
+    return model_mgr
+
+def evaluate(model_mgr, fixtures, num_passes=5):
+    """
+    Runs detection and the per-face models over every fixture. Returns
+    (outputs, FPS): per fixture the detected boxes and the face results on
+    the fixture's boxes, so all mixes are compared on the same face crops.
+    """
+    pipeline = GazePipeline(model_mgr)
+    outputs = [(pipeline.detect_faces(frame), pipeline.process_faces(frame, boxes))
+               for frame, boxes in fixtures]
+
+    start_time = time.perf_counter()
+    for _ in range(num_passes):
+        for frame, boxes in fixtures:
+            pipeline.detect_faces(frame)
+            pipeline.process_faces(frame, boxes)
+    fps = num_passes * len(fixtures) / (time.perf_counter() - start_time)
+    return outputs, fps
+
+def angles_between(a, b):
+    """Angle in degrees between the vectors of each row of a and b."""
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    cos = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+def drift(reference, outputs):
+    """Output differences of a mix against the reference outputs."""
+    ious, landmarks, head_poses, gazes, ages = [], [], [], [], []
+    gender_agree, emotion_agree = [], []
+    for (ref_boxes, ref), (boxes, result) in zip(reference, outputs):
+        for ref_box in ref_boxes:
+            ious.append(max((box_iou(ref_box, box) for box in boxes), default=0.0))
+        # Both ran on the same fixture boxes, so rows line up
+        n = min(len(ref), len(result))
+        points = (ref.landmarks[:n] - result.landmarks[:n]).reshape(n, -1, 2)
+        landmarks.extend(np.linalg.norm(points, axis=2).mean(axis=1))
+        head_poses.extend(np.abs(ref.head_pose[:n] - result.head_pose[:n]).mean(axis=1))
+        both = ref.has_gaze[:n] & result.has_gaze[:n]
+        gazes.extend(angles_between(ref.gaze[:n][both], result.gaze[:n][both]))
+        ages.extend(np.abs(ref.age[:n].astype(np.int32) - result.age[:n]))
+        gender_agree.extend(ref.gender[:n] == result.gender[:n])
+        emotion_agree.extend(ref.emotion[:n] == result.emotion[:n])
+
+    def mean(values, default=0.0):
+        return float(np.mean(values)) if values else default
+
+    return {
+        # None without reference detections (e.g. synthetic faces), not a perfect score
+        "box_iou": mean(ious, default=None),
+        "landmark_error": mean(landmarks),
+        "head_pose_error": mean(head_poses),
+        "gaze_error": mean(gazes),
+        "age_error": mean(ages),
+        "gender_agreement": mean(gender_agree, default=1.0),
+        "emotion_agreement": mean(emotion_agree, default=1.0),
+    }
+
+def within_budget(stats, budget):
+    """Detection drift is only checked when the reference detected faces (box_iou not None)."""
+    return ((stats["box_iou"] is None or stats["box_iou"] >= budget["box_iou"])
+            and stats["landmark_error"] <= budget["landmark_error"]
+            and stats["head_pose_error"] <= budget["head_pose_error"]
+            and stats["gaze_error"] <= budget["gaze_error"])
+
+def precision_report(mixes, device="CPU", fixtures=None, budget=DEFAULT_BUDGET, num_passes=5):
+    """
+    Compares each precision mix with the all-FP32 reference: throughput
+    and output drift. Returns {mix name: stats}, including the reference.
+    """
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "intel")
+    fixtures = fixtures or load_fixtures()
+
+    reference_mgr = load_mix(base_dir, device, "FP32", {}, reference=True)
+    # Real images have no known boxes: use the reference detections
+    fixtures = [(frame, boxes if boxes is not None else GazePipeline(reference_mgr).detect_faces(frame))
+                for frame, boxes in fixtures]
+    reference, reference_fps = evaluate(reference_mgr, fixtures, num_passes)
+
+    report = {"FP32 (reference)": {"fps": reference_fps, **drift(reference, reference), "within_budget": True}}
+    for name, (precision, overrides) in mixes.items():
+        outputs, fps = evaluate(load_mix(base_dir, device, precision, overrides), fixtures, num_passes)
+        stats = drift(reference, outputs)
+        report[name] = {"precision": precision, "overrides": overrides, "fps": fps, **stats,
+                        "within_budget": within_budget(stats, budget)}
+    return report
+
+def print_report(report):
+    print(f"\n{'Mix':>28} | {'FPS':>7} | {'Box IoU':>7} | {'Landmk':>7} | {'Pose':>6} | {'Gaze':>6} | {'Age':>5} | {'Gender':>6} | {'Emotion':>7} | Budget")
+    for name, stats in report.items():
+        iou_text = f"{stats['box_iou']:>7.3f}" if stats["box_iou"] is not None else f"{'n/a':>7}"
+        print(f"{name:>28} | {stats['fps']:>7.2f} | {iou_text} | {stats['landmark_error']:>7.4f}"
+              f" | {stats['head_pose_error']:>5.2f}° | {stats['gaze_error']:>5.2f}° | {stats['age_error']:>5.1f}"
+              f" | {stats['gender_agreement'] * 100:>5.0f}% | {stats['emotion_agreement'] * 100:>6.0f}%"
+              f" | {'OK' if stats['within_budget'] else 'over'}")
+
+    if any(stats["box_iou"] is None for stats in report.values()):
+        print("Warning: the reference detected no faces, detection drift is not checked (use --images with real faces)")
+
+    candidates = [(stats["fps"], name) for name, stats in report.items() if stats["within_budget"]]
+    fps, name = max(candidates)
+    print(f"\nFastest mix within budget: {name} ({fps:.2f} FPS)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and FP32 drift of per-model precision mixes")
+    parser.add_argument("--device", default="CPU", help="Inference device (default: CPU)")
+    parser.add_argument("--mix", action="append", metavar="NAME:PRECISION[,MODEL=PRECISION...]",
+                        help="Precision mix to test, e.g. 'fast:FP16,face_detection=FP16-INT8' (repeatable)")
+    parser.add_argument("--sweep", action="store_true", help="Also test each model alone at FP16 and FP16-INT8")
+    parser.add_argument("--images", nargs="+", help="Fixture images instead of synthetic faces")
+    parser.add_argument("--passes", type=int, default=5, help="Timed passes over the fixtures per mix")
+    parser.add_argument("--min-iou", type=float, default=DEFAULT_BUDGET["box_iou"], help="Budget: min mean box IoU")
+    parser.add_argument("--max-landmark-error", type=float, default=DEFAULT_BUDGET["landmark_error"], help="Budget: max landmark error")
+    parser.add_argument("--max-head-pose-error", type=float, default=DEFAULT_BUDGET["head_pose_error"], help="Budget: max head pose error (degrees)")
+    parser.add_argument("--max-gaze-error", type=float, default=DEFAULT_BUDGET["gaze_error"], help="Budget: max gaze error (degrees)")
+    parser.add_argument("-o", "--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    mixes = dict(parse_mix(text) for text in args.mix) if args.mix else dict(DEFAULT_MIXES)
+    if args.sweep:
+        mixes.update(sweep_mixes())
+    budget = {
+        "box_iou": args.min_iou,
+        "landmark_error": args.max_landmark_error,
+        "head_pose_error": args.max_head_pose_error,
+        "gaze_error": args.max_gaze_error,
+    }
+    fixtures = load_fixtures(args.images) if args.images else None
+    if fixtures and any(frame is None for frame, _ in fixtures):
+        print("Error: could not read every fixture image")
+        sys.exit(1)
+
+    report = precision_report(mixes, args.device, fixtures, budget, args.passes)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,125 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from src.model_loader import ModelManager, model_paths, parse_model_precisions
+from src.pipeline import GazePipeline
+from src.async_pipeline import PipelinedGazeEngine
+from src.tracker import FaceTracker
+from src.attribute_cache import AttributeCache
+from src.multi_stream import StreamSource
+from src.result_writer import JsonlResultWriter
+from src.stage_cache import StageCache
+
+def process_video(video_path, output_path, device="CPU", precision="FP16", precisions=None, depth=0,
+                  detect_interval=1, cache_attributes=False, max_frames=None, queue_size=8, stage_cache_dir=None,
+                  stage_cache_mb=1024, embed_preprocess=False):
+    """
+    Runs GazePipeline over a video file without any display and streams the
+    per-frame results to a JSONL file (see JsonlResultWriter). Frames are
+    decoded on a separate thread into a bounded queue, so decoding overlaps
+    inference and stalls instead of buffering when inference falls behind.
+    With depth > 0 frames go through PipelinedGazeEngine instead (tracking
+    and attribute caching only apply to the synchronous pipeline).
+    With stage_cache_dir, every stage's outputs are kept on disk (see
+    StageCache), so running the same video again after changing one model
+    only recomputes the stages that model invalidates (synchronous only).
+    embed_preprocess compiles resizing and layout conversion into the models
+    (see ModelManager), the default is the Python preprocessing of main.py.
+    Returns (frames, seconds, video seconds).
+    """
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+    BASE_MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "intel")
+    MODEL_CACHE_DIR = os.path.join(SCRIPT_DIR, "model_cache")
+
+    model_mgr = ModelManager(device=device, embed_preprocess=embed_preprocess, cache_dir=MODEL_CACHE_DIR)
+    model_mgr.load_models(model_paths(BASE_MODEL_DIR, precision, precisions))
+
+    tracker = FaceTracker(detect_interval=detect_interval) if detect_interval > 1 and depth == 0 else None
+    attribute_cache = AttributeCache() if cache_attributes and depth == 0 else None
+    stage_cache = None
+    if stage_cache_dir and depth == 0:
+        stage_cache = StageCache(stage_cache_dir, max_bytes=stage_cache_mb * 1024 * 1024)
+        stage_cache.use_video(video_path)
+    pipeline = GazePipeline(model_mgr, tracker=tracker, attribute_cache=attribute_cache, stage_cache=stage_cache)
+    engine = PipelinedGazeEngine(pipeline, depth=depth) if depth > 0 else None
+
+    source = StreamSource(video_path, max_frames=max_frames, buffer_size=queue_size)
+    source.start()
+    fps = source.source_fps or 30.0 # timestamps assume 30 FPS if the file does not say
+    frame_idx = 0
+    latencies = []
+    start_time = time.time()
+    try:
+        with JsonlResultWriter(output_path) as writer:
+            while True:
+                item = source.read()
+                if item is None:
+                    break
+                frame, capture_time, _ = item
+                if engine:
+                    completed = engine.submit(frame, (frame_idx, capture_time))
+                else:
+                    completed = [((frame_idx, capture_time), pipeline.run(frame))]
+                for (idx, captured), results in completed:
+                    writer.write(idx, idx / fps, results)
+                    latencies.append(time.perf_counter() - captured)
+                frame_idx += 1
+
+                if frame_idx % 100 == 0:
+                    elapsed = time.time() - start_time
+                    print(f"{frame_idx} frames, {frame_idx / elapsed:.1f} FPS")
+
+            if engine:
+                for (idx, captured), results in engine.flush():
+                    writer.write(idx, idx / fps, results)
+                    latencies.append(time.perf_counter() - captured)
+    finally:
+        source.stop()
+        if stage_cache:
+            stage_cache.close()
+
+    if stage_cache:
+        stats = stage_cache.stats()
+        print(f"Stage cache: {stats['hit_rate'] * 100:.0f}% hits, {stats['bytes'] / 1e6:.1f} MB; recomputed "
+              + ", ".join(f"{stage} {counts['misses']}" for stage, counts in stats["stages"].items()))
+    if latencies:
+        print(f"Capture to result latency: p50 {np.percentile(latencies, 50) * 1000:.1f} ms, "
+              f"p95 {np.percentile(latencies, 95) * 1000:.1f} ms")
+    return frame_idx, time.time() - start_time, frame_idx / fps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the gaze pipeline over a video file and write results as JSONL")
+    parser.add_argument("video", help="Input video file")
+    parser.add_argument("-o", "--output", help="Output JSONL file (default: <video>.jsonl)")
+    parser.add_argument("--device", default="CPU", help="Inference device (default: CPU)")
+    parser.add_argument("--precision", default="FP16", help="Model precision (default: FP16)")
+    parser.add_argument("--model-precision", action="append", metavar="MODEL=PRECISION",
+                        help="Per-model precision override, e.g. face_detection=FP16-INT8 (repeatable)")
+    parser.add_argument("--depth", type=int, default=0, help="Frames in flight for the pipelined async engine (0 = synchronous)")
+    parser.add_argument("--detect-interval", type=int, default=1, help="Run face detection every N frames and track faces in between")
+    parser.add_argument("--cache-attributes", action="store_true", help="Reuse smoothed age/gender and emotion per face")
+    parser.add_argument("--max-frames", type=int, help="Stop after this many frames")
+    parser.add_argument("--stage-cache", metavar="DIR", help="Keep per-stage results on disk and reuse them on re-runs")
+    parser.add_argument("--stage-cache-mb", type=int, default=1024, help="Stage cache size limit in MB")
+    parser.add_argument("--embed-preprocess", action="store_true",
+                        help="Resize/layout/precision conversion inside the compiled models (see check_preprocessing.py)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Decoded frames buffered ahead of inference")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.video):
+        print(f"Error: video not found: {args.video}")
+        sys.exit(1)
+    output = args.output or os.path.splitext(args.video)[0] + ".jsonl"
+
+    frames, seconds, video_seconds = process_video(
+        args.video, output, device=args.device, precision=args.precision,
+        precisions=parse_model_precisions(args.model_precision), depth=args.depth,
+        detect_interval=args.detect_interval, cache_attributes=args.cache_attributes,
+        max_frames=args.max_frames, queue_size=args.queue_size, stage_cache_dir=args.stage_cache,
+        stage_cache_mb=args.stage_cache_mb, embed_preprocess=args.embed_preprocess)
+
+    print(f"Processed {frames} frames in {seconds:.2f}s ({frames / seconds:.1f} FPS), results in {output}")
+    if seconds > 0:
+        print(f"Speed: {video_seconds / seconds:.2f}x real time")
@@ -0,0 +1,51 @@
+import argparse
+import os
+import time
+from src.model_loader import ModelManager, MODEL_FILES, model_paths, parse_model_precisions
+from src.pipeline import GazePipeline
+from src.server import GazeServer
+
+def serve(address, device="CPU", precision="FP16", precisions=None, max_batch_size=8, max_wait_ms=5.0):
+    """
+    Loads the models once and serves GazePipeline to local clients (see
+    GazeServer) until interrupted. The per-face models get a dynamic batch
+    axis so faces from different clients run in one request.
+    """
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+    BASE_MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "intel")
+    MODEL_CACHE_DIR = os.path.join(SCRIPT_DIR, "model_cache")
+
+    options = {name: {"dynamic_batch": True} for name in MODEL_FILES if name != "face_detection"}
+    model_mgr = ModelManager(device=device, cache_dir=MODEL_CACHE_DIR)
+    model_mgr.load_models(model_paths(BASE_MODEL_DIR, precision, precisions), options=options)
+    pipeline = GazePipeline(model_mgr, batched=True)
+
+    server = GazeServer(pipeline, address, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms).start()
+    print(f"Serving on {address} (max batch {max_batch_size}, max wait {max_wait_ms} ms). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    stats = server.stats()
+    print(f"Served {stats['served']} requests ({stats['faces']} faces) in {stats['batches']} batches, "
+          f"{stats['avg_batch']:.1f} requests per batch")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the gaze pipeline to local clients with cross-client batching")
+    parser.add_argument("--socket", default="/tmp/gaze.sock", help="Unix domain socket path (default: /tmp/gaze.sock)")
+    parser.add_argument("--port", type=int, help="Listen on 127.0.0.1:PORT over TCP instead of the Unix socket")
+    parser.add_argument("--device", default="CPU", help="Inference device (default: CPU)")
+    parser.add_argument("--precision", default="FP16", help="Model precision (default: FP16)")
+    parser.add_argument("--model-precision", action="append", metavar="MODEL=PRECISION",
+                        help="Per-model precision override, e.g. face_detection=FP16-INT8 (repeatable)")
+    parser.add_argument("--max-batch", type=int, default=8, help="Most requests (and faces per model call) in one batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="How long a batch waits for more requests")
+    args = parser.parse_args()
+
+    address = ("127.0.0.1", args.port) if args.port else args.socket
+    serve(address, device=args.device, precision=args.precision,
+          precisions=parse_model_precisions(args.model_precision),
+          max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
@@ -0,0 +1,132 @@
+from collections import Counter
+import numpy as np
+
+# Reduced detector input sizes (height, width) next to the native 384x672,
+# all close to its aspect ratio
+DETECTOR_SIZES = ((288, 512), (192, 336), (128, 224))
+
+def detector_variant_name(size):
+    return f"face_detection_{size[0]}x{size[1]}"
+
+def load_detector_variants(model_manager, model_path, sizes=DETECTOR_SIZES, parallel=True):
+    """
+    Compiles the face detector once per size (ModelManager input_size), so
+    switching sizes at runtime is only a lookup. With a ModelManager
+    cache_dir the variants are cached on disk like the other models.
+    Returns the load wall time in seconds.
+    """
+    paths = {detector_variant_name(size): model_path for size in sizes}
+    options = {detector_variant_name(size): {"input_size": size} for size in sizes}
+    return model_manager.load_models(paths, options=options, parallel=parallel)
+
+class AdaptiveDetector:
+    """
+    Face detection that spends fewer pixels when it can. Plugs into
+    GazePipeline(adaptive_detector=...) behind detect_faces, so it also
+    works on the tracker's keyframes.
+
+    Once faces are known, the next detection only looks at the region
+    around them: their bounding box grown by `roi_margin` face sizes on
+    every side and widened to the detector's aspect ratio (or the whole
+    frame if that covers more than `max_roi_fraction` of it). The detector
+    size is the smallest of `sizes` (compiled with load_detector_variants)
+    and the native one at which the smallest known face still spans
+    `min_face` input pixels, so close-up faces run on a much smaller
+    network. Every `sweep_interval` detections, and whenever faces are
+    lost, a full frame detection at the native size looks for new faces.
+    Boxes are always returned in frame coordinates.
+
+    Keeps the faces of one stream, use one AdaptiveDetector per pipeline.
+    """
+    def __init__(self, sizes=DETECTOR_SIZES, sweep_interval=10, roi_margin=1.0, max_roi_fraction=0.6,
+                 min_face=64):
+        self.sizes = sizes
+        self.sweep_interval = sweep_interval
+        self.roi_margin = roi_margin
+        self.max_roi_fraction = max_roi_fraction
+        self.min_face = min_face
+
+        self.known = None # boxes of the last detection
+        self.since_sweep = 0
+        self.force_sweep = False
+
+        # Statistics, see stats()
+        self.detections = 0
+        self.sweeps = 0
+        self.roi_detections = 0
+        self.size_counts = Counter()
+
+    def region(self, frame_shape, aspect):
+        """
+        [x_min, y_min, x_max, y_max] to search for the known faces, or None
+        for the whole frame.
+        """
+        frame_h, frame_w = frame_shape[:2]
+        boxes = np.asarray(self.known)
+        x_min, y_min = boxes[:, :2].min(axis=0)
+        x_max, y_max = boxes[:, 2:].max(axis=0)
+        margin = self.roi_margin * (boxes[:, 2:] - boxes[:, :2]).max()
+        width = min(x_max - x_min + 2 * margin, frame_w)
+        height = min(y_max - y_min + 2 * margin, frame_h)
+        # Same aspect ratio as the detector input, so the region is not stretched
+        width, height = min(max(width, height * aspect), frame_w), min(max(height, width / aspect), frame_h)
+        if width * height > self.max_roi_fraction * frame_w * frame_h:
+            return None
+
+        # Centered on the faces, shifted back inside the frame
+        left = int(np.clip((x_min + x_max - width) / 2, 0, frame_w - width))
+        top = int(np.clip((y_min + y_max - height) / 2, 0, frame_h - height))
+        return [left, top, left + int(width), top + int(height)]
+
+    def choose_size(self, image_shape, native_size):
+        """The smallest detector size that keeps the smallest known face at min_face pixels."""
+        image_h, image_w = image_shape[:2]
+        boxes = np.asarray(self.known)
+        smallest = (boxes[:, 2:] - boxes[:, :2]).min()
+        for size in sorted(self.sizes, key=lambda size: size[0] * size[1]):
+            if smallest * min(size[0] / image_h, size[1] / image_w) >= self.min_face:
+                return size
+        return native_size
+
+    def detect(self, pipeline, frame, conf_threshold=0.5, top_k=None, nms_threshold=None):
+        """Face boxes for the frame, see GazePipeline.detect_faces."""
+        self.detections += 1
+        self.since_sweep += 1
+        native_size = (pipeline.h_fd, pipeline.w_fd)
+        sweep = (self.known is None or not len(self.known) or self.force_sweep
+                 or self.since_sweep >= self.sweep_interval)
+        if not sweep:
+            roi = self.region(frame.shape, native_size[1] / native_size[0])
+            image = frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+            size = self.choose_size(image.shape, native_size)
+            name = "face_detection" if size == native_size else detector_variant_name(size)
+            boxes = pipeline.run_detector(image, name, *size, conf_threshold, top_k, nms_threshold)
+            self.size_counts[size] += 1
+            if roi is not None:
+                self.roi_detections += 1
+                boxes[:, 0::2] += roi[0]
+                boxes[:, 1::2] += roi[1]
+            # All faces gone: search the whole frame right away, some gone: on the next detection
+            sweep = not len(boxes)
+            self.force_sweep = len(boxes) < len(self.known)
+
+        if sweep:
+            boxes = pipeline.run_detector(frame, "face_detection", *native_size, conf_threshold, top_k, nms_threshold)
+            self.size_counts[native_size] += 1
+            self.sweeps += 1
+            self.since_sweep = 0
+            self.force_sweep = False
+        self.known = boxes
+        return boxes
+
+    def reset(self):
+        self.known = None
+        self.force_sweep = False
+
+    def stats(self):
+        return {
+            "detections": self.detections,
+            "sweeps": self.sweeps,
+            "roi_detections": self.roi_detections,
+            "sizes": {f"{h}x{w}": count for (h, w), count in sorted(self.size_counts.items())},
+        }
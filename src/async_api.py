@@ -0,0 +1,190 @@
+import asyncio
+import time
+from collections import deque
+from src.results import FrameResult
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+class AsyncGazePipeline:
+    """
+    asyncio front end for GazePipeline: `await run_async(frame)` and
+    `async for frame, results in process(frames)` never block the event
+    loop on inference.
+
+    Every model gets `max_requests` OpenVINO infer requests. A model call
+    takes an idle one, starts it with start_async() and awaits a future that
+    the request's completion callback resolves on the event loop
+    (call_soon_threadsafe), so any number of frames and faces can be in
+    flight without a thread each. Per face, landmarks, head pose, age/gender
+    and emotion start together and gaze starts as soon as landmarks and head
+    pose are done, like process_faces_concurrent.
+
+    Backpressure: at most `max_frames` frames are processed at once, further
+    run_async() calls wait for a slot; model calls beyond max_requests wait
+    for an idle request of that model. With a load shedder on the pipeline,
+    shed models are skipped and the controller is fed each frame's time;
+    detection runs on every frame, so the shedder is capped at no_attributes.
+    The tracker, attribute cache, motion gate and stage cache are per-stream
+    state for one frame at a time and are not used here.
+    """
+    def __init__(self, pipeline, max_frames=4, max_requests=8):
+        if pipeline.fused:
+            raise ValueError("The async API runs the separate face models, fused mode is not supported")
+        self.pipeline = pipeline
+        if pipeline.load_shedder is not None:
+            # reduced_detection would only mislabel frames, detection is not strided here
+            pipeline.load_shedder.max_level = min(pipeline.load_shedder.max_level, 2)
+        self.max_frames = max_frames
+        self.max_requests = max_requests
+
+        names = ["face_detection", "gaze"] + list(pipeline.attribute_models)
+        self.idle = {}
+        for name in names:
+            idle = asyncio.Queue()
+            for _ in range(max_requests):
+                idle.put_nowait(pipeline.mm.get_model(name).create_infer_request())
+            self.idle[name] = idle
+        self.slots = asyncio.Semaphore(max_frames)
+
+        # Statistics, see stats()
+        self.frames = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def infer(self, name, inputs, parser):
+        """One inference of model `name` on an idle request, parsed with parser(results)."""
+        request = await self.idle[name].get()
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        try:
+            self.pipeline.mm.get_pool(name).write_inputs(request, inputs)
+            request.set_callback(lambda future: loop.call_soon_threadsafe(_resolve, future), done)
+            request.start_async()
+        except BaseException:
+            self.idle[name].put_nowait(request)
+            raise
+
+        try:
+            # Shielded: a cancelled caller must not hand out a request that is still running
+            await asyncio.shield(done)
+        except asyncio.CancelledError:
+            done.add_done_callback(lambda _: self.idle[name].put_nowait(request))
+            raise
+        try:
+            return parser(request.results)
+        finally:
+            self.idle[name].put_nowait(request)
+
+    async def detect_faces(self, frame):
+        pipeline = self.pipeline
+        input_data = pipeline.preprocess(frame, pipeline.h_fd, pipeline.w_fd)
+        return await self.infer("face_detection", {0: input_data},
+                                lambda results: pipeline.parse_detections(results, frame.shape))
+
+    async def _attribute(self, name, face_img):
+        _, (h, w), parser = self.pipeline.attribute_models[name]
+        return await self.infer(name, {0: self.pipeline.preprocess(face_img, h, w)}, parser)
+
+    async def _optional(self, name, face_img, shed):
+        return None if name in shed else await self._attribute(name, face_img)
+
+    async def _landmarks_and_gaze(self, face_img):
+        lm, head_pose = await asyncio.gather(self._attribute("landmarks", face_img),
+                                             self._attribute("head_pose", face_img))
+        left_eye_img, right_eye_img, eyes = self.pipeline.crop_eyes(face_img, lm)
+        gaze = None
+        if left_eye_img.size > 0 and right_eye_img.size > 0:
+            gaze = await self.infer("gaze", self.pipeline.gaze_inputs(left_eye_img, right_eye_img, head_pose),
+                                    self.pipeline.parse_gaze)
+        return lm, head_pose, eyes, gaze
+
+    async def _face(self, face_img, shed):
+        (lm, head_pose, eyes, gaze), age_gender, emotion = await asyncio.gather(
+            self._landmarks_and_gaze(face_img),
+            self._optional("age_gender", face_img, shed),
+            self._optional("emotion", face_img, shed))
+        return lm, head_pose, eyes, gaze, age_gender, emotion
+
+    async def process_faces(self, frame, faces, shed=()):
+        """Per-face models for the given boxes, all faces at once. Returns a FrameResult."""
+        boxes, face_imgs = self.pipeline.crop_faces(frame, faces)
+        outputs = await asyncio.gather(*(self._face(face_img, shed) for face_img in face_imgs))
+        results = FrameResult(len(boxes))
+        for i, (face_box, (lm, head_pose, eyes, gaze, age_gender, emotion)) in enumerate(zip(boxes, outputs)):
+            age, gender = age_gender or (None, None)
+            results.set_face(i, face_box, lm, head_pose, gaze, eyes, age, gender, emotion)
+        return results
+
+    async def run_async(self, frame, faces=None):
+        """
+        Detection (unless faces are given) and the per-face models for one
+        frame. Waits for a slot while max_frames frames are in flight.
+        """
+        load_shedder = self.pipeline.load_shedder
+        async with self.slots:
+            self.frames += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                start = time.perf_counter()
+                level = load_shedder.level if load_shedder is not None else 0
+                shed = load_shedder.shed if load_shedder is not None else ()
+                if faces is None:
+                    faces = await self.detect_faces(frame)
+                results = await self.process_faces(frame, faces, shed)
+                results.degradation = level
+                if load_shedder is not None:
+                    load_shedder.observe(time.perf_counter() - start, num_faces=len(results))
+                return results
+            finally:
+                self.in_flight -= 1
+
+    async def process(self, frames):
+        """
+        Async iterator over (frame, results) in frame order. frames may be an
+        iterable or an async iterable (e.g. capture_frames()); up to
+        max_frames of them are processed at once.
+        """
+        pending = deque()
+        try:
+            async for frame in _as_async(frames):
+                pending.append((frame, asyncio.ensure_future(self.run_async(frame))))
+                while pending and (len(pending) >= self.max_frames or pending[0][1].done()):
+                    frame, task = pending.popleft()
+                    yield frame, await task
+            while pending:
+                frame, task = pending.popleft()
+                yield frame, await task
+        finally:
+            # Stopped early or failed: drop the frames still in flight
+            for _, task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+async def _as_async(frames):
+    if hasattr(frames, "__aiter__"):
+        async for frame in frames:
+            yield frame
+    else:
+        for frame in frames:
+            yield frame
+
+async def capture_frames(source):
+    """
+    Async iterator over the frames of a started ThreadedCapture or
+    StreamSource. The blocking reads run in the loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await loop.run_in_executor(None, source.read)
+        if item is None:
+            break
+        yield item[0]
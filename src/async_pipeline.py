@@ -0,0 +1,229 @@
+import threading
+import time
+from collections import deque
+from openvino.runtime import AsyncInferQueue
+from src.results import FrameResult
+
+# Per-frame progress through the engine
+DETECT, ATTRIBUTES, GAZE, DONE = range(4)
+
+class _FrameJob:
+    def __init__(self, frame, userdata):
+        self.frame = frame
+        self.userdata = userdata
+        self.stage = DETECT
+        self.boxes = None
+        self.face_imgs = None
+        self.attributes = None
+        self.eyes = None
+        self.gaze = None
+        self.results = None
+        self.pending = 0
+        self.error = None
+        self.start = time.perf_counter()
+        self.level = 0
+        self.shed = ()
+
+class PipelinedGazeEngine:
+    """
+    Runs GazePipeline as overlapping stages over a window of in-flight frames.
+
+    Detection, the four face-attribute models and gaze each get their own
+    AsyncInferQueue, so face detection for frame N+1 runs while the attribute
+    or gaze requests of frame N are still in flight. Results are always
+    returned in submission order. `depth` is the maximum number of frames in
+    flight: more depth means more overlap, and more frames of latency.
+    With a load shedder on the pipeline, the level is picked per frame at
+    submit time and the controller is fed the submit-to-result time; only
+    the attribute levels apply here, detection runs on every frame, so the
+    shedder is capped at no_attributes.
+    """
+    def __init__(self, pipeline, depth=4, face_jobs=None):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        if pipeline.fused:
+            raise ValueError("The pipelined engine runs the separate face models, fused mode is not supported")
+
+        self.pipeline = pipeline
+        self.depth = depth
+        face_jobs = face_jobs or depth
+        if pipeline.load_shedder is not None:
+            # reduced_detection would only mislabel frames, detection is not strided here
+            pipeline.load_shedder.max_level = min(pipeline.load_shedder.max_level, 2)
+
+        self._window = deque()
+        self._cond = threading.Condition()
+        self._events = 0
+
+        self.detect_queue = AsyncInferQueue(pipeline.face_model, depth)
+        self.detect_queue.set_callback(self._on_detection)
+
+        self.attribute_queues = {}
+        for name, (model, _, parser) in pipeline.attribute_models.items():
+            queue = AsyncInferQueue(model, face_jobs)
+            queue.set_callback(self._attribute_callback(name, parser))
+            self.attribute_queues[name] = queue
+
+        self.gaze_queue = AsyncInferQueue(pipeline.gaze_model, face_jobs)
+        self.gaze_queue.set_callback(self._on_gaze)
+
+    # Callbacks run on OpenVINO worker threads. They only parse the outputs
+    # (the request is reused afterwards) and wake up the submitting thread.
+    def _notify(self, job, update):
+        with self._cond:
+            try:
+                update()
+            except Exception as e:
+                job.error = e
+            self._events += 1
+            self._cond.notify_all()
+
+    def _on_detection(self, request, job):
+        def update():
+            job.boxes = self.pipeline.parse_detections(request.results, job.frame.shape)
+        self._notify(job, update)
+
+    def _attribute_callback(self, name, parser):
+        def callback(request, userdata):
+            job, face_idx = userdata
+            def update():
+                job.attributes[face_idx][name] = parser(request.results)
+                job.pending -= 1
+            self._notify(job, update)
+        return callback
+
+    def _on_gaze(self, request, userdata):
+        job, face_idx = userdata
+        def update():
+            job.gaze[face_idx] = self.pipeline.parse_gaze(request.results)
+            job.pending -= 1
+        self._notify(job, update)
+
+    def _start_attributes(self, job):
+        job.boxes, job.face_imgs = self.pipeline.crop_faces(job.frame, job.boxes)
+        job.attributes = [{} for _ in job.face_imgs]
+        names = [name for name in self.attribute_queues if name not in job.shed]
+        job.pending = len(job.face_imgs) * len(names)
+        job.stage = ATTRIBUTES
+
+        for face_idx, face_img in enumerate(job.face_imgs):
+            for name in names:
+                _, (h, w), _ = self.pipeline.attribute_models[name]
+                input_data = self.pipeline.preprocess(face_img, h, w)
+                self.attribute_queues[name].start_async({0: input_data}, (job, face_idx))
+
+    def _start_gaze(self, job):
+        job.eyes = []
+        job.gaze = [None] * len(job.face_imgs)
+        requests = []
+        for face_idx, face_img in enumerate(job.face_imgs):
+            attributes = job.attributes[face_idx]
+            left_eye_img, right_eye_img, face_eyes = self.pipeline.crop_eyes(face_img, attributes["landmarks"])
+            job.eyes.append(face_eyes)
+            if left_eye_img.size > 0 and right_eye_img.size > 0:
+                inputs = self.pipeline.gaze_inputs(left_eye_img, right_eye_img, attributes["head_pose"])
+                requests.append((inputs, face_idx))
+
+        job.pending = len(requests)
+        job.stage = GAZE
+        for inputs, face_idx in requests:
+            self.gaze_queue.start_async(inputs, (job, face_idx))
+
+    def _finish(self, job):
+        job.results = FrameResult(len(job.boxes))
+        job.results.degradation = job.level
+        for face_idx, face_box in enumerate(job.boxes):
+            attributes = job.attributes[face_idx]
+            age, gender = attributes.get("age_gender", (None, None))
+            job.results.set_face(face_idx, face_box, attributes["landmarks"], attributes["head_pose"],
+                                 job.gaze[face_idx], job.eyes[face_idx], age, gender, attributes.get("emotion"))
+        job.stage = DONE
+        if self.pipeline.load_shedder is not None:
+            self.pipeline.load_shedder.observe(time.perf_counter() - job.start, num_faces=len(job.boxes))
+
+    def _advance(self, job):
+        """Moves a job on to its next stage once the current one has completed."""
+        with self._cond:
+            if job.error is not None:
+                raise job.error
+            detected = job.boxes is not None
+            idle = job.pending == 0
+
+        if job.stage == DETECT and detected:
+            self._start_attributes(job)
+        elif job.stage == ATTRIBUTES and idle:
+            self._start_gaze(job)
+        elif job.stage == GAZE and idle:
+            self._finish(job)
+        else:
+            return False
+        return True
+
+    def _step(self, block):
+        """
+        Advances every in-flight frame as far as possible and pops finished
+        frames from the front of the window. With block=True, waits for at
+        least one frame to finish.
+        """
+        completed = []
+        while True:
+            with self._cond:
+                events = self._events
+
+            progressed = True
+            while progressed:
+                progressed = False
+                for job in list(self._window):
+                    progressed |= self._advance(job)
+
+            while self._window and self._window[0].stage == DONE:
+                job = self._window.popleft()
+                completed.append((job.userdata, job.results))
+
+            if completed or not block or not self._window:
+                return completed
+
+            with self._cond:
+                while self._events == events:
+                    self._cond.wait()
+
+    def submit(self, frame, userdata=None):
+        """
+        Queues a frame. Blocks while `depth` frames are already in flight and
+        returns the (userdata, results) pairs that finished, in frame order.
+        """
+        completed = []
+        while len(self._window) >= self.depth:
+            completed.extend(self._step(block=True))
+
+        job = _FrameJob(frame, userdata)
+        if self.pipeline.load_shedder is not None:
+            job.level = self.pipeline.load_shedder.level
+            job.shed = self.pipeline.load_shedder.shed
+        self._window.append(job)
+        input_data = self.pipeline.preprocess(frame, self.pipeline.h_fd, self.pipeline.w_fd)
+        self.detect_queue.start_async({0: input_data}, job)
+
+        completed.extend(self._step(block=False))
+        if self.pipeline.metrics is not None:
+            self.pipeline.metrics.gauge("frames_in_flight", "Frames in the pipelined engine").set(len(self._window))
+        return completed
+
+    def poll(self):
+        """Returns the (userdata, results) pairs that finished, without blocking."""
+        return self._step(block=False)
+
+    def flush(self):
+        """Waits for every in-flight frame and returns the remaining results."""
+        completed = []
+        while self._window:
+            completed.extend(self._step(block=True))
+        return completed
+
+    def process(self, frames):
+        """
+        Generator over (frame, results) in frame order for an iterable of frames.
+        """
+        for frame in frames:
+            yield from self.submit(frame, frame)
+        yield from self.flush()
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+class _Entry:
+    def __init__(self, key, signature, frame):
+        self.key = key
+        self.signature = signature
+        self.last_seen = frame
+        self.refreshed = {}   # attribute name -> (frame, signature at refresh)
+        self.age = None
+        self.gender_votes = {}
+        self.emotion_votes = {}
+
+class AttributeCache:
+    """
+    Per-face cache for attributes that barely change from frame to frame
+    (age/gender and emotion), so their models can be skipped on most frames.
+
+    Faces are keyed by track ID (see FaceTracker). Without one, a face is
+    matched to the entry with the closest appearance signature, a tiny
+    grayscale thumbnail of the crop. Values are smoothed with an exponential
+    moving average. An attribute is re-inferred every `refresh_intervals[name]`
+    frames, or earlier when the crop changed by more than `change_threshold`
+    since its last refresh. Entries unseen for `ttl` frames are evicted, and
+    at most `max_entries` are kept (least recently seen first out, never the
+    faces of the current frame).
+    """
+    CACHED = ("age_gender", "emotion")
+
+    def __init__(self, refresh_intervals=None, change_threshold=0.15, smoothing=0.5,
+                 ttl=30, max_entries=64, match_threshold=0.1, signature_size=8):
+        self.refresh_intervals = {"age_gender": 30, "emotion": 5}
+        self.refresh_intervals.update(refresh_intervals or {})
+        self.change_threshold = change_threshold
+        self.smoothing = smoothing
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.match_threshold = match_threshold
+        self.signature_size = signature_size
+
+        self.entries = OrderedDict()
+        self.frame = 0
+        self.next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, face_img):
+        """Normalized gray thumbnail, cheap to compare between frames."""
+        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, (self.signature_size, self.signature_size), interpolation=cv2.INTER_AREA)
+        return thumb.astype(np.float32) / 255
+
+    def next_frame(self):
+        """Advances the frame counter and evicts entries past their TTL or over max_entries."""
+        self.frame += 1
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if self.frame - entry.last_seen <= self.ttl and len(self.entries) <= self.max_entries:
+                break
+            del self.entries[key]
+
+    def key_for(self, track_id, face_img):
+        """Returns the cache key of a face seen on the current frame."""
+        signature = self.signature(face_img)
+        key = track_id
+        if key is None:
+            # No tracker: closest signature among entries not seen on this frame yet
+            best, best_diff = None, self.match_threshold
+            for entry in self.entries.values():
+                if entry.last_seen == self.frame:
+                    continue
+                diff = float(np.abs(entry.signature - signature).mean())
+                if diff < best_diff:
+                    best, best_diff = entry.key, diff
+            key = best
+            if key is None:
+                key = ("signature", self.next_key)
+                self.next_key += 1
+
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = _Entry(key, signature, self.frame)
+            self.entries[key] = entry
+            # Keys already handed out on this frame stay valid, frames with
+            # more faces than max_entries are trimmed in next_frame()
+            if len(self.entries) > self.max_entries and next(iter(self.entries.values())).last_seen < self.frame:
+                self.entries.popitem(last=False)
+        entry.signature = signature
+        entry.last_seen = self.frame
+        self.entries.move_to_end(key)
+        return key
+
+    def needs_refresh(self, key, name):
+        entry = self.entries[key]
+        if name not in entry.refreshed:
+            return True
+        frame, signature = entry.refreshed[name]
+        if self.frame - frame >= self.refresh_intervals[name]:
+            return True
+        if float(np.abs(entry.signature - signature).mean()) > self.change_threshold:
+            return True
+        self.hits += 1
+        return False
+
+    def _vote(self, votes, label):
+        for other in votes:
+            votes[other] *= 1 - self.smoothing
+        votes[label] = votes.get(label, 0.0) + self.smoothing
+
+    def update(self, key, name, value):
+        """Folds a freshly inferred value into the smoothed one."""
+        entry = self.entries[key]
+        first = name not in entry.refreshed
+        entry.refreshed[name] = (self.frame, entry.signature)
+        self.misses += 1
+
+        if name == "age_gender":
+            age, gender = value
+            entry.age = age if first else (1 - self.smoothing) * entry.age + self.smoothing * age
+            self._vote(entry.gender_votes, gender)
+        elif name == "emotion":
+            self._vote(entry.emotion_votes, value)
+
+    def get(self, key, name):
+        """Smoothed value of an attribute, None if it was never inferred."""
+        entry = self.entries[key]
+        if name not in entry.refreshed:
+            return None
+        if name == "age_gender":
+            gender = max(entry.gender_votes, key=entry.gender_votes.get)
+            return int(round(entry.age)), gender
+        return max(entry.emotion_votes, key=entry.emotion_votes.get)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+
+class ThreadedCapture:
+    """
+    Reads frames from a camera index or video file on a background thread
+    into a small ring buffer, so inference never waits on the camera or
+    decoder.
+
+    policy="all" keeps every frame: the reader blocks while the buffer is
+    full (backpressure), which suits offline processing of video files.
+    policy="latest" is the low-latency mode: the reader never blocks and
+    overwrites the oldest frame, and read() skips to the newest one, so a
+    slow consumer always gets the freshest frame instead of a backlog.
+    With realtime=True frames are paced at the source's frame rate, so a
+    video file behaves like a live camera.
+
+    read() returns (frame, capture_time, index), where capture_time is the
+    time.perf_counter() value when the frame was read, or None at the end
+    of the stream.
+    """
+    POLICIES = ("all", "latest")
+
+    def __init__(self, source, policy="all", buffer_size=4, max_frames=None, realtime=False):
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+        self.source = source
+        self.policy = policy
+        self.buffer_size = buffer_size
+        self.max_frames = max_frames
+        self.realtime = realtime
+
+        self.cap = cv2.VideoCapture(source)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0 # 0 if unknown
+        self.captured = 0
+        self.dropped = 0
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._ended = False
+        self._stop = False
+        self._thread = None
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        if not self.is_opened():
+            raise IOError(f"Could not open video source: {self.source}")
+        self._thread = threading.Thread(target=self._read_loop, name=f"capture-{self.source}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _read_loop(self):
+        interval = 1.0 / self.fps if self.realtime and self.fps > 0 else 0.0
+        next_time = time.perf_counter()
+        while not self._stop and (self.max_frames is None or self.captured < self.max_frames):
+            if interval:
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            capture_time = time.perf_counter()
+
+            with self._cond:
+                if self.policy == "all":
+                    while len(self._buffer) >= self.buffer_size and not self._stop:
+                        self._cond.wait()
+                elif len(self._buffer) >= self.buffer_size:
+                    self._buffer.popleft()
+                    self.dropped += 1
+                self._buffer.append((frame, capture_time, self.captured))
+                self.captured += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+    def read(self, block=True, timeout=None):
+        """
+        Next frame as (frame, capture_time, index), None once the stream has
+        ended. Raises queue.Empty if no frame arrives in time (or at once
+        with block=False).
+        """
+        with self._cond:
+            if block:
+                if not self._cond.wait_for(lambda: self._buffer or self._ended or self._stop, timeout):
+                    raise queue.Empty
+            if self.policy == "latest":
+                while len(self._buffer) > 1:
+                    self._buffer.popleft()
+                    self.dropped += 1
+            if self._buffer:
+                item = self._buffer.popleft()
+                self._cond.notify_all()
+                return item
+            if self._ended or self._stop:
+                return None
+            raise queue.Empty
+
+    def pending(self):
+        """Frames waiting in the buffer."""
+        return len(self._buffer)
+
+    def release(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        self.cap.release()
@@ -0,0 +1,127 @@
+class LoadShedder:
+    """
+    Latency budget controller for GazePipeline. It watches the per-frame
+    time and the stage timings and, while the smoothed frame time is over
+    `budget_ms`, sheds optional work one level at a time:
+
+        0 full               everything runs
+        1 no_emotion         emotion is skipped
+        2 no_attributes      emotion and age/gender are skipped
+        3 reduced_detection  also face detection only every `detect_stride` frames
+
+    A level is entered after `patience` frames over budget. It is left after
+    `recovery` frames in which the smoothed frame time plus the estimated cost
+    of the work that would come back stays within `headroom` * budget, so the
+    controller does not flap between two levels. Skipped attributes are
+    served stale from the AttributeCache if there is one, or left unknown;
+    FrameResult.degradation tells consumers which level a frame ran at.
+
+    With shed_attributes=False (the fused face model, whose heads run in one
+    request anyway) levels 1 and 2 save nothing and are skipped: the
+    controller goes from full straight to reduced_detection and back.
+    """
+    LEVELS = ("full", "no_emotion", "no_attributes", "reduced_detection")
+    # Per level: the models that are not run
+    SHED = ((), ("emotion",), ("emotion", "age_gender"), ("emotion", "age_gender"))
+
+    def __init__(self, budget_ms=33.0, max_level=3, smoothing=0.2, patience=5, recovery=30,
+                 headroom=0.8, detect_stride=2, shed_attributes=True, metrics=None):
+        self.budget = budget_ms / 1000
+        self.max_level = min(max_level, len(self.LEVELS) - 1)
+        self.smoothing = smoothing
+        self.patience = patience
+        self.recovery = recovery
+        self.headroom = headroom
+        self.stride = detect_stride
+        self.shed_attributes = shed_attributes
+        self.metrics = metrics
+
+        self.level = 0
+        self.frame_time = None # smoothed seconds per frame at the current level
+        self.face_costs = {}   # stage -> smoothed seconds per face
+        self.detect_cost = None
+        self.faces = 0
+        self._over = 0
+        self._under = 0
+
+        # Statistics, see stats()
+        self.level_frames = [0] * len(self.LEVELS)
+        self.changes = 0
+
+    @property
+    def shed(self):
+        """Models skipped at the current level."""
+        return self.SHED[self.level] if self.shed_attributes else ()
+
+    @property
+    def detect_stride(self):
+        """Run face detection every N frames (1 = on every frame)."""
+        return self.stride if self.level >= 3 else 1
+
+    def next_level(self, step):
+        """The level one step (+1 or -1) away, skipping the attribute levels if they are off."""
+        level = self.level + step
+        if not self.shed_attributes and 0 < level < 3:
+            level = 3 if step > 0 else 0
+        return level
+
+    def _smooth(self, old, new):
+        return new if old is None else (1 - self.smoothing) * old + self.smoothing * new
+
+    def restore_cost(self):
+        """Estimated extra seconds per frame of going back one level."""
+        if self.level == 0:
+            return 0.0
+        if self.level == 3:
+            return (self.detect_cost or 0.0) * (1 - 1 / self.stride)
+        stage = self.SHED[self.level][-1]
+        return self.face_costs.get(stage, 0.0) * self.faces
+
+    def observe(self, frame_seconds, stage_seconds=None, num_faces=0):
+        """
+        Feeds the wall time of one frame, optionally with the seconds spent
+        per stage on it (see GazePipeline.stage_times, "detect" only on
+        frames that ran the detector) and its face count, and moves one
+        level up or down when needed. Returns the new level.
+        """
+        self.level_frames[self.level] += 1
+        self.frame_time = self._smooth(self.frame_time, frame_seconds)
+        self.faces = num_faces
+        for stage, seconds in (stage_seconds or {}).items():
+            if stage == "detect":
+                self.detect_cost = self._smooth(self.detect_cost, seconds)
+            elif seconds > 0 and num_faces:
+                self.face_costs[stage] = self._smooth(self.face_costs.get(stage), seconds / num_faces)
+
+        if self.frame_time > self.budget:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.patience and self.next_level(1) <= self.max_level:
+                self._set_level(self.next_level(1))
+        elif self.level > 0 and self.frame_time + self.restore_cost() <= self.headroom * self.budget:
+            self._under += 1
+            self._over = 0
+            if self._under >= self.recovery:
+                self._set_level(self.next_level(-1))
+        else:
+            self._over = self._under = 0
+        return self.level
+
+    def _set_level(self, level):
+        self.level = level
+        self.changes += 1
+        # Start measuring the new level from scratch
+        self.frame_time = None
+        self._over = self._under = 0
+        if self.metrics is not None:
+            self.metrics.gauge("degradation_level", "Active load shedding level (0 = full processing)").set(level)
+
+    def stats(self):
+        frames = sum(self.level_frames)
+        return {
+            "level": self.LEVELS[self.level],
+            "changes": self.changes,
+            "frames": frames,
+            "degraded": 1 - self.level_frames[0] / frames if frames else 0.0,
+            "level_frames": dict(zip(self.LEVELS, self.level_frames)),
+        }
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# GAZE_METRICS=0 switches instrumentation off everywhere: create_registry()
+# returns None, and the pipeline and model manager then skip every metrics
+# call behind a single `is not None` check.
+ENABLED = os.environ.get("GAZE_METRICS", "1") != "0"
+
+# Seconds, from 100 us to 1 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return {"value": self.value}
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return {"value": self.value}
+
+class Histogram:
+    """Cumulative-bucket histogram, like a Prometheus histogram."""
+    kind = "histogram"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = self.count
+            return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+class MetricsRegistry:
+    """
+    In-process metrics: counters, gauges and histograms, each identified by
+    a name and optional labels (e.g. stage="landmarks"). Metrics are created
+    on first use. snapshot() / to_json() give a JSON view, to_prometheus()
+    the Prometheus text exposition format, and serve() exposes both over HTTP.
+    """
+    def __init__(self, prefix="gaze_"):
+        self.prefix = prefix
+        self._metrics = {} # (name, labels) -> metric
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, *args):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(*args)
+                    self._metrics[key] = metric
+                    if help:
+                        self._help[name] = help
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    @contextmanager
+    def time(self, name, help="", **labels):
+        """Observes the wall time of the block, in seconds, into a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name, help, **labels).observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        """{name: {"type", "help", "series": [{"labels", ...values}]}}"""
+        # Other threads add series while this runs, copy them under the lock
+        with self._lock:
+            metrics = list(self._metrics.items())
+        snapshot = {}
+        for (name, labels), metric in sorted(metrics, key=lambda item: item[0]):
+            entry = snapshot.setdefault(self.prefix + name, {
+                "type": metric.kind, "help": self._help.get(name, ""), "series": []})
+            entry["series"].append({"labels": dict(labels), **metric.snapshot()})
+        return snapshot
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self):
+        lines = []
+        for name, entry in self.snapshot().items():
+            if entry["help"]:
+                lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            for series in entry["series"]:
+                labels = series["labels"]
+                if entry["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {series['value']}")
+                    continue
+                for bound, count in series["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serves /metrics (Prometheus text) and /metrics.json on a daemon
+        thread, on localhost only unless host is given (e.g. "0.0.0.0" for
+        every interface). Returns the server, call shutdown() on it to stop.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def create_registry(enabled=ENABLED):
+    """A new MetricsRegistry, or None when instrumentation is switched off."""
+    return MetricsRegistry() if enabled else None
@@ -0,0 +1,66 @@
+import numpy as np
+from openvino.runtime import Model, PartialShape, Type
+import openvino.runtime.opset11 as ops
+
+# The models that only need the face crop, fused into one graph
+FUSED_MODELS = ("landmarks", "head_pose", "age_gender", "emotion")
+FUSED_MODEL_NAME = "face_heads"
+
+def _rows(output):
+    """[N, ...] -> [N, K]"""
+    return ops.reshape(output, np.array([0, -1], dtype=np.int64), special_zero=True)
+
+def build_fused_model(core, model_paths, dynamic_batch=False, input_size=None):
+    """
+    Builds one OpenVINO Model out of the landmarks, head pose, age/gender and
+    emotion IRs (model_paths maps name -> .xml path). They all share one
+    input, "face": a u8 NHWC face crop of any height and width, or of
+    input_size (height, width) if given, which lets the device optimize for
+    one shape (and any batch size with dynamic_batch=True). Each
+    branch converts and resizes it (linear) to its own network size, like
+    ModelManager.embed_preprocessing. Outputs, one row per face:
+
+        landmarks  [N, 70]  normalized points
+        head_pose  [N, 3]   the head pose model's three angle outputs in order
+        age        [N]      years
+        gender     [N, 2]   female, male probabilities
+        emotion    [N, 5]   probabilities in EMOTIONS order
+    """
+    batch = -1 if dynamic_batch else 1
+    height, width = input_size or (-1, -1)
+    face = ops.parameter(PartialShape([batch, height, width, 3]), Type.u8, name="face")
+    face.output(0).get_tensor().set_names({"face"})
+    image = ops.transpose(ops.convert(face, Type.f32), np.array([0, 3, 1, 2], dtype=np.int64))
+
+    heads = {}
+    for name in FUSED_MODELS:
+        model = core.read_model(model=model_paths[name])
+        parameter = model.get_parameters()[0]
+        _, channels, height, width = parameter.get_partial_shape().to_shape()
+        if dynamic_batch:
+            model.reshape({model.inputs[0]: PartialShape([-1, channels, height, width])})
+        resized = ops.interpolate(image, np.array([height, width], dtype=np.int64), "linear", "sizes",
+                                  axes=np.array([2, 3], dtype=np.int64), name=f"{name}_resize")
+        # Feed the branch from the shared input instead of its own parameter
+        for target in parameter.output(0).get_target_inputs():
+            target.replace_source_output(resized.output(0))
+        heads[name] = [result.input_value(0) for result in model.get_results()]
+
+    outputs = {
+        "landmarks": _rows(heads["landmarks"][0]),
+        "head_pose": ops.concat([_rows(angle) for angle in heads["head_pose"]], axis=1),
+        "emotion": _rows(heads["emotion"][0]),
+    }
+    # Age and gender are told apart by shape, as in GazePipeline.parse_age_gender
+    for output in heads["age_gender"]:
+        if output.get_partial_shape()[1].get_length() == 1:
+            outputs["age"] = ops.multiply(ops.reshape(output, np.array([-1], dtype=np.int64), special_zero=False),
+                                          np.array(100, dtype=np.float32))
+        else:
+            outputs["gender"] = _rows(output)
+
+    results = []
+    for name, node in outputs.items():
+        node.output(0).get_tensor().set_names({name})
+        results.append(ops.result(node, name=name))
+    return Model(results, [face], FUSED_MODEL_NAME)
@@ -1,21 +1,202 @@
 # OpenVINO Model Loader
-from openvino.runtime import Core
+from openvino.runtime import Core, Dimension
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import os
+import queue
+import time
+
+# Model name -> Open Model Zoo model directory/file name
+MODEL_FILES = {
+    "face_detection": "face-detection-adas-0001",
+    "landmarks": "facial-landmarks-35-adas-0002",
+    "head_pose": "head-pose-estimation-adas-0001",
+    "gaze": "gaze-estimation-adas-0002",
+    "age_gender": "age-gender-recognition-retail-0013",
+    "emotion": "emotions-recognition-retail-0003",
+}
+
+def model_path(base_dir, name, precision):
+    """Path of a model's IR, e.g. <base_dir>/face-detection-adas-0001/FP16/face-detection-adas-0001.xml"""
+    model_file = MODEL_FILES[name]
+    return os.path.join(base_dir, model_file, precision, f"{model_file}.xml")
+
+def model_paths(base_dir, precision, overrides=None):
+    """
+    IR paths of all models, name -> path. Every model uses `precision`
+    ("FP32", "FP16" or "FP16-INT8") unless overrides maps its name to
+    another one, e.g. {"face_detection": "FP16-INT8"}.
+    """
+    overrides = overrides or {}
+    return {name: model_path(base_dir, name, overrides.get(name, precision)) for name in MODEL_FILES}
+
+def parse_model_precisions(items):
+    """["face_detection=FP16-INT8", ...] (command line) -> overrides dict for model_paths."""
+    overrides = {}
+    for item in items or []:
+        name, _, precision = item.partition("=")
+        if name not in MODEL_FILES or not precision:
+            raise ValueError(f"Expected <model>=<precision> with a model from {list(MODEL_FILES)}, got {item!r}")
+        overrides[name] = precision
+    return overrides
+
+class InferRequestPool:
+    """
+    A fixed set of reusable infer requests for one compiled model.
+    Requests (and their input/output tensors) are created once, so the hot
+    loop only copies data into buffers that already exist.
+    """
+    def __init__(self, compiled_model, size=1, name=None, metrics=None):
+        self.compiled_model = compiled_model
+        self.size = size
+        self.name = name
+        self.metrics = metrics
+        self.requests = [compiled_model.create_infer_request() for _ in range(size)]
+        self._idle = queue.Queue()
+        for request in self.requests:
+            self._idle.put(request)
+
+    def acquire(self):
+        """Takes an idle request, blocking until one is released."""
+        if self.metrics is None:
+            return self._idle.get()
+        start = time.perf_counter()
+        request = self._idle.get()
+        self.metrics.histogram("infer_request_wait_seconds", "Time spent waiting for an idle infer request",
+                               model=self.name).observe(time.perf_counter() - start)
+        self.metrics.gauge("infer_requests_idle", "Idle requests in the model's pool",
+                           model=self.name).set(self._idle.qsize())
+        return request
+
+    def release(self, request):
+        self._idle.put(request)
+
+    def write_inputs(self, request, inputs):
+        """
+        Writes input data into the request. Inputs are keyed by index or
+        name, like infer_new_request. The data is copied (and converted)
+        straight into the request's own input tensor. For dynamic batch
+        models the tensor is resized first, which only reallocates when the
+        batch grows past the largest one seen so far.
+        """
+        for key, data in inputs.items():
+            tensor = request.get_input_tensor(key) if isinstance(key, int) else request.get_tensor(key)
+            if tuple(tensor.shape) != data.shape:
+                tensor.shape = data.shape
+            np.copyto(tensor.data, data, casting="unsafe")
+
+    def infer(self, inputs):
+        """Synchronous inference on a pooled request. Returns the results dict."""
+        request = self.acquire()
+        try:
+            self.write_inputs(request, inputs)
+            request.infer()
+            return request.results
+        finally:
+            self.release(request)
 
 class ModelManager:
-    def __init__(self, device="CPU"):
+    def __init__(self, device="CPU", embed_preprocess=False, cache_dir=None,
+                 performance_hint=None, num_streams=None, metrics=None, perf_counts=False, thread_plan=None):
+        """
+        With embed_preprocess=True every image input of every model takes raw
+        u8 NHWC images of any size; resize, layout and precision conversion
+        are compiled into the model (see embed_preprocessing).
+        With cache_dir, compiled models are cached on disk (OpenVINO CACHE_DIR)
+        under <cache_dir>/<device>, so later starts import them instead of
+        compiling. The blob names hash the model (and so its precision) and
+        the compile options.
+        performance_hint ("LATENCY" or "THROUGHPUT") and num_streams are
+        passed to every compile_model call; THROUGHPUT with several streams
+        lets many requests (e.g. from several video sources) run in parallel.
+        metrics is an optional MetricsRegistry (see src/metrics.py) for load
+        times and request pool waits. perf_counts=True enables OpenVINO's
+        per-layer profiling, see layer_profile().
+        thread_plan is a plan from plan_threads.py (dict or JSON path) with
+        per-model CPU threads, streams, pinning and hint; they override the
+        settings above for the models it covers (see src/thread_plan.py).
+        """
         self.core = Core()
         self.device = device
+        self.embed_preprocess = embed_preprocess
+        self.cache_dir = cache_dir
+        if cache_dir:
+            self.core.set_property({"CACHE_DIR": os.path.join(cache_dir, device)})
+        self.config = {}
+        if performance_hint:
+            self.config["PERFORMANCE_HINT"] = performance_hint
+        if num_streams:
+            self.config["NUM_STREAMS"] = str(num_streams)
+        if perf_counts:
+            self.config["PERF_COUNT"] = "YES"
+        self.model_configs = {}
+        if thread_plan:
+            from src.thread_plan import plan_configs
+            self.model_configs = plan_configs(thread_plan, device)
+        self.metrics = metrics
         self.models = {}
+        self.pools = {}
+        self.input_shapes = {}
+        self.model_files = {}
+        # name -> (seconds, loaded from cache)
+        self.load_times = {}
 
-    def load_model(self, name, model_path):
-        """Loads a model and compiles it for the target device."""
+    def load_model(self, name, model_path, dynamic_batch=False, num_requests=1, input_size=None):
+        """
+        Loads a model and compiles it for the target device.
+        With dynamic_batch=True the batch dimension of every input is made
+        dynamic so several faces can be inferred in a single request.
+        num_requests is the size of the model's reusable infer request pool.
+        input_size (height, width) reshapes the image input to another
+        network size, e.g. a smaller face detector (see src/adaptive_detection.py).
+        """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model not found: {model_path}")
         
         print(f"Loading {name} from {model_path}...")
+        start_time = time.perf_counter()
         model = self.core.read_model(model=model_path)
-        compiled_model = self.core.compile_model(model=model, device_name=self.device)
+        self.model_files[name] = model_path
+        # Native network input size, the compiled input may differ
+        self.input_shapes[name] = model.inputs[0].get_partial_shape()
+        if dynamic_batch or input_size:
+            shapes = {}
+            for model_input in model.inputs:
+                shape = model_input.get_partial_shape()
+                if dynamic_batch:
+                    shape[0] = Dimension(-1)
+                if input_size and model_input.index == 0:
+                    shape[2], shape[3] = Dimension(input_size[0]), Dimension(input_size[1])
+                shapes[model_input] = shape
+            model.reshape(shapes)
+        if self.embed_preprocess:
+            model = self.embed_preprocessing(model)
+        return self._compile(name, model, start_time, num_requests)
+
+    def load_fused_model(self, model_paths, dynamic_batch=False, num_requests=1, input_size=None):
+        """
+        Loads landmarks, head pose, age/gender and emotion (model_paths maps
+        name -> path) as a single compiled model named "face_heads", see
+        src/model_fusion.py. It takes raw u8 NHWC face crops of any size, or
+        only of input_size (height, width) if given.
+        """
+        from src.model_fusion import build_fused_model, FUSED_MODEL_NAME
+        
+        for path in model_paths.values():
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Model not found: {path}")
+        print(f"Loading {FUSED_MODEL_NAME} fused from {', '.join(model_paths)}...")
+        start_time = time.perf_counter()
+        model = build_fused_model(self.core, model_paths, dynamic_batch=dynamic_batch, input_size=input_size)
+        self.input_shapes[FUSED_MODEL_NAME] = model.inputs[0].get_partial_shape()
+        return self._compile(FUSED_MODEL_NAME, model, start_time, num_requests)
+
+    def _compile(self, name, model, start_time, num_requests):
+        config = {**self.config, **self.model_configs.get(name, {})}
+        compiled_model = self.core.compile_model(model=model, device_name=self.device, config=config)
+        self.load_times[name] = (time.perf_counter() - start_time, self._loaded_from_cache(compiled_model))
+        if self.metrics is not None:
+            self.metrics.gauge("model_load_seconds", "Model read and compile time", model=name).set(self.load_times[name][0])
         
         # Verify execution device
         try:
@@ -26,7 +207,111 @@ class ModelManager:
             print(f"   -> Loaded on: {self.device} (verified)")
             
         self.models[name] = compiled_model
+        self.pools[name] = InferRequestPool(compiled_model, num_requests, name=name, metrics=self.metrics)
         return compiled_model
+
+    def load_models(self, model_paths, options=None, parallel=True, max_workers=None):
+        """
+        Loads several models, compiling them concurrently in a thread pool.
+        model_paths maps name -> path; options maps name -> extra
+        load_model keyword arguments. Returns the wall time in seconds.
+        """
+        options = options or {}
+        start_time = time.perf_counter()
+        if not parallel:
+            for name, path in model_paths.items():
+                self.load_model(name, path, **options.get(name, {}))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers or len(model_paths)) as executor:
+                futures = [executor.submit(self.load_model, name, path, **options.get(name, {}))
+                           for name, path in model_paths.items()]
+                for future in futures:
+                    future.result()
+        return time.perf_counter() - start_time
+
+    def model_identity(self, name):
+        """
+        Hash of what decides a model's outputs: its IR files (and so its
+        precision), the device and whether preprocessing is embedded. Used
+        to key cached outputs, see src/stage_cache.py.
+        """
+        import hashlib
+        
+        xml_path = self.model_files[name]
+        h = hashlib.blake2b(digest_size=16)
+        for path in (xml_path, os.path.splitext(xml_path)[0] + ".bin"):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        h.update(f"{self.device}|{self.embed_preprocess}".encode())
+        return h.hexdigest()
+
+    def optimal_requests(self, name):
+        """Number of in-flight requests the device suggests for a model (1 if unknown)."""
+        try:
+            return int(self.models[name].get_property("OPTIMAL_NUMBER_OF_INFER_REQUESTS"))
+        except Exception:
+            return 1
+
+    def _loaded_from_cache(self, compiled_model):
+        try:
+            return bool(compiled_model.get_property("LOADED_FROM_CACHE"))
+        except Exception:
+            return False
+
+    def layer_profile(self, name):
+        """
+        Per-layer-type execution time of the model's last inference on each
+        pooled request, as [(layer type, seconds)] slowest first. Needs
+        ModelManager(perf_counts=True). Also exported as metrics if enabled.
+        """
+        totals = {}
+        for request in self.pools[name].requests:
+            for info in request.profiling_info:
+                totals[info.node_type] = totals.get(info.node_type, 0.0) + info.real_time.total_seconds()
+        profile = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        if self.metrics is not None:
+            for layer_type, seconds in profile:
+                self.metrics.gauge("layer_seconds", "Execution time per layer type (last inference)",
+                                   model=name, layer_type=layer_type).set(seconds)
+        return profile
+
+    def report_load_times(self):
+        """Prints per-model load times, marking cold compiles and warm cache loads."""
+        for name, (seconds, cached) in self.load_times.items():
+            print(f"   {name:>14}: {seconds * 1000:8.1f} ms ({'warm, from cache' if cached else 'cold compile'})")
     
+    def embed_preprocessing(self, model):
+        """
+        Moves GazePipeline.preprocess into the graph with PrePostProcessor:
+        image inputs accept u8 NHWC tensors of any height/width and are
+        converted to f32, resized (linear) and transposed to NCHW on the device.
+        """
+        from openvino.runtime import Layout, Type
+        from openvino.preprocess import PrePostProcessor, ResizeAlgorithm
+        
+        ppp = PrePostProcessor(model)
+        for model_input in model.inputs:
+            # Only image inputs, e.g. not the gaze model's head_pose_angles
+            if len(model_input.get_partial_shape()) != 4:
+                continue
+            
+            input_info = ppp.input(model_input.get_any_name())
+            input_info.tensor() \
+                .set_element_type(Type.u8) \
+                .set_layout(Layout("NHWC")) \
+                .set_spatial_dynamic_shape()
+            input_info.preprocess() \
+                .convert_element_type(Type.f32) \
+                .resize(ResizeAlgorithm.RESIZE_LINEAR)
+            input_info.model().set_layout(Layout("NCHW"))
+        return ppp.build()
+
     def get_model(self, name):
         return self.models.get(name)
+
+    def get_pool(self, name):
+        return self.pools.get(name)
+
+    def infer(self, name, inputs):
+        """Runs inputs through the model's request pool instead of a new request."""
+        return self.pools[name].infer(inputs)
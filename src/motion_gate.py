@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+from src.results import FrameResult
+from src.tracker import box_iou
+
+class MotionGate:
+    """
+    Cheap change detector in front of GazePipeline for mostly static scenes.
+
+    Every frame is downscaled by `scale` to grayscale and compared with the
+    frame the last results were computed on. If the mean absolute
+    difference is below `threshold` (gray levels), the whole frame is
+    skipped and the previous FrameResult is returned again.
+
+    With per_face=True, frames that did change are also gated per face: a
+    face whose region barely changed (below `face_threshold`) since its row
+    was computed keeps that row, so only the moving faces run the per-face
+    models. Faces are matched to the previous rows by track ID, or by box
+    IoU without a tracker. Results are never reused for more than
+    `max_reuse` frames in a row, so slow drift still gets picked up.
+    """
+    def __init__(self, threshold=2.0, face_threshold=3.0, scale=0.125, per_face=True,
+                 max_reuse=30, iou_threshold=0.7, signature_size=16):
+        self.threshold = threshold
+        self.face_threshold = face_threshold
+        self.scale = scale
+        self.per_face = per_face
+        self.max_reuse = max_reuse
+        self.iou_threshold = iou_threshold
+        self.signature_size = signature_size
+
+        self.small = None      # downscaled gray current frame
+        self.reference = None  # downscaled gray frame of the last computed results
+        self.previous = None   # last FrameResult
+        self.signatures = None # (N, size, size) face regions the previous rows were computed on
+        self.reuses = None     # (N,) frames each previous row has been reused
+        self.frame_reuses = 0
+
+        # Statistics, see stats()
+        self.frames = 0
+        self.skipped_frames = 0
+        self.faces = 0
+        self.reused_faces = 0
+
+    def check_frame(self, frame):
+        """
+        Returns the previous FrameResult if the frame is static enough to
+        skip, otherwise None (run the pipeline and pass its results to
+        remember()).
+        """
+        self.frames += 1
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        self.small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self.previous is None or self.frame_reuses >= self.max_reuse:
+            return None
+        if self.reference.shape != self.small.shape:
+            return None
+        if cv2.absdiff(self.small, self.reference).mean() >= self.threshold:
+            return None
+        self.frame_reuses += 1
+        self.skipped_frames += 1
+        return self.previous
+
+    def signature(self, box):
+        """The face region of the current frame as a small gray patch."""
+        h, w = self.small.shape
+        x_min, y_min, x_max, y_max = (np.asarray(box) * self.scale).astype(int)
+        x_min, y_min = min(max(0, x_min), w - 1), min(max(0, y_min), h - 1)
+        region = self.small[y_min:max(y_max, y_min + 1), x_min:max(x_max, x_min + 1)]
+        return cv2.resize(region, (self.signature_size, self.signature_size),
+                          interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def still_faces(self, boxes, track_ids):
+        """
+        For each box, the row of the previous results it can reuse, or -1 if
+        the face has to be processed.
+        """
+        rows = np.full(len(boxes), -1, dtype=np.int64)
+        previous = self.previous
+        if not self.per_face or previous is None or self.small is None or not len(previous):
+            return rows
+
+        taken = set()
+        for i, (box, track_id) in enumerate(zip(boxes, track_ids)):
+            if track_id is not None:
+                candidates = np.flatnonzero(previous.track_ids == track_id)
+            else:
+                ious = [box_iou(box, other) for other in previous.boxes.tolist()]
+                best = int(np.argmax(ious))
+                candidates = [best] if ious[best] >= self.iou_threshold else []
+            if not len(candidates) or candidates[0] in taken:
+                continue
+            j = int(candidates[0])
+            if self.reuses[j] >= self.max_reuse:
+                continue
+            if np.abs(self.signature(box) - self.signatures[j]).mean() < self.face_threshold:
+                rows[i] = j
+                taken.add(j)
+        return rows
+
+    def reuse(self, rows, boxes):
+        """Previous rows for the still faces, moved to their current boxes."""
+        reused = self.previous.take(rows)
+        reused.boxes[:] = boxes
+        return reused
+
+    def remember(self, results, rows=None):
+        """
+        Stores the results computed for the current frame. rows[i] is the
+        previous row face i of results reused (see still_faces), -1 for
+        faces that were processed.
+        """
+        if rows is None:
+            rows = np.full(len(results), -1, dtype=np.int64)
+        signatures = np.empty((len(results), self.signature_size, self.signature_size), dtype=np.float32)
+        reuses = np.zeros(len(results), dtype=np.int32)
+        for i, row in enumerate(rows):
+            if row >= 0:
+                # Keep comparing with the frame the row was computed on
+                signatures[i] = self.signatures[row]
+                reuses[i] = self.reuses[row] + 1
+            else:
+                signatures[i] = self.signature(results.boxes[i])
+
+        self.faces += len(results)
+        self.reused_faces += int((rows >= 0).sum())
+        self.previous = results
+        self.signatures = signatures
+        self.reuses = reuses
+        self.reference = self.small
+        self.frame_reuses = 0
+
+    def reset(self):
+        self.previous = None
+        self.reference = None
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped_frames": self.skipped_frames,
+            "skip_rate": self.skipped_frames / self.frames if self.frames else 0.0,
+            "faces": self.faces,
+            "reused_faces": self.reused_faces,
+            "face_reuse_rate": self.reused_faces / self.faces if self.faces else 0.0,
+        }
+
+def merge_results(fresh, fresh_idx, reused, reused_idx):
+    """Interleaves two FrameResults back into the original face order."""
+    merged = FrameResult.concat([fresh, reused])
+    return merged.take(np.argsort(np.concatenate([fresh_idx, reused_idx]), kind="stable"))
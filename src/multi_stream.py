@@ -0,0 +1,160 @@
+import queue
+import time
+from src.async_pipeline import PipelinedGazeEngine
+from src.capture import ThreadedCapture
+
+class StreamSource:
+    """
+    One video input (camera index or video file path) with its own results
+    and counters. Frames are decoded on a ThreadedCapture reader thread into
+    a small bounded buffer; with the default policy="all" a slow consumer
+    blocks the reader instead of piling up frames.
+    """
+    def __init__(self, source, name=None, max_frames=None, buffer_size=4, policy="all", realtime=False):
+        self.source = source
+        self.name = name or str(source)
+        self.max_frames = max_frames
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.realtime = realtime
+
+        self.submitted = 0
+        self.completed = 0
+        self.results = None # results of the latest completed frame
+        self.total_latency = 0.0
+        self.start_time = None
+        self.end_time = None
+        self.finished = False
+        self.source_fps = 0.0 # frame rate reported by the source, 0 if unknown
+        self.capture = None
+
+    def start(self):
+        self.capture = ThreadedCapture(self.source, self.policy, self.buffer_size, self.max_frames, self.realtime)
+        self.capture.start()
+        self.source_fps = self.capture.fps
+        self.start_time = time.time()
+
+    def read(self, block=True, timeout=None):
+        """(frame, capture_time, index), None at the end, see ThreadedCapture.read."""
+        return self.capture.read(block, timeout)
+
+    def stop(self):
+        if self.capture:
+            self.capture.release()
+
+    def fps(self):
+        if self.start_time is None:
+            return 0.0
+        elapsed = (self.end_time or time.time()) - self.start_time
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "frames": self.completed,
+            "fps": self.fps(),
+            "avg_latency_ms": self.total_latency / self.completed * 1000 if self.completed else 0.0,
+            "dropped": self.capture.dropped if self.capture else 0,
+        }
+
+class MultiStreamRunner:
+    """
+    Runs several video sources through one shared GazePipeline.
+
+    All sources feed a single PipelinedGazeEngine, so they share the same
+    compiled models and infer requests. Frames are taken round-robin, one
+    per source per turn among the sources that have a frame ready, which
+    keeps a fast source from starving the others. Compile the models with
+    ModelManager(performance_hint="THROUGHPUT") so the device runs several
+    inference streams in parallel. `depth` (frames in flight across all
+    sources) defaults to the device's optimal number of requests, and at
+    least one per source.
+
+    on_result(source, frame, results) is called on the runner's thread for
+    every completed frame, in frame order per source.
+    """
+    def __init__(self, pipeline, sources, depth=None, on_result=None):
+        self.pipeline = pipeline
+        self.sources = [src if isinstance(src, StreamSource) else StreamSource(src) for src in sources]
+        if depth is None:
+            depth = max(len(self.sources), pipeline.mm.optimal_requests("face_detection"))
+        self.depth = depth
+        self.on_result = on_result
+        self.engine = PipelinedGazeEngine(pipeline, depth=depth)
+        self.start_time = None
+        self.end_time = None
+
+    def _complete(self, completed):
+        for (source, frame, capture_time), results in completed:
+            source.completed += 1
+            source.results = results
+            # Capture to result
+            source.total_latency += time.perf_counter() - capture_time
+            if self.on_result:
+                self.on_result(source, frame, results)
+
+    def _finish_source(self, source):
+        source.finished = True
+        source.end_time = time.time()
+
+    def _take(self, source, active, timeout=None):
+        """Submits the source's next frame if one is ready. Returns True if it did."""
+        try:
+            item = source.read(block=timeout is not None, timeout=timeout)
+        except queue.Empty:
+            return False
+        if item is None:
+            active.remove(source)
+            return False
+        frame, capture_time, _ = item
+        source.submitted += 1
+        if self.pipeline.metrics is not None:
+            self.pipeline.metrics.gauge("decode_queue_depth", "Decoded frames waiting for inference",
+                                        source=source.name).set(source.capture.pending())
+        self._complete(self.engine.submit(frame, (source, frame, capture_time)))
+        return True
+
+    def run(self):
+        """Processes every source until all of them end. Returns stats()."""
+        for source in self.sources:
+            source.start()
+        self.start_time = time.time()
+        active = list(self.sources)
+
+        try:
+            while active:
+                # One frame per source per turn
+                submitted = False
+                for source in list(active):
+                    submitted |= self._take(source, active)
+
+                if not submitted:
+                    # Nothing decoded yet: collect finished frames, then wait on the next source in turn
+                    self._complete(self.engine.poll())
+                    if active:
+                        source = active.pop(0)
+                        active.append(source)
+                        self._take(source, active, timeout=0.005)
+
+                for source in self.sources:
+                    if not source.finished and source not in active and source.completed == source.submitted:
+                        self._finish_source(source)
+
+            self._complete(self.engine.flush())
+        finally:
+            for source in self.sources:
+                source.stop()
+        for source in self.sources:
+            if not source.finished:
+                self._finish_source(source)
+        self.end_time = time.time()
+        return self.stats()
+
+    def stats(self):
+        """Per-source stats and aggregate frames per second over all sources."""
+        elapsed = (self.end_time or time.time()) - (self.start_time or time.time())
+        total = sum(source.completed for source in self.sources)
+        return {
+            "sources": {source.name: source.stats() for source in self.sources},
+            "frames": total,
+            "fps": total / elapsed if elapsed > 0 else 0.0,
+        }
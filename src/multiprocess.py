@@ -0,0 +1,245 @@
+import multiprocessing as mp
+import os
+import queue
+import traceback
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from src.model_loader import ModelManager, MODEL_FILES, model_paths
+from src.pipeline import GazePipeline
+
+class SharedFrameRing:
+    """
+    A fixed number of frame slots in one shared memory block. The producer
+    copies a frame into a free slot and only the slot index and shape travel
+    through the task queue, so pixel data is never pickled. Workers attach
+    to the block by name and read the frame in place.
+    """
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=slots * slot_bytes)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape, dtype=np.uint8):
+        """The frame in a slot as an array backed by the shared memory (no copy)."""
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot, frame):
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.shape} does not fit a {self.slot_bytes} byte slot")
+        self.view(slot, frame.shape, frame.dtype)[...] = frame
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def _worker_main(worker_id, ring_name, slots, slot_bytes, tasks, results, settings):
+    """Worker process: own ModelManager and GazePipeline, frames from the ring."""
+    try:
+        if settings["cores"]:
+            os.sched_setaffinity(0, settings["cores"])
+        ring = SharedFrameRing(slots, slot_bytes, name=ring_name)
+        model_mgr = ModelManager(device=settings["device"], cache_dir=settings["cache_dir"])
+        if settings["cores"]:
+            # One inference thread per pinned core instead of one per machine core
+            model_mgr.config["INFERENCE_NUM_THREADS"] = len(settings["cores"])
+        pipeline_options = settings["pipeline_options"]
+        options = {name: {"dynamic_batch": True} for name in MODEL_FILES
+                   if name != "face_detection" and pipeline_options.get("batched")}
+        load_time = model_mgr.load_models(model_paths(settings["model_dir"], settings["precision"],
+                                                      settings["precisions"]), options=options)
+        pipeline = GazePipeline(model_mgr, **pipeline_options)
+    except Exception:
+        results.put(("error", None, traceback.format_exc()))
+        return
+    results.put(("ready", worker_id, load_time))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, slot, shape, boxes = task
+        frame = None
+        try:
+            frame = ring.view(slot, shape)
+            if boxes is None:
+                message = ("result", seq, pipeline.run(frame))
+            else:
+                message = ("result", seq, pipeline.process_faces(frame, boxes))
+        except Exception:
+            message = ("error", seq, traceback.format_exc())
+        finally:
+            del frame # the slot is reused once the result (or error) is back
+        results.put(message)
+    ring.close()
+
+class MultiProcessPipeline:
+    """
+    Runs GazePipeline in `num_workers` processes, so the GIL-bound Python
+    side (preprocessing, crops, post-processing, result building) scales
+    over cores.
+
+    Frames are copied into a SharedFrameRing of `ring_slots` slots (each big
+    enough for max_frame_shape); workers take (slot, shape) tasks from a
+    queue and send back FrameResults, which are small. Results are returned
+    in submission order, like PipelinedGazeEngine. Each worker loads its own
+    models; with pin_cores=True the available cores are split between the
+    workers and each OpenVINO instance only uses its own. Frames go to
+    whichever worker is free, so per-stream state (FaceTracker,
+    AttributeCache, MotionGate) is not available here.
+    """
+    def __init__(self, model_dir, device="CPU", precision="FP16", precisions=None, num_workers=2,
+                 ring_slots=None, max_frame_shape=(1080, 1920, 3), pin_cores=False, cache_dir=None,
+                 pipeline_options=None):
+        self.num_workers = num_workers
+        ring_slots = ring_slots or 2 * num_workers
+        self.ring = SharedFrameRing(ring_slots, int(np.prod(max_frame_shape)))
+        self.free_slots = deque(range(ring_slots))
+
+        # spawn, not fork: forking a process that already runs OpenVINO threads is unsafe
+        context = mp.get_context("spawn")
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+
+        core_sets = [None] * num_workers
+        if pin_cores:
+            cores = sorted(os.sched_getaffinity(0))
+            core_sets = [set(part.tolist()) or None for part in np.array_split(cores, num_workers)]
+        self.workers = []
+        for worker_id in range(num_workers):
+            settings = {
+                "model_dir": model_dir,
+                "device": device,
+                "precision": precision,
+                "precisions": precisions,
+                "cache_dir": cache_dir,
+                "cores": core_sets[worker_id],
+                "pipeline_options": pipeline_options or {},
+            }
+            self.workers.append(context.Process(
+                target=_worker_main, name=f"gaze-worker-{worker_id}", daemon=True,
+                args=(worker_id, self.ring.name, ring_slots, self.ring.slot_bytes, self.tasks, self.results, settings)))
+
+        self.pending = {} # seq -> (slot, userdata)
+        self.done = {}    # seq -> (userdata, results) or None if it failed, waiting for earlier frames
+        self.ready = []   # (userdata, results) in frame order, not returned yet
+        self.failures = deque()
+        self.next_seq = 0
+        self.next_out = 0
+        self.load_times = {}
+        self.closed = False
+
+    def start(self):
+        """Starts the workers and waits until all have loaded their models."""
+        for worker in self.workers:
+            worker.start()
+        while len(self.load_times) < self.num_workers:
+            kind, worker_id, value = self._receive()
+            if kind == "error":
+                self.close()
+                raise RuntimeError(f"Worker failed to start:\n{value}")
+            self.load_times[worker_id] = value
+        return self
+
+    def _receive(self):
+        while True:
+            try:
+                return self.results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [worker.name for worker in self.workers if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Worker process died: {', '.join(dead)}")
+
+    def _collect(self, block):
+        """Handles finished frames and moves the ones that are next in order to ready."""
+        while self.pending:
+            if block:
+                message = self._receive()
+                block = False
+            else:
+                try:
+                    message = self.results.get_nowait()
+                except queue.Empty:
+                    break
+            kind, seq, value = message
+            slot, userdata = self.pending.pop(seq)
+            self.free_slots.append(slot)
+            if kind == "error":
+                # Left out of the results, reported by the next submit() or flush()
+                self.done[seq] = None
+                self.failures.append(f"Worker failed on frame {seq}:\n{value}")
+            else:
+                self.done[seq] = (userdata, value)
+
+        while self.next_out in self.done:
+            item = self.done.pop(self.next_out)
+            if item is not None:
+                self.ready.append(item)
+            self.next_out += 1
+
+    def _take(self):
+        """
+        Returns and clears the ready results, or raises for a failed frame.
+        Results ready at that point are kept for the next call, so a failed
+        frame loses nothing but itself.
+        """
+        if self.failures:
+            raise RuntimeError(self.failures.popleft())
+        completed, self.ready = self.ready, []
+        return completed
+
+    def submit(self, frame, userdata=None, boxes=None):
+        """
+        Queues a frame and returns the (userdata, results) pairs that
+        finished, in frame order. Blocks while every ring slot is in use.
+        With boxes, the workers skip detection and only run the per-face
+        models on them (GazePipeline.process_faces). Raises RuntimeError
+        once for every frame a worker failed on; the frame given here is
+        queued either way.
+        """
+        while not self.free_slots:
+            self._collect(block=True)
+
+        slot = self.free_slots.popleft()
+        self.ring.write(slot, frame)
+        self.pending[self.next_seq] = (slot, userdata)
+        self.tasks.put((self.next_seq, slot, frame.shape, None if boxes is None else np.asarray(boxes).tolist()))
+        self.next_seq += 1
+
+        self._collect(block=False)
+        return self._take()
+
+    def flush(self):
+        """
+        Waits for every queued frame and returns the remaining results.
+        Raises for a failed frame like submit(); call again for the rest.
+        """
+        while self.pending:
+            self._collect(block=True)
+        return self._take()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        started = [worker for worker in self.workers if worker.pid is not None]
+        for _ in started:
+            self.tasks.put(None)
+        for worker in started:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self.ring.close()
+        self.ring.unlink()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
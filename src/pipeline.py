@@ -1,59 +1,191 @@
 import cv2
 import numpy as np
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from src.results import FrameResult, GENDERS, EMOTIONS
+from src.motion_gate import merge_results
+from src.model_fusion import FUSED_MODEL_NAME
+
+_NO_TIMER = nullcontext()
+FACE_COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
 
 class GazePipeline:
-    def __init__(self, model_manager):
+    def __init__(self, model_manager, batched=False, concurrent=False, tracker=None,
+                 attribute_cache=None, metrics=None, load_shedder=None, motion_gate=None, fused=False,
+                 adaptive_detector=None, stage_cache=None):
         self.mm = model_manager
+        self.batched = batched
+        self.concurrent = concurrent
+        # Landmarks, head pose, age/gender and emotion in one model, see ModelManager.load_fused_model
+        self.fused = fused
+        # Optional FaceTracker: full detection only on keyframes, stable track IDs
+        self.tracker = tracker
+        # Optional AttributeCache: age/gender and emotion only re-inferred when stale
+        self.attribute_cache = attribute_cache
+        # Optional MetricsRegistry: stage/step timers and face counts, None = off
+        self.metrics = metrics
+        # Optional LoadShedder: skips optional models while over the latency budget
+        self.load_shedder = load_shedder
+        if fused and load_shedder is not None:
+            # The fused heads run together, skipping age/gender or emotion would save nothing
+            load_shedder.shed_attributes = False
+        # Optional MotionGate: reuses results for static frames and still faces (run() only)
+        self.motion_gate = motion_gate
+        # Optional AdaptiveDetector: smaller detector sizes and regions around known faces
+        self.adaptive_detector = adaptive_detector
+        # Optional StageCache: per-stage outputs on disk for re-processing (sequential mode)
+        self.stage_cache = stage_cache
+        self.detect_interval = tracker.detect_interval if tracker else 1
+        self.last_faces = None
+        self.detected = False
         self.face_model = model_manager.get_model("face_detection")
         self.landmark_model = model_manager.get_model("landmarks")
         self.head_pose_model = model_manager.get_model("head_pose")
         self.gaze_model = model_manager.get_model("gaze")
         self.age_gender_model = model_manager.get_model("age_gender")
         self.emotion_model = model_manager.get_model("emotion")
+        self.face_heads_model = model_manager.get_model(FUSED_MODEL_NAME)
+        if fused and self.face_heads_model is None:
+            raise ValueError("Fused mode requires ModelManager.load_fused_model()")
         
         # Input shapes
-        self.n_fd, self.c_fd, self.h_fd, self.w_fd = self.face_model.inputs[0].shape
+        self.n_fd, self.c_fd, self.h_fd, self.w_fd = model_manager.input_shapes["face_detection"].to_shape()
         self.h_lm, self.w_lm = 60, 60 
         self.h_hp, self.w_hp = 60, 60
         self.h_gz, self.w_gz = 60, 60
         self.h_ag, self.w_ag = 62, 62
         self.h_em, self.w_em = 64, 64
 
+        # The four models that only depend on the face crop:
+        # name -> (compiled model, input size, result parser)
+        self.attribute_models = {
+            "landmarks": (self.landmark_model, (self.h_lm, self.w_lm), self.parse_landmarks),
+            "head_pose": (self.head_pose_model, (self.h_hp, self.w_hp), self.parse_head_pose),
+            "age_gender": (self.age_gender_model, (self.h_ag, self.w_ag), self.parse_age_gender),
+            "emotion": (self.emotion_model, (self.h_em, self.w_em), self.parse_emotion),
+        }
+
+        # Accumulated seconds per stage, see timer()
+        self.stage_times = defaultdict(float)
+        self.frames = 0
+
+        # Batched mode runs every per-face model once per frame, which needs
+        # models loaded with ModelManager.load_model(..., dynamic_batch=True)
+        if batched:
+            models = (self.face_heads_model, self.gaze_model) if fused else (
+                self.landmark_model, self.head_pose_model, self.gaze_model, self.age_gender_model, self.emotion_model)
+            for model in models:
+                if not model.inputs[0].get_partial_shape()[0].is_dynamic:
+                    raise ValueError("Batched mode requires models loaded with dynamic_batch=True")
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Adds the wall time spent inside the block to stage_times[stage], and
+        to the stage_seconds histogram if metrics are on.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_times[stage] += elapsed
+            if self.metrics is not None:
+                self.metrics.histogram("stage_seconds", "Wall time per pipeline stage", stage=stage).observe(elapsed)
+
+    def profile(self, step):
+        """
+        timer() for the fine-grained Python-side steps (preprocess, crop_eye,
+        postprocess) that run inside the model stages. Only active with
+        metrics, otherwise a shared no-op context.
+        """
+        if self.metrics is None:
+            return _NO_TIMER
+        return self.timer(step)
+
+    def reset_stage_times(self):
+        self.stage_times.clear()
+        self.frames = 0
+
     def preprocess(self, frame, h, w):
         """Prepares the frame for network input."""
-        resized = cv2.resize(frame, (w, h))
-        transposed = resized.transpose(2, 0, 1)
-        input_data = np.expand_dims(transposed, axis=0)
+        if self.mm.embed_preprocess:
+            # Resize, HWC->CHW and u8->f32 run inside the compiled model
+            return frame[np.newaxis]
+        
+        with self.profile("preprocess"):
+            resized = cv2.resize(frame, (w, h))
+            transposed = resized.transpose(2, 0, 1)
+            input_data = np.expand_dims(transposed, axis=0)
         return input_data
 
-    def detect_faces(self, frame, conf_threshold=0.5):
+    def preprocess_batch(self, images, h, w):
+        """Stacks several images into a single NCHW batch."""
+        with self.profile("preprocess"):
+            if self.mm.embed_preprocess:
+                # One tensor needs one size, so resize here straight into the
+                # NHWC batch and leave layout/precision to the compiled model
+                batch = np.empty((len(images), h, w, 3), dtype=np.uint8)
+                for i, image in enumerate(images):
+                    cv2.resize(image, (w, h), dst=batch[i])
+                return batch
+            
+            batch = np.empty((len(images), 3, h, w), dtype=images[0].dtype)
+            for i, image in enumerate(images):
+                batch[i] = cv2.resize(image, (w, h)).transpose(2, 0, 1)
+            return batch
+
+    def detect_faces(self, frame, conf_threshold=0.5, top_k=None, nms_threshold=None):
         """
-        Runs face detection. Returns list of [x_min, y_min, x_max, y_max].
+        Runs face detection. Returns an (N, 4) int32 array of
+        [x_min, y_min, x_max, y_max] boxes, see parse_detections.
+        With an AdaptiveDetector the detector input size and region follow
+        the faces found before.
+        """
+        if self.adaptive_detector is not None:
+            return self.adaptive_detector.detect(self, frame, conf_threshold, top_k, nms_threshold)
+        return self.cached_stage("face_detection", (self.frame_key(frame), conf_threshold, top_k, nms_threshold),
+                                 lambda: self.run_detector(frame, "face_detection", self.h_fd, self.w_fd,
+                                                           conf_threshold, top_k, nms_threshold))
+
+    def frame_key(self, frame):
+        return self.stage_cache.frame_key(frame) if self.stage_cache is not None else None
+
+    def cached_stage(self, stage, key, compute):
+        """compute() for one stage, through the StageCache if there is one."""
+        if self.stage_cache is None:
+            return compute()
+        return self.stage_cache.get_or_compute(stage, self.mm, key, compute)
+
+    def run_detector(self, image, name, h, w, conf_threshold=0.5, top_k=None, nms_threshold=None):
+        """Face detection with the detector model `name` of input size h x w, boxes in image coordinates."""
+        input_data = self.preprocess(image, h, w)
+        results = self.mm.infer(name, {0: input_data})
+        with self.profile("postprocess"):
+            return self.parse_detections(results, image.shape, conf_threshold, top_k, nms_threshold)
+
+    def parse_detections(self, results, frame_shape, conf_threshold=0.5, top_k=None, nms_threshold=None):
         """
-        input_data = self.preprocess(frame, self.h_fd, self.w_fd)
-        results = self.face_model.infer_new_request({0: input_data})
+        Turns raw SSD output into clipped [x_min, y_min, x_max, y_max] boxes,
+        all rows at once. Optionally keeps only the top_k most confident
+        boxes and/or runs NMS with nms_threshold (IoU) on top of the model's own.
+        """
+        detections = next(iter(results.values())).reshape(-1, 7)
+        detections = detections[detections[:, 2] > conf_threshold]
+        if top_k is not None:
+            detections = detections[np.argsort(-detections[:, 2], kind="stable")[:top_k]]
         
-        detections = next(iter(results.values()))
-        detections = detections.reshape(-1, 7)
+        h, w = frame_shape[:2]
+        # Truncate like int(), then clip to the frame
+        boxes = (detections[:, 3:7] * np.array([w, h, w, h], dtype=np.float32)).astype(np.int32)
+        np.clip(boxes[:, 0::2], 0, w, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, h, out=boxes[:, 1::2])
         
-        boxes = []
-        h, w = frame.shape[:2]
-        
-        for detection in detections:
-            conf = detection[2]
-            if conf > conf_threshold:
-                x_min = int(detection[3] * w)
-                y_min = int(detection[4] * h)
-                x_max = int(detection[5] * w)
-                y_max = int(detection[6] * h)
-                
-                # Clip
-                x_min = max(0, x_min)
-                y_min = max(0, y_min)
-                x_max = min(w, x_max)
-                y_max = min(h, y_max)
-                
-                boxes.append([x_min, y_min, x_max, y_max])
+        if nms_threshold is not None and len(boxes):
+            xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+            keep = cv2.dnn.NMSBoxes(xywh.tolist(), detections[:, 2].tolist(), conf_threshold, nms_threshold)
+            boxes = boxes[np.asarray(keep, dtype=np.int64).reshape(-1)]
         return boxes
 
     def get_landmarks(self, face_img):
@@ -61,7 +193,10 @@ class GazePipeline:
         Returns 35 landmarks (flattened array of 70 floats).
         """
         input_data = self.preprocess(face_img, self.h_lm, self.w_lm)
-        results = self.landmark_model.infer_new_request({0: input_data})
+        results = self.mm.infer("landmarks", {0: input_data})
+        return self.parse_landmarks(results)
+
+    def parse_landmarks(self, results):
         return next(iter(results.values())).flatten()
 
     def get_head_pose(self, face_img):
@@ -69,8 +204,10 @@ class GazePipeline:
         Returns (yaw, pitch, roll) angles.
         """
         input_data = self.preprocess(face_img, self.h_hp, self.w_hp)
-        results = self.head_pose_model.infer_new_request({0: input_data})
-        
+        results = self.mm.infer("head_pose", {0: input_data})
+        return self.parse_head_pose(results)
+
+    def parse_head_pose(self, results):
         yaw = results[self.head_pose_model.outputs[0]][0][0]
         pitch = results[self.head_pose_model.outputs[1]][0][0]
         roll = results[self.head_pose_model.outputs[2]][0][0]
@@ -82,8 +219,10 @@ class GazePipeline:
         Gender: 0 - Female, 1 - Male
         """
         input_data = self.preprocess(face_img, self.h_ag, self.w_ag)
-        results = self.age_gender_model.infer_new_request({0: input_data})
-        
+        results = self.mm.infer("age_gender", {0: input_data})
+        return self.parse_age_gender(results)
+
+    def parse_age_gender(self, results):
         # Outputs: 'age_conv3', 'prob'
         # Determine keys dynamically or rely on order if known.
         # Often: 
@@ -108,12 +247,130 @@ class GazePipeline:
         Classes: neutral, happy, sad, surprise, anger
         """
         input_data = self.preprocess(face_img, self.h_em, self.w_em)
-        results = self.emotion_model.infer_new_request({0: input_data})
-        
+        results = self.mm.infer("emotion", {0: input_data})
+        return self.parse_emotion(results)
+
+    def parse_emotion(self, results):
         # Output: [1, 5, 1, 1]
         probs = next(iter(results.values())).flatten()
-        classes = ["neutral", "happy", "sad", "surprise", "anger"]
-        return classes[np.argmax(probs)]
+        return EMOTIONS[np.argmax(probs)]
+
+    def get_landmarks_batch(self, face_imgs):
+        """
+        Batched get_landmarks. Returns one array of 70 floats per face.
+        """
+        input_data = self.preprocess_batch(face_imgs, self.h_lm, self.w_lm)
+        results = self.mm.infer("landmarks", {0: input_data})
+        return list(next(iter(results.values())).reshape(len(face_imgs), -1))
+
+    def get_head_pose_batch(self, face_imgs):
+        """
+        Batched get_head_pose. Returns one (yaw, pitch, roll) tuple per face.
+        """
+        input_data = self.preprocess_batch(face_imgs, self.h_hp, self.w_hp)
+        results = self.mm.infer("head_pose", {0: input_data})
+
+        yaw = results[self.head_pose_model.outputs[0]][:, 0]
+        pitch = results[self.head_pose_model.outputs[1]][:, 0]
+        roll = results[self.head_pose_model.outputs[2]][:, 0]
+        return list(zip(yaw, pitch, roll))
+
+    def get_age_gender_batch(self, face_imgs):
+        """
+        Batched get_age_gender. Returns one (age, gender_str) tuple per face.
+        """
+        input_data = self.preprocess_batch(face_imgs, self.h_ag, self.w_ag)
+        results = self.mm.infer("age_gender", {0: input_data})
+        
+        # Same outputs as the single face version with a batch axis in front:
+        #   age [N, 1, 1, 1], gender [N, 2, 1, 1]
+        ages = np.zeros(len(face_imgs))
+        gender_probs = np.full((len(face_imgs), 2), 0.5)
+        
+        for node, res in results.items():
+            if res.shape[1] == 1:
+                ages = res[:, 0, 0, 0] * 100
+            elif res.shape[1] == 2:
+                gender_probs = res[:, :, 0, 0]
+        
+        return [(int(age), "Female" if prob[0] > prob[1] else "Male")
+                for age, prob in zip(ages, gender_probs)]
+
+    def get_emotion_batch(self, face_imgs):
+        """
+        Batched get_emotion. Returns one emotion string per face.
+        """
+        input_data = self.preprocess_batch(face_imgs, self.h_em, self.w_em)
+        results = self.mm.infer("emotion", {0: input_data})
+        
+        probs = next(iter(results.values())).reshape(len(face_imgs), -1)
+        return [EMOTIONS[i] for i in np.argmax(probs, axis=1)]
+
+    def get_face_heads(self, face_img):
+        """
+        Landmarks, head pose, age/gender and emotion of one face from the
+        fused model in a single request. The raw crop goes in as is, the
+        model resizes it per head. Returns output name -> array with one row.
+        """
+        results = self.mm.infer(FUSED_MODEL_NAME, {0: face_img[np.newaxis]})
+        return self.parse_face_heads(results)
+
+    def get_face_heads_batch(self, face_imgs):
+        """
+        Batched get_face_heads. One tensor needs one size, so smaller crops
+        are scaled up to the largest one first. Scaling up keeps their detail
+        for the model's own resize, shrinking everything to one small size
+        would resample twice and cost accuracy.
+        """
+        with self.profile("preprocess"):
+            h = max(face_img.shape[0] for face_img in face_imgs)
+            w = max(face_img.shape[1] for face_img in face_imgs)
+            batch = np.empty((len(face_imgs), h, w, 3), dtype=np.uint8)
+            for i, face_img in enumerate(face_imgs):
+                cv2.resize(face_img, (w, h), dst=batch[i])
+        results = self.mm.infer(FUSED_MODEL_NAME, {0: batch})
+        return self.parse_face_heads(results)
+
+    def parse_face_heads(self, results):
+        return {output.get_any_name(): value for output, value in results.items()}
+
+    def eye_centers(self, lm):
+        """
+        Returns normalized (left, right) eye centers from the landmarks.
+        """
+        le_center = ((lm[0] + lm[2])/2, (lm[1] + lm[3])/2)
+        re_center = ((lm[4] + lm[6])/2, (lm[5] + lm[7])/2)
+        return le_center, re_center
+
+    def crop_eyes(self, face_img, lm):
+        """
+        Returns (left_eye_img, right_eye_img, (le_c_px, re_c_px)) for a face.
+        """
+        with self.profile("crop_eye"):
+            le_center, re_center = self.eye_centers(lm)
+            left_eye_img, le_c_px = self.crop_eye(face_img, le_center)
+            right_eye_img, re_c_px = self.crop_eye(face_img, re_center)
+        return left_eye_img, right_eye_img, (le_c_px, re_c_px)
+
+    def crop_faces(self, frame, faces, track_ids=None):
+        """
+        Returns (boxes, face_imgs), skipping boxes with zero width or height.
+        With track_ids, returns (boxes, face_imgs, track_ids) for the kept boxes.
+        """
+        boxes = []
+        face_imgs = []
+        kept_ids = []
+        for i, face_box in enumerate(faces):
+            x_min, y_min, x_max, y_max = face_box
+            if x_max - x_min <= 0 or y_max - y_min <= 0: continue
+            
+            boxes.append(face_box)
+            face_imgs.append(frame[y_min:y_max, x_min:x_max])
+            if track_ids is not None:
+                kept_ids.append(track_ids[i])
+        if track_ids is None:
+            return boxes, face_imgs
+        return boxes, face_imgs, kept_ids
 
     def crop_eye(self, face_img, eye_center_norm, scale=2.5):
         """
@@ -139,60 +396,401 @@ class GazePipeline:
         """
         Returns gaze vector (x, y, z).
         """
+        inputs = self.gaze_inputs(left_eye_img, right_eye_img, head_pose_angles)
+        results = self.mm.infer("gaze", inputs)
+        return self.parse_gaze(results)
+
+    def gaze_inputs(self, left_eye_img, right_eye_img, head_pose_angles):
         le_input = self.preprocess(left_eye_img, self.h_gz, self.w_gz)
         re_input = self.preprocess(right_eye_img, self.h_gz, self.w_gz)
         hp_input = np.array(head_pose_angles).reshape(1, 3)
         
-        inputs = {
+        return {
             "left_eye_image": le_input,
             "right_eye_image": re_input,
             "head_pose_angles": hp_input
         }
-        
-        results = self.gaze_model.infer_new_request(inputs)
+
+    def parse_gaze(self, results):
         gaze_vector = next(iter(results.values()))[0]
         return gaze_vector
 
+    def get_gaze_batch(self, left_eye_imgs, right_eye_imgs, head_poses):
+        """
+        Batched get_gaze. Returns one gaze vector (x, y, z) per eye pair.
+        """
+        le_input = self.preprocess_batch(left_eye_imgs, self.h_gz, self.w_gz)
+        re_input = self.preprocess_batch(right_eye_imgs, self.h_gz, self.w_gz)
+        hp_input = np.array(head_poses).reshape(-1, 3)
+        
+        inputs = {
+            "left_eye_image": le_input,
+            "right_eye_image": re_input,
+            "head_pose_angles": hp_input
+        }
+        
+        results = self.mm.infer("gaze", inputs)
+        return list(next(iter(results.values())))
+
     def run(self, frame):
         """
         Main pipeline: Face -> [Landmarks, Head Pose, Age/Gender, Emotion] -> Gaze
         """
-        faces = self.detect_faces(frame)
+        self.frames += 1
+        # Before the motion gate, so gated frames keep the frame index of the ones after them
+        if self.stage_cache is not None:
+            self.stage_cache.next_frame(frame)
+        if self.motion_gate is not None:
+            previous = self.motion_gate.check_frame(frame)
+            if previous is not None:
+                if self.metrics is not None:
+                    self.metrics.counter("gated_frames_total", "Frames answered with the previous results").inc()
+                return previous
+        if self.attribute_cache is not None:
+            self.attribute_cache.next_frame()
+        if self.load_shedder is None:
+            return self.run_frame(frame)
         
-        results = []
-        for face_box in faces:
-            # 1. Crop face
-            x_min, y_min, x_max, y_max = face_box
-            if x_max - x_min == 0 or y_max - y_min == 0: continue
-            
-            face_img = frame[y_min:y_max, x_min:x_max]
+        # Feed the frame time and the cost of the sheddable stages to the controller
+        level = self.load_shedder.level
+        before = dict(self.stage_times)
+        start = time.perf_counter()
+        results = self.run_frame(frame, self.load_shedder.detect_stride)
+        elapsed = time.perf_counter() - start
+        results.degradation = level
+        stages = ("detect", "age_gender", "emotion") if self.detected else ("age_gender", "emotion")
+        self.load_shedder.observe(elapsed, {stage: self.stage_times[stage] - before.get(stage, 0.0) for stage in stages},
+                                  len(results))
+        return results
+
+    def run_frame(self, frame, detect_stride=1):
+        """
+        Detection (or tracking) and the per-face models for one frame. With
+        detect_stride > 1, face detection only runs every detect_stride
+        frames: the tracker's interval is stretched, or without a tracker the
+        last boxes are reused.
+        """
+        if self.tracker is None:
+            self.detected = detect_stride == 1 or self.last_faces is None or self.frames % detect_stride == 0
+            if self.detected:
+                with self.timer("detect"):
+                    self.last_faces = self.detect_faces(frame)
+            return self.process_faces(frame, self.last_faces)
+        
+        self.tracker.detect_interval = self.detect_interval * detect_stride
+        detections = self.tracker.detections
+        with self.timer("detect"):
+            faces, track_ids = self.tracker.update(frame, self.detect_faces)
+        self.detected = self.tracker.detections > detections
+        return self.process_faces(frame, faces, track_ids)
+
+    def process_faces(self, frame, faces, track_ids=None):
+        """
+        Runs every per-face model on the given face boxes and returns a
+        FrameResult. track_ids (one per box) key the attribute cache, if
+        there is one, and are kept in FrameResult.track_ids.
+        """
+        if track_ids is None:
+            track_ids = [None] * len(faces)
+        if self.metrics is not None:
+            self.metrics.counter("frames_total", "Frames processed").inc()
+            self.metrics.histogram("faces_per_frame", "Faces per processed frame",
+                                   buckets=FACE_COUNT_BUCKETS).observe(len(faces))
+        with self.timer("per_face"):
+            if self.motion_gate is not None and self.motion_gate.small is not None:
+                return self.process_faces_gated(frame, faces, track_ids)
+            return self.process_faces_mode(frame, faces, track_ids)
+
+    def process_faces_mode(self, frame, faces, track_ids):
+        if self.fused:
+            return self.process_faces_fused(frame, faces, track_ids)
+        if self.batched:
+            return self.process_faces_batched(frame, faces, track_ids)
+        if self.concurrent:
+            return self.process_faces_concurrent(frame, faces, track_ids)
+        return self.process_faces_sequential(frame, faces, track_ids)
+
+    def process_crops(self, boxes, face_imgs, track_ids=None):
+        """
+        Runs the per-face models on face crops from any number of frames in
+        one batch per model (batched mode). boxes are kept as they are.
+        """
+        if not self.batched:
+            raise ValueError("process_crops requires batched mode")
+        if track_ids is None:
+            track_ids = [None] * len(face_imgs)
+        with self.timer("per_face"):
+            if self.fused:
+                return self.process_crops_fused(boxes, face_imgs, track_ids)
+            return self.process_crops_batched(boxes, face_imgs, track_ids)
+
+    def process_faces_gated(self, frame, faces, track_ids):
+        """
+        process_faces behind the motion gate: faces whose region did not
+        change keep their previous row, only the others run the models.
+        """
+        gate = self.motion_gate
+        boxes, _, track_ids = self.crop_faces(frame, faces, track_ids)
+        rows = gate.still_faces(boxes, track_ids)
+        moving = np.flatnonzero(rows < 0)
+        still = np.flatnonzero(rows >= 0)
+        
+        fresh = self.process_faces_mode(frame, [boxes[i] for i in moving], [track_ids[i] for i in moving])
+        if len(still):
+            reused = gate.reuse(rows[still], [boxes[i] for i in still])
+            results = merge_results(fresh, moving, reused, still)
+            if self.metrics is not None:
+                self.metrics.counter("gated_faces_total", "Faces answered with their previous results").inc(len(still))
+        else:
+            results = fresh
+        gate.remember(results, rows)
+        return results
+
+    def cache_key(self, track_id, face_img):
+        if self.attribute_cache is None:
+            return None
+        return self.attribute_cache.key_for(track_id, face_img)
+
+    @property
+    def shed(self):
+        """Models the load shedder currently skips."""
+        return self.load_shedder.shed if self.load_shedder is not None else ()
+
+    def needs_inference(self, key, name):
+        """
+        False if the model is shed or the attribute cache can answer for
+        this face and model.
+        """
+        if name in self.shed:
+            return False
+        if self.attribute_cache is None or name not in self.attribute_cache.CACHED:
+            return True
+        return self.attribute_cache.needs_refresh(key, name)
+
+    def cached_attribute(self, key, name, value=None):
+        """
+        Stores a freshly inferred value (if any) and returns the cached one,
+        None if there is none.
+        """
+        if self.attribute_cache is None or name not in self.attribute_cache.CACHED:
+            return value
+        if value is not None:
+            self.attribute_cache.update(key, name, value)
+        return self.attribute_cache.get(key, name)
+
+    def process_faces_sequential(self, frame, faces, track_ids):
+        """
+        One blocking request per model and face.
+        """
+        # 1. Crop faces
+        boxes, face_imgs, track_ids = self.crop_faces(frame, faces, track_ids)
+        frame_key = self.frame_key(frame)
+        results = FrameResult(len(boxes), track_ids)
+        for i, (face_box, face_img, track_id) in enumerate(zip(boxes, face_imgs, track_ids)):
+            key = self.cache_key(track_id, face_img)
+            # The crop is the box of the frame, see StageCache
+            face_key = (frame_key, tuple(int(v) for v in face_box))
             
-            # 2. Parallel Inferences
-            lm = self.get_landmarks(face_img)
-            yaw, pitch, roll = self.get_head_pose(face_img)
-            age, gender = self.get_age_gender(face_img)
-            emotion = self.get_emotion(face_img)
+            # 2. Attribute Inferences, one after another
+            with self.timer("landmarks"):
+                lm = self.cached_stage("landmarks", face_key, lambda: self.get_landmarks(face_img))
+            with self.timer("head_pose"):
+                yaw, pitch, roll = self.cached_stage("head_pose", face_key, lambda: self.get_head_pose(face_img))
+            age_gender = emotion = None
+            if self.needs_inference(key, "age_gender"):
+                with self.timer("age_gender"):
+                    age_gender = self.cached_stage("age_gender", face_key, lambda: self.get_age_gender(face_img))
+            if self.needs_inference(key, "emotion"):
+                with self.timer("emotion"):
+                    emotion = self.cached_stage("emotion", face_key, lambda: self.get_emotion(face_img))
+            age, gender = self.cached_attribute(key, "age_gender", age_gender) or (None, None)
+            emotion = self.cached_attribute(key, "emotion", emotion)
             
             # 3. Gaze Estimation
-            le_center = ((lm[0] + lm[2])/2, (lm[1] + lm[3])/2)
-            re_center = ((lm[4] + lm[6])/2, (lm[5] + lm[7])/2)
-            
-            left_eye_img, le_c_px = self.crop_eye(face_img, le_center)
-            right_eye_img, re_c_px = self.crop_eye(face_img, re_center)
+            left_eye_img, right_eye_img, (le_c_px, re_c_px) = self.crop_eyes(face_img, lm)
             
             gaze_vector = None
             if left_eye_img.size > 0 and right_eye_img.size > 0:
-                gaze_vector = self.get_gaze(left_eye_img, right_eye_img, (yaw, pitch, roll))
+                head_pose = (yaw, pitch, roll)
+                with self.timer("gaze"):
+                    gaze_vector = self.cached_stage(
+                        "gaze", face_key + (le_c_px, re_c_px, np.array(head_pose, dtype=np.float32)),
+                        lambda: self.get_gaze(left_eye_img, right_eye_img, head_pose))
+            
+            results.set_face(i, face_box, lm, (yaw, pitch, roll), gaze_vector,
+                             (le_c_px, re_c_px), age, gender, emotion)
             
-            results.append({
-                "box": face_box,
-                "landmarks": lm,
-                "head_pose": (yaw, pitch, roll),
-                "gaze": gaze_vector,
-                "eyes": (le_c_px, re_c_px),
-                "age": age,
-                "gender": gender,
-                "emotion": emotion
-            })
+        return results
+
+    def _join(self, requests, name):
+        """Waits for the in-flight request of a model and returns its parsed result."""
+        request = requests[name]
+        request.wait()
+        # Device-side latency of this request, the wall time overlaps with the other models
+        self.stage_times[name] += request.latency / 1000
+        if name == "gaze":
+            return self.parse_gaze(request.results)
+        return self.attribute_models[name][2](request.results)
+
+    def process_faces_concurrent(self, frame, faces, track_ids):
+        """
+        Dependency-aware dispatch per face. Landmarks, head pose, age/gender
+        and emotion only need the face crop, so all four are started at once.
+        Gaze needs landmarks and head pose only: it is started as soon as
+        those two are joined, while age/gender and emotion may still run.
+        """
+        boxes, face_imgs, track_ids = self.crop_faces(frame, faces, track_ids)
+        
+        # One pooled request per model, held for the whole frame
+        pools = {name: self.mm.get_pool(name) for name in list(self.attribute_models) + ["gaze"]}
+        requests = {name: pool.acquire() for name, pool in pools.items()}
+        try:
+            results = FrameResult(len(boxes), track_ids)
+            for i, (face_box, face_img, track_id) in enumerate(zip(boxes, face_imgs, track_ids)):
+                key = self.cache_key(track_id, face_img)
+                started = [name for name in self.attribute_models if self.needs_inference(key, name)]
+                for name in started:
+                    _, (h, w), _ = self.attribute_models[name]
+                    pools[name].write_inputs(requests[name], {0: self.preprocess(face_img, h, w)})
+                    requests[name].start_async()
+                
+                lm = self._join(requests, "landmarks")
+                head_pose = self._join(requests, "head_pose")
+                
+                left_eye_img, right_eye_img, eyes = self.crop_eyes(face_img, lm)
+                has_gaze = left_eye_img.size > 0 and right_eye_img.size > 0
+                if has_gaze:
+                    pools["gaze"].write_inputs(requests["gaze"], self.gaze_inputs(left_eye_img, right_eye_img, head_pose))
+                    requests["gaze"].start_async()
+                
+                age_gender = self._join(requests, "age_gender") if "age_gender" in started else None
+                emotion = self._join(requests, "emotion") if "emotion" in started else None
+                age, gender = self.cached_attribute(key, "age_gender", age_gender) or (None, None)
+                emotion = self.cached_attribute(key, "emotion", emotion)
+                gaze_vector = self._join(requests, "gaze") if has_gaze else None
+                
+                results.set_face(i, face_box, lm, head_pose, gaze_vector, eyes, age, gender, emotion)
+        finally:
+            for name, request in requests.items():
+                pools[name].release(request)
+        
+        return results
+
+    def process_faces_fused(self, frame, faces, track_ids):
+        """
+        process_faces with the fused face model: landmarks, head pose,
+        age/gender and emotion come from one request per face (or one per
+        frame in batched mode) instead of four. Gaze runs as usual.
+        """
+        boxes, face_imgs, track_ids = self.crop_faces(frame, faces, track_ids)
+        return self.process_crops_fused(boxes, face_imgs, track_ids)
+
+    def process_crops_fused(self, boxes, face_imgs, track_ids):
+        """The model part of process_faces_fused on ready face crops."""
+        results = FrameResult(len(boxes), track_ids)
+        if not face_imgs:
+            return results
+        
+        with self.timer("face_heads"):
+            if self.batched:
+                heads = self.get_face_heads_batch(face_imgs)
+            else:
+                rows = [self.get_face_heads(face_img) for face_img in face_imgs]
+                heads = {name: np.concatenate([row[name] for row in rows]) for name in rows[0]}
+        
+        eyes = []
+        gaze_faces, left_eye_imgs, right_eye_imgs, gaze_poses = [], [], [], []
+        for i, face_img in enumerate(face_imgs):
+            left_eye_img, right_eye_img, face_eyes = self.crop_eyes(face_img, heads["landmarks"][i])
+            eyes.append(face_eyes)
+            if left_eye_img.size > 0 and right_eye_img.size > 0:
+                gaze_faces.append(i)
+                left_eye_imgs.append(left_eye_img)
+                right_eye_imgs.append(right_eye_img)
+                gaze_poses.append(heads["head_pose"][i])
+        
+        gaze_vectors = [None] * len(face_imgs)
+        if gaze_faces:
+            with self.timer("gaze"):
+                if self.batched:
+                    gaze_batch = self.get_gaze_batch(left_eye_imgs, right_eye_imgs, gaze_poses)
+                else:
+                    gaze_batch = [self.get_gaze(*eye_pair) for eye_pair in zip(left_eye_imgs, right_eye_imgs, gaze_poses)]
+            for i, gaze_vector in zip(gaze_faces, gaze_batch):
+                gaze_vectors[i] = gaze_vector
+        
+        for i, (face_box, face_img, track_id) in enumerate(zip(boxes, face_imgs, track_ids)):
+            key = self.cache_key(track_id, face_img)
+            female, male = heads["gender"][i]
+            age_gender = int(heads["age"][i]), GENDERS[0] if female > male else GENDERS[1]
+            emotion = EMOTIONS[int(np.argmax(heads["emotion"][i]))]
+            age, gender = self.cached_attribute(key, "age_gender", age_gender) or (None, None)
+            emotion = self.cached_attribute(key, "emotion", emotion)
+            results.set_face(i, face_box, heads["landmarks"][i], heads["head_pose"][i], gaze_vectors[i],
+                             eyes[i], age, gender, emotion)
+        
+        return results
+
+    def process_faces_batched(self, frame, faces, track_ids):
+        """
+        Same as process_faces, but stacks all faces (and all eye pairs) into
+        one batch per model so each model runs once per frame.
+        """
+        boxes, face_imgs, track_ids = self.crop_faces(frame, faces, track_ids)
+        return self.process_crops_batched(boxes, face_imgs, track_ids)
+
+    def process_crops_batched(self, boxes, face_imgs, track_ids):
+        """
+        The model part of process_faces_batched on ready face crops, which
+        may come from different frames (see src/server.py).
+        """
+        if not face_imgs:
+            return FrameResult()
+        keys = [self.cache_key(track_id, face_img) for track_id, face_img in zip(track_ids, face_imgs)]
+        
+        # 1. One request per model for all faces
+        with self.timer("landmarks"):
+            landmarks = self.get_landmarks_batch(face_imgs)
+        with self.timer("head_pose"):
+            head_poses = self.get_head_pose_batch(face_imgs)
+        
+        # Age/gender and emotion only for the faces the cache cannot answer
+        cached = {}
+        for name, infer in (("age_gender", self.get_age_gender_batch), ("emotion", self.get_emotion_batch)):
+            values = [None] * len(face_imgs)
+            todo = [i for i, key in enumerate(keys) if self.needs_inference(key, name)]
+            if todo:
+                with self.timer(name):
+                    for i, value in zip(todo, infer([face_imgs[i] for i in todo])):
+                        values[i] = value
+            cached[name] = [self.cached_attribute(key, name, value) for key, value in zip(keys, values)]
+        ages_genders, emotions = cached["age_gender"], cached["emotion"]
+        
+        # 2. Gaze for every face with two valid eye crops
+        eyes = []
+        gaze_faces, left_eye_imgs, right_eye_imgs, gaze_poses = [], [], [], []
+        for i, (face_img, lm) in enumerate(zip(face_imgs, landmarks)):
+            left_eye_img, right_eye_img, face_eyes = self.crop_eyes(face_img, lm)
+            eyes.append(face_eyes)
             
+            if left_eye_img.size > 0 and right_eye_img.size > 0:
+                gaze_faces.append(i)
+                left_eye_imgs.append(left_eye_img)
+                right_eye_imgs.append(right_eye_img)
+                gaze_poses.append(head_poses[i])
+        
+        gaze_vectors = [None] * len(face_imgs)
+        if gaze_faces:
+            with self.timer("gaze"):
+                gaze_batch = self.get_gaze_batch(left_eye_imgs, right_eye_imgs, gaze_poses)
+            for i, gaze_vector in zip(gaze_faces, gaze_batch):
+                gaze_vectors[i] = gaze_vector
+        
+        # 3. Scatter back per face
+        results = FrameResult(len(boxes), track_ids)
+        for i, face_box in enumerate(boxes):
+            age, gender = ages_genders[i] or (None, None)
+            results.set_face(i, face_box, landmarks[i], head_poses[i], gaze_vectors[i],
+                             eyes[i], age, gender, emotions[i])
+        
         return results
@@ -0,0 +1,76 @@
+import threading
+import time
+import cv2
+from src.utils import draw_results
+
+class Renderer:
+    """
+    Draws results and shows them in a window on its own thread, so overlay
+    drawing and imshow stay off the inference thread.
+
+    submit() only hands over the newest (frame, results): if the renderer is
+    still busy with an older frame, the frame waiting before it is dropped,
+    so the window always shows the latest result and never falls behind.
+    The window's key handling runs here too; `closed` is set once ESC is
+    pressed. Some platforms (e.g. macOS) only allow GUI calls on the main
+    thread, use headless mode there or draw inline.
+    """
+    def __init__(self, window_name="Gaze Estimation Project", metrics=None):
+        self.window_name = window_name
+        self.metrics = metrics
+        self.rendered = 0
+        self.dropped = 0
+        self.closed = threading.Event()
+
+        self._pending = None
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="renderer", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, results, text=None):
+        """Queues a frame to draw, replacing one that was not drawn yet."""
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+                if self.metrics is not None:
+                    self.metrics.counter("render_dropped_total", "Frames replaced before they were drawn").inc()
+            self._pending = (frame, results, text)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._pending is None and not self._stop:
+                    self._cond.wait(0.05)
+                if self._stop:
+                    break
+                item, self._pending = self._pending, None
+            if item is None:
+                # Keep the window responsive while no frames arrive
+                self._poll_keys()
+                continue
+
+            frame, results, text = item
+            start = time.perf_counter()
+            draw_results(frame, results)
+            if text:
+                cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.imshow(self.window_name, frame)
+            self._poll_keys()
+            self.rendered += 1
+            if self.metrics is not None:
+                self.metrics.histogram("stage_seconds", "Wall time per pipeline stage",
+                                       stage="render").observe(time.perf_counter() - start)
+        if self.rendered:
+            cv2.destroyWindow(self.window_name)
+
+    def _poll_keys(self):
+        if cv2.waitKey(1) == 27: # ESC
+            self.closed.set()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,62 @@
+import json
+import numpy as np
+from src.results import GENDERS, EMOTIONS
+
+def to_builtin(value, decimals=4):
+    """Converts pipeline results (numpy arrays/scalars, tuples) to JSON types, rounding floats."""
+    if isinstance(value, dict):
+        return {key: to_builtin(item, decimals) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind != "f":
+            return value.tolist()
+        rounded = np.round(value, decimals)
+        if np.isnan(rounded).any():
+            # JSON has no NaN: missing values (e.g. no gaze) become null
+            rounded = np.where(np.isnan(rounded), None, rounded)
+        return rounded.tolist()
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item, decimals) for item in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), decimals)
+    return value
+
+class JsonlResultWriter:
+    """
+    Streams per-frame results to a JSON Lines file, one frame per line,
+    with the FrameResult columns as arrays (one row per face):
+    {"frame": index, "time": seconds, "faces": N, "degradation": level, "boxes": [[...], ...], ...}
+    Gender and emotion are label indices (255 = not inferred), listed once
+    in a header line {"genders": [...], "emotions": [...]}. Lines are written as they come,
+    so memory use does not grow with the video length. Use as a context
+    manager or call close().
+    """
+    def __init__(self, path, decimals=4, flush_every=100):
+        self.path = path
+        self.decimals = decimals
+        self.flush_every = flush_every
+        self.frames = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(json.dumps({"genders": GENDERS, "emotions": EMOTIONS}) + "\n")
+
+    def write(self, frame_idx, timestamp, results):
+        record = {"frame": frame_idx, "time": round(timestamp, 3), "faces": len(results),
+                  "degradation": results.degradation}
+        record.update(to_builtin(results.to_columns(), self.decimals))
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
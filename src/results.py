@@ -0,0 +1,125 @@
+import numpy as np
+
+GENDERS = ("Female", "Male")
+EMOTIONS = ("neutral", "happy", "sad", "surprise", "anger")
+LANDMARK_VALUES = 70 # 35 (x, y) points
+UNKNOWN = 255 # gender/emotion code of an attribute that was not inferred
+
+_GENDER_CODES = {label: code for code, label in enumerate(GENDERS)}
+_EMOTION_CODES = {label: code for code, label in enumerate(EMOTIONS)}
+
+class FrameResult:
+    """
+    Results of one frame as a struct of arrays, one row per face:
+
+        boxes      (N, 4)  int32    x_min, y_min, x_max, y_max in frame pixels
+        landmarks  (N, 70) float32  35 (x, y) points, normalized to the face box
+        head_pose  (N, 3)  float32  yaw, pitch, roll in degrees
+        gaze       (N, 3)  float32  gaze vector, NaN when the eyes could not be cropped
+        eyes       (N, 2, 2) int32  left and right eye centers in face pixels
+        age        (N,)    int16    -1 when not inferred
+        gender     (N,)    uint8    index into GENDERS, UNKNOWN when not inferred
+        emotion    (N,)    uint8    index into EMOTIONS, UNKNOWN when not inferred
+        track_ids  (N,)    int32    -1 without a tracker
+
+    `degradation` is the load shedding level the frame ran at (see
+    LoadShedder, 0 = full processing); above 0 some attributes are stale or
+    unknown. Rows are filled with set_face(). face(i) and to_dicts() build
+    the old per-face dicts on demand, to_columns() hands out the arrays by name.
+    """
+    __slots__ = ("boxes", "landmarks", "head_pose", "gaze", "eyes", "age", "gender", "emotion", "track_ids",
+                 "degradation")
+    COLUMNS = __slots__[:-1]
+
+    def __init__(self, num_faces=0, track_ids=None):
+        self.boxes = np.zeros((num_faces, 4), dtype=np.int32)
+        self.landmarks = np.zeros((num_faces, LANDMARK_VALUES), dtype=np.float32)
+        self.head_pose = np.zeros((num_faces, 3), dtype=np.float32)
+        self.gaze = np.full((num_faces, 3), np.nan, dtype=np.float32)
+        self.eyes = np.zeros((num_faces, 2, 2), dtype=np.int32)
+        self.age = np.zeros(num_faces, dtype=np.int16)
+        self.gender = np.zeros(num_faces, dtype=np.uint8)
+        self.emotion = np.zeros(num_faces, dtype=np.uint8)
+        self.track_ids = np.full(num_faces, -1, dtype=np.int32)
+        if track_ids is not None:
+            self.track_ids[:] = [-1 if track_id is None else track_id for track_id in track_ids]
+        self.degradation = 0
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def set_face(self, i, box, landmarks, head_pose, gaze, eyes, age, gender, emotion):
+        """
+        Fills row i. gender and emotion are labels. gaze, age/gender and
+        emotion may be None (not available).
+        """
+        self.boxes[i] = box
+        self.landmarks[i] = landmarks
+        self.head_pose[i] = head_pose
+        if gaze is not None:
+            self.gaze[i] = gaze
+        self.eyes[i] = eyes
+        self.age[i] = -1 if age is None else age
+        self.gender[i] = UNKNOWN if gender is None else _GENDER_CODES[gender]
+        self.emotion[i] = UNKNOWN if emotion is None else _EMOTION_CODES[emotion]
+
+    @property
+    def has_gaze(self):
+        return ~np.isnan(self.gaze[:, 0])
+
+    def face(self, i):
+        """One face as a dict of Python values."""
+        face = {
+            "box": self.boxes[i].tolist(),
+            "landmarks": self.landmarks[i],
+            "head_pose": tuple(self.head_pose[i].tolist()),
+            "gaze": self.gaze[i] if self.has_gaze[i] else None,
+            "eyes": tuple(tuple(eye) for eye in self.eyes[i].tolist()),
+            "age": int(self.age[i]) if self.age[i] >= 0 else None,
+            "gender": GENDERS[self.gender[i]] if self.gender[i] != UNKNOWN else None,
+            "emotion": EMOTIONS[self.emotion[i]] if self.emotion[i] != UNKNOWN else None,
+        }
+        if self.track_ids[i] >= 0:
+            face["track_id"] = int(self.track_ids[i])
+        return face
+
+    def take(self, rows):
+        """New FrameResult with the given rows (indices or boolean mask)."""
+        result = FrameResult()
+        for name in self.COLUMNS:
+            setattr(result, name, getattr(self, name)[rows])
+        result.degradation = self.degradation
+        return result
+
+    @staticmethod
+    def concat(parts):
+        """Stacks the rows of several FrameResults, keeping the highest degradation."""
+        result = FrameResult()
+        for name in FrameResult.COLUMNS:
+            setattr(result, name, np.concatenate([getattr(part, name) for part in parts]))
+        result.degradation = max(part.degradation for part in parts)
+        return result
+
+    def to_bytes(self):
+        """The raw column data in COLUMNS order, see from_bytes."""
+        return b"".join(np.ascontiguousarray(getattr(self, name)).tobytes() for name in self.COLUMNS)
+
+    @staticmethod
+    def from_bytes(data, num_faces, degradation=0):
+        """Rebuilds a FrameResult of num_faces rows from to_bytes() output."""
+        result = FrameResult(num_faces)
+        offset = 0
+        for name in FrameResult.COLUMNS:
+            column = getattr(result, name)
+            values = np.frombuffer(data, dtype=column.dtype, count=column.size, offset=offset)
+            setattr(result, name, values.reshape(column.shape))
+            offset += column.nbytes
+        result.degradation = degradation
+        return result
+
+    def to_dicts(self):
+        return [self.face(i) for i in range(len(self))]
+
+    def to_columns(self):
+        """name -> array, in the order of COLUMNS."""
+        return {name: getattr(self, name) for name in self.COLUMNS}
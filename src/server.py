@@ -0,0 +1,270 @@
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from src.results import FrameResult
+
+# Wire format, every message is a little-endian uint32 length and a body.
+# Request body: header, then num_boxes int32 [x_min, y_min, x_max, y_max]
+# boxes, then height * width * 3 bytes of BGR pixels.
+# Response body: header, then FrameResult.to_bytes() or a UTF-8 error message.
+LENGTH = struct.Struct("<I")
+REQUEST = struct.Struct("<IBHHH")   # request id, kind, height, width, number of boxes
+RESPONSE = struct.Struct("<IBBH")   # request id, status, degradation, number of faces
+
+FRAME, FACES = 0, 1 # detect faces on the server / use the given boxes
+OK, ERROR = 0, 1
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError("Connection closed")
+        view = view[received:]
+    return buffer
+
+def _recv_message(sock):
+    size, = LENGTH.unpack(_recv_exact(sock, LENGTH.size))
+    return _recv_exact(sock, size)
+
+def _send_message(sock, *parts):
+    size = sum(memoryview(part).nbytes for part in parts)
+    sock.sendall(b"".join([LENGTH.pack(size), *parts]))
+
+def _open_socket(address):
+    """A path is a Unix domain socket, (host, port) a TCP socket."""
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+class _Request:
+    def __init__(self, connection, request_id, frame, boxes):
+        self.connection = connection
+        self.request_id = request_id
+        self.frame = frame
+        self.boxes = boxes
+        self.received = time.perf_counter()
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, *parts):
+        with self.lock:
+            _send_message(self.sock, *parts)
+
+class GazeServer:
+    """
+    Hosts one GazePipeline for many local clients, so the models are loaded
+    once and work from different clients can share a batch.
+
+    Clients send frames (faces are detected here) or face crops with their
+    boxes over a Unix domain socket or localhost TCP in a compact binary
+    format (see the wire format above). Requests from all connections go
+    into one queue; the batcher takes up to `max_batch_size` of them,
+    waiting at most `max_wait_ms` after the first for more to arrive, then
+    runs detection per frame and every per-face model once for all faces
+    of the batch (at most max_batch_size faces per model call). The
+    pipeline must be batched (models loaded with dynamic_batch=True), and
+    keeps no per-client state (no tracker or caches).
+    """
+    def __init__(self, pipeline, address, max_batch_size=8, max_wait_ms=5.0):
+        if not pipeline.batched:
+            raise ValueError("GazeServer requires a batched GazePipeline")
+        self.pipeline = pipeline
+        self.address = address
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = pipeline.metrics
+
+        self.requests = queue.Queue()
+        self._stop = threading.Event()
+        self._sock = None
+        self._threads = []
+
+        # Statistics, see stats()
+        self.batches = 0
+        self.served = 0
+        self.faces = 0
+
+    def start(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self._sock = _open_socket(self.address)
+        if not isinstance(self.address, str):
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(self.address)
+        self._sock.listen()
+        self._sock.settimeout(0.1) # so the accept loop notices stop()
+        for target, name in ((self._accept_loop, "server-accept"), (self._batch_loop, "server-batcher")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break # socket closed by stop()
+            sock.settimeout(None)
+            threading.Thread(target=self._read_loop, args=(_Connection(sock),), daemon=True).start()
+
+    def _read_loop(self, connection):
+        """Decodes the requests of one client connection into the batch queue."""
+        try:
+            while True:
+                body = _recv_message(connection.sock)
+                request_id, kind, height, width, num_boxes = REQUEST.unpack_from(body)
+                offset = REQUEST.size
+                boxes = None
+                if kind == FACES:
+                    boxes = np.frombuffer(body, dtype=np.int32, count=num_boxes * 4, offset=offset).reshape(-1, 4)
+                    if not num_boxes:
+                        boxes = np.array([[0, 0, width, height]], dtype=np.int32) # a single face crop
+                offset += num_boxes * 16
+                frame = np.frombuffer(body, dtype=np.uint8, count=height * width * 3, offset=offset)
+                self.requests.put(_Request(connection, request_id, frame.reshape(height, width, 3), boxes))
+        except (OSError, ValueError, struct.error):
+            pass # closed, or a malformed request
+        finally:
+            connection.sock.close()
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self.requests.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            results = self.run_batch([(request.frame, request.boxes) for request in batch])
+        except Exception as e:
+            message = f"{type(e).__name__}: {e}".encode("utf-8")
+            for request in batch:
+                self._reply(request, RESPONSE.pack(request.request_id, ERROR, 0, 0), message)
+            return
+
+        self.batches += 1
+        self.served += len(batch)
+        if self.metrics is not None:
+            self.metrics.histogram("server_batch_requests", "Requests per server batch",
+                                   buckets=(1, 2, 4, 8, 16, 32)).observe(len(batch))
+        for request, result in zip(batch, results):
+            self._reply(request, RESPONSE.pack(request.request_id, OK, result.degradation, len(result)),
+                        result.to_bytes())
+            if self.metrics is not None:
+                self.metrics.histogram("server_request_seconds", "Time from receiving a request to its reply"
+                                       ).observe(time.perf_counter() - request.received)
+
+    def _reply(self, request, *parts):
+        try:
+            request.connection.send(*parts)
+        except OSError:
+            pass # the client went away
+
+    def run_batch(self, items):
+        """
+        [(frame, boxes or None)] -> one FrameResult per item. Detection runs
+        per frame, the per-face models once per max_batch_size faces.
+        """
+        boxes, face_imgs, counts = [], [], []
+        for frame, item_boxes in items:
+            if item_boxes is None:
+                with self.pipeline.timer("detect"):
+                    item_boxes = self.pipeline.detect_faces(frame)
+            kept, crops = self.pipeline.crop_faces(frame, item_boxes)
+            boxes.extend(kept)
+            face_imgs.extend(crops)
+            counts.append(len(crops))
+        self.faces += len(face_imgs)
+
+        parts = [self.pipeline.process_crops(boxes[start:start + self.max_batch_size],
+                                             face_imgs[start:start + self.max_batch_size])
+                 for start in range(0, len(face_imgs), self.max_batch_size)]
+        merged = FrameResult.concat(parts) if parts else FrameResult()
+
+        offsets = np.cumsum([0] + counts)
+        return [merged.take(slice(offsets[i], offsets[i + 1])) for i in range(len(items))]
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        if self._sock is not None:
+            self._sock.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def stats(self):
+        return {
+            "served": self.served,
+            "batches": self.batches,
+            "avg_batch": self.served / self.batches if self.batches else 0.0,
+            "faces": self.faces,
+        }
+
+class GazeClient:
+    """
+    Client for GazeServer. infer() sends one frame (or face crops with
+    boxes) and waits for its FrameResult. One client is one connection;
+    use one per thread.
+    """
+    def __init__(self, address, timeout=None):
+        self.sock = _open_socket(address)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self.next_id = 0
+
+    def infer(self, frame, boxes=None):
+        """
+        Faces are detected on the server unless boxes are given. Use
+        boxes=[] to send a single face crop.
+        """
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        height, width = frame.shape[:2]
+        box_data = b"" if boxes is None else np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        kind = FRAME if boxes is None else FACES
+        request_id = self.next_id
+        self.next_id += 1
+        header = REQUEST.pack(request_id, kind, height, width, len(box_data))
+        _send_message(self.sock, header, b"" if boxes is None else box_data.tobytes(), frame.data)
+
+        body = _recv_message(self.sock)
+        response_id, status, degradation, num_faces = RESPONSE.unpack_from(body)
+        if response_id != request_id:
+            raise ConnectionError(f"Expected response {request_id}, got {response_id}")
+        if status != OK:
+            raise RuntimeError(f"Server error: {bytes(body[RESPONSE.size:]).decode('utf-8')}")
+        return FrameResult.from_bytes(memoryview(body)[RESPONSE.size:], num_faces, degradation)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,259 @@
+import glob
+import hashlib
+import os
+import numpy as np
+from src.results import GENDERS, EMOTIONS
+
+MAX_CACHED_FACES = 64 # detections with more faces are not cached
+
+def _encode_detections(boxes):
+    if len(boxes) > MAX_CACHED_FACES:
+        return None
+    record = np.zeros(1 + 4 * MAX_CACHED_FACES, dtype=np.float32)
+    record[0] = len(boxes)
+    record[1:1 + 4 * len(boxes)] = np.asarray(boxes).reshape(-1)
+    return record
+
+def _decode_detections(record):
+    count = int(record[0])
+    return record[1:1 + 4 * count].astype(np.int32).reshape(count, 4)
+
+# Stage -> (record size in float32 values, encode, decode). Encoders return
+# None for values that should not be cached.
+STAGES = {
+    "face_detection": (1 + 4 * MAX_CACHED_FACES, _encode_detections, _decode_detections),
+    "landmarks": (70, lambda lm: np.asarray(lm, dtype=np.float32), lambda record: record.copy()),
+    "head_pose": (3, lambda angles: np.asarray(angles, dtype=np.float32),
+                  lambda record: tuple(float(angle) for angle in record)),
+    "age_gender": (2, lambda value: np.array([value[0], GENDERS.index(value[1])], dtype=np.float32),
+                   lambda record: (int(record[0]), GENDERS[int(record[1])])),
+    "emotion": (1, lambda value: np.array([EMOTIONS.index(value)], dtype=np.float32),
+                lambda record: EMOTIONS[int(record[0])]),
+    "gaze": (3, lambda vector: np.asarray(vector, dtype=np.float32), lambda record: list(record)),
+}
+
+def digest(*parts):
+    """16 byte content hash of arrays, bytes and plain values."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(repr((part.shape, part.dtype.str)).encode())
+            h.update(np.ascontiguousarray(part).data)
+        elif isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(repr(part).encode())
+        h.update(b"|")
+    return h.digest()
+
+class StageStore:
+    """
+    Records of one stage in fixed-size chunk files: chunk_NNNNNN.npy is a
+    memory-mapped (chunk_records, record_size) float32 array and
+    chunk_NNNNNN.keys.npy the keys of its rows. New records always go to a
+    fresh chunk, the chunks of earlier runs are only read. Eviction drops
+    whole chunks, oldest first.
+    """
+    def __init__(self, directory, record_size, chunk_records=1024):
+        self.directory = directory
+        self.record_size = record_size
+        self.chunk_records = chunk_records
+        os.makedirs(directory, exist_ok=True)
+
+        self.index = {}      # key -> (chunk, row)
+        self.chunk_keys = {} # chunk -> keys, for eviction
+        self.readers = {}    # chunk -> read-only memmap
+        for keys_path in sorted(glob.glob(os.path.join(directory, "chunk_*.keys.npy"))):
+            chunk = int(os.path.basename(keys_path)[6:12])
+            keys = [key.tobytes() for key in np.load(keys_path)]
+            self.chunk_keys[chunk] = keys
+            for row, key in enumerate(keys):
+                self.index[key] = (chunk, row)
+        # Chunks without keys were never flushed (e.g. the process was killed)
+        for data_path in glob.glob(os.path.join(directory, "chunk_*.npy")):
+            name = os.path.basename(data_path)
+            if not name.endswith(".keys.npy") and int(name[6:12]) not in self.chunk_keys:
+                os.remove(data_path)
+        self.next_chunk = max(self.chunk_keys, default=-1) + 1
+        self.writer = None # (chunk, writable memmap, keys)
+
+    def chunk_path(self, chunk, suffix=".npy"):
+        return os.path.join(self.directory, f"chunk_{chunk:06d}{suffix}")
+
+    def get(self, key):
+        location = self.index.get(key)
+        if location is None:
+            return None
+        chunk, row = location
+        if self.writer is not None and chunk == self.writer[0]:
+            return self.writer[1][row]
+        if chunk not in self.readers:
+            self.readers[chunk] = np.load(self.chunk_path(chunk), mmap_mode="r")
+        return self.readers[chunk][row]
+
+    def put(self, key, record):
+        if self.writer is None or len(self.writer[2]) == self.chunk_records:
+            self.flush()
+            chunk = self.next_chunk
+            self.next_chunk += 1
+            data = np.lib.format.open_memmap(self.chunk_path(chunk), mode="w+", dtype=np.float32,
+                                             shape=(self.chunk_records, self.record_size))
+            self.writer = (chunk, data, [])
+            self.chunk_keys[chunk] = self.writer[2]
+        chunk, data, keys = self.writer
+        data[len(keys)] = record
+        self.index[key] = (chunk, len(keys))
+        keys.append(key)
+
+    def flush(self):
+        """Writes the open chunk's keys, so its records survive a restart."""
+        if self.writer is None:
+            return
+        chunk, data, keys = self.writer
+        data.flush()
+        # Raw uint8 rows, fixed-size byte strings would drop trailing zero bytes
+        np.save(self.chunk_path(chunk, ".keys.npy"), np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, 16))
+
+    def close(self):
+        self.flush()
+        self.writer = None
+        self.readers.clear()
+
+    def nbytes(self):
+        """Bytes of the stored records (chunks are preallocated but sparse)."""
+        return sum(len(keys) for keys in self.chunk_keys.values()) * self.record_size * 4
+
+    def oldest_chunk(self):
+        """The oldest chunk that can be evicted (not the one being written), or None."""
+        writing = self.writer[0] if self.writer is not None else None
+        return min((chunk for chunk in self.chunk_keys if chunk != writing), default=None)
+
+    def evict(self, chunk):
+        for key in self.chunk_keys.pop(chunk):
+            if self.index.get(key, (None,))[0] == chunk:
+                del self.index[key]
+        self.readers.pop(chunk, None)
+        for suffix in (".npy", ".keys.npy"):
+            if os.path.exists(self.chunk_path(chunk, suffix)):
+                os.remove(self.chunk_path(chunk, suffix))
+
+class StageCache:
+    """
+    Content-addressed on-disk cache of per-stage outputs, so re-processing a
+    video after changing one model (or its precision) only reruns what that
+    change invalidates. Plugs into GazePipeline(stage_cache=...), sequential
+    mode.
+
+    Every record is keyed by the model's identity (hash of its IR files,
+    device and preprocessing, see ModelManager.model_identity) and the
+    stage's input: the frame (content hash, or video file + frame index
+    after use_video()), plus the face box for the face models, plus the eye
+    centers (which place the eye crops) and head pose angles for gaze.
+    Because the gaze key is built from the landmarks and head pose outputs,
+    a new landmarks model also invalidates gaze, while a new emotion model
+    only reruns emotion.
+
+    Detections, landmarks, head pose, age/gender, emotion and gaze are
+    stored separately (see StageStore) under `directory`. When the cache
+    grows past max_bytes the oldest chunks of any stage are evicted (not
+    the ones still being written). Call close() (or flush()) at the end, so
+    the records written since the last full chunk are kept.
+    """
+    def __init__(self, directory, max_bytes=1 << 30, chunk_records=1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stores = {stage: StageStore(os.path.join(directory, stage), size, chunk_records)
+                       for stage, (size, _, _) in STAGES.items()}
+        self.identities = {}
+
+        self.source = None    # video identity, see use_video
+        self.index = -1       # frame index within the video
+        self.frame_ref = None # (frame, key) of the current frame
+
+        # Statistics, see stats()
+        self.hits = {stage: 0 for stage in STAGES}
+        self.misses = {stage: 0 for stage in STAGES}
+        self.evictions = 0
+
+    def use_video(self, path):
+        """
+        Keys frames by this video file (path, size, modification time) and
+        frame index instead of hashing their pixels. Call before the first
+        frame; every GazePipeline.run() is one frame.
+        """
+        info = os.stat(path)
+        self.source = digest(os.path.abspath(path), info.st_size, info.st_mtime_ns)
+        self.index = -1
+
+    def next_frame(self, frame):
+        self.index += 1
+        self.frame_ref = (frame, digest(self.source, self.index) if self.source is not None else digest(frame))
+
+    def frame_key(self, frame):
+        """Key of the frame given to the last next_frame(), or of any other frame by content."""
+        if self.frame_ref is not None and self.frame_ref[0] is frame:
+            return self.frame_ref[1]
+        return digest(frame)
+
+    def model_identity(self, model_manager, stage):
+        if stage not in self.identities:
+            self.identities[stage] = model_manager.model_identity(stage)
+        return self.identities[stage]
+
+    def get_or_compute(self, stage, model_manager, key, compute):
+        """The cached output of `stage` for key, or compute() stored for next time."""
+        _, encode, decode = STAGES[stage]
+        store = self.stores[stage]
+        record_key = digest(self.model_identity(model_manager, stage), *key)
+        record = store.get(record_key)
+        if record is not None:
+            self.hits[stage] += 1
+            return decode(record)
+
+        self.misses[stage] += 1
+        value = compute()
+        record = encode(value)
+        if record is not None:
+            store.put(record_key, record)
+            self.evict()
+        return value
+
+    def nbytes(self):
+        return sum(store.nbytes() for store in self.stores.values())
+
+    def evict(self):
+        """Drops the oldest chunks until the cache fits max_bytes."""
+        while self.nbytes() > self.max_bytes:
+            candidates = [(store.oldest_chunk(), store) for store in self.stores.values()]
+            candidates = [(chunk, store) for chunk, store in candidates if chunk is not None]
+            if not candidates:
+                break
+            # Chunk numbers count up per stage, compare their ages by file time
+            chunk, store = min(candidates, key=lambda item: os.path.getmtime(item[1].chunk_path(item[0])))
+            store.evict(chunk)
+            self.evictions += 1
+
+    def flush(self):
+        for store in self.stores.values():
+            store.flush()
+
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "stages": {stage: {"hits": self.hits[stage], "misses": self.misses[stage]} for stage in STAGES},
+            "bytes": self.nbytes(),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,210 @@
+import json
+import os
+import time
+import numpy as np
+
+# The per-face models GazePipeline.process_faces_concurrent runs at the same time
+CONCURRENT_MODELS = ("landmarks", "head_pose", "age_gender", "emotion")
+MODES = ("sequential", "batched", "concurrent")
+
+def available_cores():
+    """Cores this process may run on (its affinity mask, not the whole machine)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def thread_candidates(cores):
+    """1, 2, 4, ... up to and including cores."""
+    candidates = []
+    threads = 1
+    while threads < cores:
+        candidates.append(threads)
+        threads *= 2
+    return candidates + [cores]
+
+def model_config(threads, streams=1, pinning=True):
+    """CPU compile properties for one model."""
+    return {
+        "PERFORMANCE_HINT": "LATENCY" if streams == 1 else "THROUGHPUT",
+        "NUM_STREAMS": str(streams),
+        "INFERENCE_NUM_THREADS": threads,
+        "ENABLE_CPU_PINNING": pinning,
+    }
+
+class ModelProfiler:
+    """
+    Compiles one model with different properties and measures the seconds
+    per inference on random input of the model's native size (batch
+    `batch`). Results are cached per config, so planners can ask for the
+    same config more than once.
+    """
+    def __init__(self, core, device, model_path, batch=1, runs=20, warmup=3):
+        self.core = core
+        self.device = device
+        self.model = core.read_model(model=model_path)
+        if batch != 1:
+            self.model.reshape({model_input: [batch] + list(model_input.get_partial_shape().to_shape())[1:]
+                                for model_input in self.model.inputs})
+        rng = np.random.RandomState(0)
+        self.inputs = {i: rng.rand(*model_input.get_partial_shape().to_shape()).astype(np.float32)
+                       for i, model_input in enumerate(self.model.inputs)}
+        self.runs = runs
+        self.warmup = warmup
+        self.results = {}
+
+    def measure(self, config):
+        key = json.dumps(config, sort_keys=True)
+        if key not in self.results:
+            self.results[key] = self._measure(config)
+        return self.results[key]
+
+    def _measure(self, config):
+        compiled_model = self.core.compile_model(model=self.model, device_name=self.device, config=config)
+        streams = int(config.get("NUM_STREAMS", 1))
+        requests = [compiled_model.create_infer_request() for _ in range(streams)]
+        for request in requests:
+            for key, data in self.inputs.items():
+                request.get_input_tensor(key).data[...] = data
+
+        def run():
+            # One inference per stream at the same time, like requests in flight
+            for request in requests:
+                request.start_async()
+            for request in requests:
+                request.wait()
+
+        for _ in range(self.warmup):
+            run()
+        start = time.perf_counter()
+        for _ in range(self.runs):
+            run()
+        return (time.perf_counter() - start) / (self.runs * streams)
+
+def _best(profiler, candidates):
+    """(seconds, config) of the fastest config."""
+    return min(((profiler.measure(config), config) for config in candidates), key=lambda item: item[0])
+
+def _split_cores(profilers, calls, cores, candidates):
+    """
+    Threads for models that run at the same time, sharing `cores`: starts at
+    one thread each and keeps giving the slowest model more threads while
+    that makes it faster. Returns name -> (seconds, config).
+    """
+    threads = {name: 1 for name in profilers}
+    cost = lambda name, t: profilers[name].measure(model_config(t, pinning=False)) * calls[name]
+    while sum(threads.values()) < cores:
+        slowest = max(threads, key=lambda name: cost(name, threads[name]))
+        more = [t for t in candidates if threads[slowest] < t <= threads[slowest] + cores - sum(threads.values())]
+        if not more or cost(slowest, more[0]) >= cost(slowest, threads[slowest]):
+            break
+        threads[slowest] = more[0]
+    return {name: (profilers[name].measure(model_config(t, pinning=False)), model_config(t, pinning=False))
+            for name, t in threads.items()}
+
+def plan_threads(model_paths, device="CPU", mode="sequential", num_faces=1, in_flight=1, cores=None,
+                 runs=20):
+    """
+    Profiles every model (model_paths maps name -> path) and picks its CPU
+    thread count, stream count, pinning and performance hint so that one
+    frame of `num_faces` faces takes as little time as possible on `cores`
+    cores (default: all available). mode is how GazePipeline runs:
+
+        sequential  one model at a time: each model gets the thread count
+                    that is fastest for it, which for the small face models
+                    is often fewer than all cores, and pins its threads
+        batched     the same, with the per-face models profiled at a batch
+                    of num_faces (one call per frame)
+        concurrent  landmarks, head pose, age/gender and emotion run at the
+                    same time (process_faces_concurrent), so they split the
+                    cores between them instead of oversubscribing them, and
+                    are not pinned (pinned threads of parallel models could
+                    land on the same cores)
+
+    With in_flight > 1 (frames in flight, e.g. PipelinedGazeEngine depth)
+    models may also get in_flight streams and the THROUGHPUT hint, if that
+    gives more inferences per second. Returns the plan, see save_plan.
+    """
+    from openvino.runtime import Core
+
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+    if device != "CPU":
+        raise ValueError("Thread plans only apply to the CPU device")
+    core = Core()
+    cores = cores or available_cores()
+    candidates = thread_candidates(cores)
+
+    per_face = [name for name in model_paths if name != "face_detection"]
+    batch = {name: num_faces if mode == "batched" and name in per_face else 1 for name in model_paths}
+    calls = {name: num_faces if name in per_face and mode != "batched" else 1 for name in model_paths}
+    profilers = {}
+    for name, path in model_paths.items():
+        print(f"Profiling {name}...")
+        profilers[name] = ModelProfiler(core, device, path, batch=batch[name], runs=runs)
+
+    choices = {}
+    parallel = [name for name in CONCURRENT_MODELS if name in model_paths] if mode == "concurrent" else []
+    if parallel:
+        choices.update(_split_cores({name: profilers[name] for name in parallel}, calls, cores, candidates))
+    for name in model_paths:
+        if name in choices:
+            continue
+        configs = [model_config(t) for t in candidates]
+        if in_flight > 1:
+            configs += [model_config(t, streams=in_flight) for t in candidates if t >= in_flight]
+        choices[name] = _best(profilers[name], configs)
+
+    models = {}
+    for name in model_paths:
+        seconds, config = choices[name]
+        models[name] = {
+            "config": config,
+            "ms": seconds * calls[name] * 1000,
+            "default_ms": profilers[name].measure({}) * calls[name] * 1000,
+        }
+    sequential_ms = [info["ms"] for name, info in models.items() if name not in parallel]
+    parallel_ms = [models[name]["ms"] for name in parallel]
+    return {
+        "device": device,
+        "cores": cores,
+        "mode": mode,
+        "num_faces": num_faces,
+        "in_flight": in_flight,
+        # Model time per frame, without preprocessing and the rest of the Python side
+        "frame_ms": sum(sequential_ms) + max(parallel_ms, default=0.0),
+        "models": models,
+    }
+
+def save_plan(plan, path):
+    with open(path, "w") as f:
+        json.dump(plan, f, indent=2)
+
+def load_plan(path):
+    with open(path) as f:
+        return json.load(f)
+
+def plan_configs(plan, device="CPU"):
+    """
+    name -> compile properties of a plan (dict or JSON path), for
+    ModelManager(thread_plan=...). A plan made for another device is
+    ignored, one made on a different core count is used with a warning.
+    """
+    if isinstance(plan, str):
+        plan = load_plan(plan)
+    if plan["device"] != device:
+        print(f"Warning: thread plan is for {plan['device']}, not {device}; ignoring it")
+        return {}
+    if plan["cores"] != available_cores():
+        print(f"Warning: thread plan was made for {plan['cores']} cores, this process has {available_cores()}")
+    return {name: info["config"] for name, info in plan["models"].items()}
+
+def print_plan(plan):
+    print(f"Plan for {plan['cores']} {plan['device']} cores, {plan['mode']}, {plan['num_faces']} face(s), "
+          f"{plan['in_flight']} frame(s) in flight")
+    print(f"{'model':>14} | {'threads':>7} | {'streams':>7} | {'hint':>10} | {'pinned':>6} | {'ms/frame':>8} | {'default':>8}")
+    for name, info in plan["models"].items():
+        config = info["config"]
+        print(f"{name:>14} | {config['INFERENCE_NUM_THREADS']:>7} | {config['NUM_STREAMS']:>7} | "
+              f"{config['PERFORMANCE_HINT']:>10} | {str(config['ENABLE_CPU_PINNING']):>6} | "
+              f"{info['ms']:>8.2f} | {info['default_ms']:>8.2f}")
+    print(f"Model time per frame: {plan['frame_ms']:.2f} ms")
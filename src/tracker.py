@@ -0,0 +1,215 @@
+import time
+import cv2
+import numpy as np
+
+def box_iou(a, b):
+    """IoU of two [x_min, y_min, x_max, y_max] boxes."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = np.array(box, dtype=np.float32)
+        self.velocity = np.zeros(2, dtype=np.float32) # center shift per frame
+        self.confidence = 1.0
+        self.misses = 0
+        self.points = None # optical flow points, in flow (downscaled) coordinates
+
+class FaceTracker:
+    """
+    Keeps face boxes between keyframes so face detection does not have to
+    run on every frame.
+
+    Full detection runs every `detect_interval` frames, or earlier when a
+    re-detect trigger fires: a track's confidence drops below
+    `min_confidence`, or (with redetect_on_empty) there are no tracks.
+    Detections are associated to tracks by IoU, so every face keeps a stable
+    track ID. In between, boxes are moved by sparse optical flow on a
+    downscaled grayscale frame (use_optical_flow=True) or by a constant
+    velocity motion model.
+    """
+    def __init__(self, detect_interval=5, iou_threshold=0.3, min_confidence=0.5,
+                 max_misses=1, use_optical_flow=True, flow_scale=0.5,
+                 confidence_decay=0.05, redetect_on_empty=False):
+        self.detect_interval = detect_interval
+        self.iou_threshold = iou_threshold
+        self.min_confidence = min_confidence
+        self.max_misses = max_misses
+        self.use_optical_flow = use_optical_flow
+        self.flow_scale = flow_scale
+        self.confidence_decay = confidence_decay
+        self.redetect_on_empty = redetect_on_empty
+
+        self.tracks = []
+        self.next_id = 0
+        self.prev_gray = None
+        self.frames_since_detection = 0
+
+        # Statistics, see stats()
+        self.frames = 0
+        self.detections = 0
+        self.detect_time = 0.0
+        self.track_time = 0.0
+
+    def reset(self):
+        self.tracks = []
+        self.prev_gray = None
+        self.frames_since_detection = 0
+
+    def needs_detection(self):
+        if self.frames == 0 or self.frames_since_detection >= self.detect_interval:
+            return True
+        if self.redetect_on_empty and not self.tracks:
+            return True
+        return any(track.confidence < self.min_confidence for track in self.tracks)
+
+    def update(self, frame, detect_fn):
+        """
+        Returns (boxes, track_ids) for the frame. detect_fn(frame) is only
+        called on keyframes and must return [x_min, y_min, x_max, y_max] boxes.
+        """
+        gray = None
+        if self.use_optical_flow:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray = cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale)
+
+        if self.needs_detection():
+            start = time.perf_counter()
+            boxes = detect_fn(frame)
+            self.detect_time += time.perf_counter() - start
+            self.detections += 1
+            start = time.perf_counter()
+            self._associate(boxes, gray)
+            self.frames_since_detection = 0
+        else:
+            start = time.perf_counter()
+            self._propagate(gray)
+            self.frames_since_detection += 1
+
+        self.prev_gray = gray
+        self.frames += 1
+        output = self._output(frame.shape)
+        self.track_time += time.perf_counter() - start
+        return output
+
+    def _associate(self, boxes, gray):
+        # Greedy IoU matching, best pairs first
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, box in enumerate(boxes):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, t, d))
+        pairs.sort(reverse=True)
+
+        matched_tracks, matched_boxes = set(), set()
+        for _, t, d in pairs:
+            if t in matched_tracks or d in matched_boxes:
+                continue
+            matched_tracks.add(t)
+            matched_boxes.add(d)
+            track = self.tracks[t]
+            new_box = np.array(boxes[d], dtype=np.float32)
+            # The track was propagated with its velocity for `propagated`
+            # frames, the detection is one frame further along
+            propagated = self.frames_since_detection
+            shift = (new_box[:2] + new_box[2:]) / 2 - (track.box[:2] + track.box[2:]) / 2
+            velocity = (shift + propagated * track.velocity) / (propagated + 1)
+            track.velocity = 0.5 * track.velocity + 0.5 * velocity
+            track.box = new_box
+            track.confidence = 1.0
+            track.misses = 0
+
+        tracks = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                track.confidence = 0.0
+                if track.misses > self.max_misses:
+                    continue
+            tracks.append(track)
+        for d, box in enumerate(boxes):
+            if d not in matched_boxes:
+                tracks.append(Track(self.next_id, box))
+                self.next_id += 1
+        self.tracks = tracks
+
+        if gray is not None:
+            for track in self.tracks:
+                self._seed_points(track, gray)
+
+    def _seed_points(self, track, gray):
+        x_min, y_min, x_max, y_max = (track.box * self.flow_scale).astype(int)
+        mask = np.zeros_like(gray)
+        mask[max(0, y_min):max(0, y_max), max(0, x_min):max(0, x_max)] = 255
+        track.points = cv2.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01,
+                                               minDistance=3, mask=mask)
+
+    def _propagate(self, gray):
+        for track in self.tracks:
+            shift, quality = None, 1.0
+            if gray is not None and self.prev_gray is not None:
+                shift, quality = self._flow_shift(track, gray)
+
+            if shift is None:
+                # Constant velocity motion model
+                shift = track.velocity
+            else:
+                track.velocity = 0.5 * track.velocity + 0.5 * shift
+
+            track.box[:2] += shift
+            track.box[2:] += shift
+            track.confidence = min(track.confidence * (1 - self.confidence_decay), quality)
+
+    def _flow_shift(self, track, gray):
+        """Median optical flow displacement of the track's points, in frame pixels."""
+        if track.points is None or len(track.points) < 4:
+            return None, 0.0
+
+        points = track.points
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None,
+                                                    winSize=(15, 15), maxLevel=2)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, moved, None,
+                                                        winSize=(15, 15), maxLevel=2)
+        # Forward-backward check drops points that were lost or occluded
+        error = np.linalg.norm(points - back, axis=2).ravel()
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < 1.0)
+
+        quality = float(good.mean())
+        if good.sum() < 4:
+            track.points = None
+            return None, quality
+
+        track.points = moved[good].reshape(-1, 1, 2)
+        shift = np.median(moved[good] - points[good], axis=0).ravel() / self.flow_scale
+        return shift.astype(np.float32), quality
+
+    def _output(self, frame_shape):
+        h, w = frame_shape[:2]
+        boxes, track_ids = [], []
+        for track in self.tracks:
+            x_min, y_min, x_max, y_max = track.box.astype(int)
+            box = [max(0, x_min), max(0, y_min), min(w, x_max), min(h, y_max)]
+            # Drop faces that moved out of the frame
+            if box[2] - box[0] <= 0 or box[3] - box[1] <= 0:
+                continue
+            boxes.append(box)
+            track_ids.append(track.track_id)
+        return boxes, track_ids
+
+    def stats(self):
+        """Detection frames, skipped frames and the detection time saved by tracking."""
+        avg_detect = self.detect_time / self.detections if self.detections else 0.0
+        skipped = self.frames - self.detections
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "skipped": skipped,
+            "avg_detect_ms": avg_detect * 1000,
+            "track_ms": self.track_time * 1000,
+            "saved_ms": (skipped * avg_detect - self.track_time) * 1000,
+        }
@@ -1,20 +1,38 @@
 import cv2
 import numpy as np
+from src.results import GENDERS, EMOTIONS, UNKNOWN
 
 def draw_face_box(frame, face_box, color=(0, 255, 0)):
     x_min, y_min, x_max, y_max = face_box
     cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, 2)
 
-def draw_landmarks(frame, face_box, landmarks, color=(255, 255, 0), radius=2):
-    x_min, y_min, x_max, y_max = face_box
-    w_box = x_max - x_min
-    h_box = y_max - y_min
+def _disk_offsets(radius):
+    """(dy, dx) offsets of the pixels of a filled circle."""
+    r = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(r, r, indexing="ij")
+    inside = dy ** 2 + dx ** 2 <= radius ** 2 # same pixels as a filled cv2.circle
+    return dy[inside], dx[inside]
+
+def draw_landmarks(frame, boxes, landmarks, color=(255, 255, 0), radius=2):
+    """
+    Draws every landmark of every face at once. boxes is (N, 4), landmarks
+    (N, 70) normalized to [0,1] relative to the face box. The points are
+    stamped straight into the frame with one fancy-indexed assignment
+    instead of one cv2.circle call per point.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if len(boxes) == 0:
+        return
+    points = np.asarray(landmarks, dtype=np.float32).reshape(len(boxes), -1, 2)
+    sizes = boxes[:, 2:] - boxes[:, :2]
+    points = (points * sizes[:, None] + boxes[:, None, :2]).astype(np.int32).reshape(-1, 2)
     
-    # Landmarks are normalized to [0,1] relative to the face box
-    for i in range(0, len(landmarks), 2):
-        lx = int(landmarks[i] * w_box + x_min)
-        ly = int(landmarks[i+1] * h_box + y_min)
-        cv2.circle(frame, (lx, ly), radius, color, -1)
+    dy, dx = _disk_offsets(radius)
+    ys = (points[:, 1:2] + dy).ravel()
+    xs = (points[:, 0:1] + dx).ravel()
+    h, w = frame.shape[:2]
+    inside = (ys >= 0) & (ys < h) & (xs >= 0) & (xs < w)
+    frame[ys[inside], xs[inside]] = color
 
 def draw_axis(frame, head_pose, origin, scale=50):
     yaw, pitch, roll = head_pose
@@ -56,40 +74,40 @@ def draw_gaze(frame, eye_pos, gaze_vector, length=100):
     cv2.arrowedLine(frame, (x, y), (end_x, end_y), (255, 0, 255), 2)
 
 def draw_results(frame, results):
-    for res in results:
-        box = res["box"]
+    """Draws a FrameResult (see src/results.py) onto the frame."""
+    has_gaze = results.has_gaze
+    draw_landmarks(frame, results.boxes, results.landmarks)
+    for i in range(len(results)):
+        box = results.boxes[i].tolist()
         draw_face_box(frame, box)
         
-        if "landmarks" in res:
-            draw_landmarks(frame, box, res["landmarks"])
-            
-        if "head_pose" in res:
-            center_x = (box[0] + box[2]) // 2
-            center_y = (box[1] + box[3]) // 2
-            draw_axis(frame, res["head_pose"], (center_x, center_y))
+        center_x = (box[0] + box[2]) // 2
+        center_y = (box[1] + box[3]) // 2
+        draw_axis(frame, results.head_pose[i], (center_x, center_y))
             
-        if "gaze" in res and "eyes" in res:
-            le_c, re_c = res["eyes"] # Relative to face box? No, logic in pipeline seemed relative to face img
+        if has_gaze[i]:
+            le_c, re_c = results.eyes[i].tolist() # Relative to the face box
             
             # Convert face-local coords to global coords
             fx, fy = box[0], box[1]
             le_global = (fx + le_c[0], fy + le_c[1])
             re_global = (fx + re_c[0], fy + re_c[1])
             
-            draw_gaze(frame, le_global, res["gaze"])
-            draw_gaze(frame, re_global, res["gaze"])
+            draw_gaze(frame, le_global, results.gaze[i])
+            draw_gaze(frame, re_global, results.gaze[i])
 
         # Draw Text (Age, Gender, Emotion)
         text_lines = []
-        if "age" in res and "gender" in res:
-            text_lines.append(f"{res['gender']}, {res['age']}")
-        if "emotion" in res:
-            text_lines.append(f"{res['emotion']}")
+        if results.track_ids[i] >= 0:
+            text_lines.append(f"ID {results.track_ids[i]}")
+        if results.gender[i] != UNKNOWN:
+            text_lines.append(f"{GENDERS[results.gender[i]]}, {results.age[i]}")
+        if results.emotion[i] != UNKNOWN:
+            text_lines.append(f"{EMOTIONS[results.emotion[i]]}")
             
-        if text_lines:
-            x_min, y_min = box[0], box[1]
-            for i, line in enumerate(text_lines):
-                y_pos = y_min - 10 - (i * 20)
-                if y_pos < 20: # If too close to top edge, draw inside/below
-                    y_pos = y_min + 20 + (i * 20)
-                cv2.putText(frame, line, (x_min, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        x_min, y_min = box[0], box[1]
+        for j, line in enumerate(text_lines):
+            y_pos = y_min - 10 - (j * 20)
+            if y_pos < 20: # If too close to top edge, draw inside/below
+                y_pos = y_min + 20 + (j * 20)
+            cv2.putText(frame, line, (x_min, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)